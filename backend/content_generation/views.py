@@ -1,29 +1,25 @@
-import os
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-import groq
+from questions.llm_backends import get_llm_backend
+from questions.llm_gateway import LLMUnavailableError
 
 @api_view(['POST'])
 def generate_content(request):
-    """Generate content using Groq API based on the provided title."""
+    """Generate content using the configured LLM backend based on the provided title."""
     try:
         title = request.data.get('title')
         if not title:
             return Response({'error': 'Title is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Initialize Groq client
-        groq_client = groq.Groq(api_key=os.getenv('GROQ_API_KEY'))
-
-        # Generate content using Groq
+        # Generate content using the LLM backend
         prompt = f"Generate comprehensive educational content about {title}. The content should be detailed, well-structured, and suitable for creating quiz questions. Include detailed key concepts but do not make any quiz Questions, also make sure you do not use markdown."
 
-        completion = groq_client.chat.completions.create(
+        completion = get_llm_backend().chat_completion(
             messages=[{
                 "role": "user",
                 "content": prompt
             }],
-            model="meta-llama/llama-4-scout-17b-16e-instruct",  # Using Mixtral model for better content generation
             temperature=0.7,
             max_tokens=2000,
         )
@@ -35,6 +31,8 @@ def generate_content(request):
             'content': generated_content
         }, status=status.HTTP_200_OK)
 
+    except LLMUnavailableError as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         return Response(
             {'error': f'Failed to generate content: {str(e)}'}, 
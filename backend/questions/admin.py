@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Question
+from sources.search import unindex_question_queryset
+
+from .models import Question, GenerationJob
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
@@ -17,4 +19,20 @@ class QuestionAdmin(admin.ModelAdmin):
 
     def question_text_short(self, obj):
         return obj.question_text[:75] + '...' if len(obj.question_text) > 75 else obj.question_text
-    question_text_short.short_description = 'Question Text'
\ No newline at end of file
+    question_text_short.short_description = 'Question Text'
+
+    # Questions are removed from the search index in bulk before they are deleted
+    def delete_model(self, request, obj):
+        unindex_question_queryset(Question.objects.filter(id=obj.id))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        unindex_question_queryset(queryset)
+        super().delete_queryset(request, queryset)
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source', 'status', 'completed_pages', 'total_pages', 'question_count', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    raw_id_fields = ('source',)
+    readonly_fields = ('page_progress', 'created_at', 'started_at', 'finished_at', 'updated_at')
@@ -0,0 +1,122 @@
+import re
+
+# Rough average for English text; close enough for budgeting prompt sizes
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """Estimates the number of LLM tokens in text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_long_text(text, max_tokens):
+    """
+    Splits text that exceeds max_tokens at paragraph breaks, then sentence ends, and only
+    as a last resort in the middle of a sentence. Yields pieces of at most max_tokens.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        yield text
+        return
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            max_chars = max_tokens * CHARS_PER_TOKEN
+            for start in range(0, len(sentence), max_chars):
+                yield sentence[start:start + max_chars]
+
+
+def split_into_windows(pages, max_tokens):
+    """
+    Packs the text of all pages (DOCX pseudo-pages, PPTX slides, a transcript, ...) into
+    consecutive windows of at most max_tokens each. Long pages are split at paragraph or
+    sentence boundaries; small adjacent pages share a window.
+    Returns a list of dicts with 'text', 'first_page', 'last_page' (1-indexed) and 'tokens'.
+    """
+    windows = []
+    current = None
+    for page_index, page_text in enumerate(pages):
+        if not page_text or not page_text.strip():
+            continue
+        for piece in _split_long_text(page_text.strip(), max_tokens):
+            piece_tokens = estimate_tokens(piece)
+            if current is not None and current['tokens'] + piece_tokens + 1 <= max_tokens:
+                current['text'] += "\n\n" + piece
+                current['tokens'] += piece_tokens + 1
+                current['last_page'] = page_index + 1
+                continue
+            current = {
+                'text': piece,
+                'first_page': page_index + 1,
+                'last_page': page_index + 1,
+                'tokens': piece_tokens,
+            }
+            windows.append(current)
+    return windows
+
+
+def allocate_questions(windows, total_questions):
+    """
+    Spreads total_questions over windows so the whole document is covered.
+    With at least as many questions as windows, every window gets one question and the rest
+    are shared out in proportion to window size. With fewer questions than windows, evenly
+    spaced windows get one question each.
+    Returns a list of question counts, one per window (0 for windows that are not used).
+    """
+    window_count = len(windows)
+    counts = [0] * window_count
+    if not window_count or total_questions <= 0:
+        return counts
+
+    if total_questions < window_count:
+        for i in range(total_questions):
+            counts[int((i + 0.5) * window_count / total_questions)] = 1
+        return counts
+
+    counts = [1] * window_count
+    remaining = total_questions - window_count
+    total_tokens = sum(window['tokens'] for window in windows) or window_count
+    shares = [remaining * window['tokens'] / total_tokens for window in windows]
+    for i, share in enumerate(shares):
+        counts[i] += int(share)
+    # Largest remainder method for what is left after rounding down
+    leftover = total_questions - sum(counts)
+    by_remainder = sorted(range(window_count), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in by_remainder[:leftover]:
+        counts[i] += 1
+    return counts
+
+
+def pack_pages(pages, max_tokens, max_questions):
+    """
+    Groups adjacent pages so that each group fits in one prompt: consecutive page numbers,
+    at most max_tokens of text (including the [Page N] markers) and at most max_questions
+    questions. Pages too large to share a prompt end up in a group of their own.
+    pages: Dicts with 'page_number', 'text_content' and 'num_questions', in page order.
+    Returns a list of groups (lists of the page dicts).
+    """
+    groups = []
+    group_tokens = 0
+    group_questions = 0
+    for page in pages:
+        # The marker and separator add a few tokens per packed page
+        page_tokens = estimate_tokens(page['text_content'].strip()) + 4
+        if (groups
+                and groups[-1][-1]['page_number'] + 1 == page['page_number']
+                and group_tokens + page_tokens <= max_tokens
+                and group_questions + page['num_questions'] <= max_questions):
+            groups[-1].append(page)
+            group_tokens += page_tokens
+            group_questions += page['num_questions']
+            continue
+        groups.append([page])
+        group_tokens = page_tokens
+        group_questions = page['num_questions']
+    return groups
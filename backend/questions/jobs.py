@@ -0,0 +1,146 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import GenerationJob
+from .utils import iter_question_generation
+
+# In-process worker pool shared by all requests handled by this process
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs submitted to this process's pool that have not finished yet
+_queued_job_ids = set()
+
+def get_job_executor():
+    """Returns the process-wide thread pool that runs generation jobs, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = max(1, int(getattr(settings, 'GENERATION_JOB_WORKERS', 2)))
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='generation-job')
+        return _executor
+
+def enqueue_generation_job(job):
+    """
+    Hands a PENDING job to the in-process worker pool once the surrounding transaction commits.
+    When GENERATION_JOBS_IN_PROCESS is False the job is left for `manage.py run_generation_jobs`.
+    """
+    if not getattr(settings, 'GENERATION_JOBS_IN_PROCESS', True):
+        return
+    job_id = job.id
+    transaction.on_commit(lambda: _submit_generation_job(job_id))
+
+def _submit_generation_job(job_id):
+    _queued_job_ids.add(job_id)
+    get_job_executor().submit(run_generation_job, job_id)
+
+def recover_stale_generation_jobs(requeue_pending=True):
+    """
+    Recovers jobs orphaned by a restart. RUNNING jobs whose worker stopped reporting progress are
+    marked as FAILED. With in-process jobs, jobs PENDING for longer than GENERATION_JOB_STALE_AFTER
+    that this process has not queued are queued again (run_generation_job claims a job once, so a
+    job also queued by another web process still runs once). Otherwise (or with
+    requeue_pending=False) PENDING jobs are the queue of `manage.py run_generation_jobs`.
+    """
+    stale_after = getattr(settings, 'GENERATION_JOB_STALE_AFTER', 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale_count = GenerationJob.objects.filter(status='RUNNING', updated_at__lt=cutoff).update(
+        status='FAILED',
+        error="Job stopped reporting progress and was marked as failed.",
+        finished_at=timezone.now()
+    )
+    if requeue_pending and getattr(settings, 'GENERATION_JOBS_IN_PROCESS', True):
+        pending_ids = GenerationJob.objects.filter(status='PENDING', created_at__lt=cutoff).values_list('id', flat=True)
+        for job_id in pending_ids:
+            if job_id not in _queued_job_ids:
+                print(f"Queueing generation job {job_id} again; it was left pending")
+                _submit_generation_job(job_id)
+                stale_count += 1
+    return stale_count
+
+def run_generation_job(job_id):
+    """
+    Runs a single generation job to completion, recording per-page progress as batches finish.
+    Questions are saved as each page completes, so a cancelled job keeps its partial results.
+    """
+    try:
+        # Claim the job so that no other worker picks it up
+        claimed = GenerationJob.objects.filter(id=job_id, status='PENDING').update(
+            status='RUNNING', started_at=timezone.now()
+        )
+        if not claimed:
+            return
+
+        job = GenerationJob.objects.select_related('source').get(id=job_id)
+        parameters = job.parameters or {}
+        print(f"Starting generation job {job.id} for source {job.source_id}")
+
+        events = iter_question_generation(
+            questions_per_page=parameters.get('questions_per_page'),
+            pages_to_generate_str=parameters.get('pages_to_generate'),
+            total_question_limit=parameters.get('total_question_limit'),
+            source_id=job.source_id,
+            generation_job=job,
+            use_cache=not parameters.get('fresh', False),
+            incremental=parameters.get('incremental', False)
+        )
+        cancelled = False
+        try:
+            for event in events:
+                if event['event'] == 'plan':
+                    page_progress = {}
+                    for batch in event['batches']:
+                        page = page_progress.setdefault(str(batch['page_number']), {
+                            'status': 'pending', 'requested': 0, 'questions': 0, 'batches_remaining': 0
+                        })
+                        page['requested'] += batch['requested']
+                        page['batches_remaining'] += 1
+                    for page_number in event['kept_pages']:
+                        page_progress[str(page_number)] = {'status': 'kept', 'requested': 0, 'questions': 0, 'batches_remaining': 0}
+                    job.page_progress = page_progress
+                    job.total_pages = len(page_progress)
+                    job.completed_pages = len(event['kept_pages'])
+                    job.save(update_fields=['page_progress', 'total_pages', 'completed_pages', 'updated_at'])
+
+                elif event['event'] == 'batch':
+                    page = job.page_progress[str(event['page_number'])]
+                    page['questions'] += len(event['questions'])
+                    page['batches_remaining'] -= 1
+                    if page['batches_remaining'] <= 0:
+                        page['status'] = 'done' if page['questions'] else 'failed'
+                        job.completed_pages += 1
+                    job.question_count += len(event['questions'])
+                    job.save(update_fields=['page_progress', 'completed_pages', 'question_count', 'updated_at'])
+
+                    if GenerationJob.objects.filter(id=job.id, cancel_requested=True).exists():
+                        print(f"Generation job {job.id} was cancelled after page {event['page_number']}")
+                        cancelled = True
+                        break
+        finally:
+            # Stops dispatching the remaining batches if we left the loop early
+            events.close()
+
+        if cancelled:
+            job.status = 'CANCELLED'
+        elif job.question_count:
+            job.status = 'SUCCEEDED'
+        else:
+            job.status = 'FAILED'
+            job.error = "Failed to generate questions. This could be due to empty content on specified pages, invalid page ranges, or an issue with the content processing."
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        print(f"Generation job {job.id} finished with status {job.status} ({job.question_count} questions)")
+
+    except Exception as e:
+        print(f"Error running generation job {job_id}: {str(e)}")
+        GenerationJob.objects.filter(id=job_id).update(
+            status='FAILED', error=str(e), finished_at=timezone.now()
+        )
+    finally:
+        _queued_job_ids.discard(job_id)
+        # Worker threads outlive the request cycle, so they must release their own connections
+        connections.close_all()
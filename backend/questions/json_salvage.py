@@ -0,0 +1,133 @@
+import json
+import re
+
+# strict=False accepts raw control characters (e.g. unescaped newlines) inside strings
+_decoder = json.JSONDecoder(strict=False)
+
+_ARRAY_OF_OBJECTS_START = re.compile(r'\[\s*\{')
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+def _find_object_end(text, start):
+    """
+    Returns the index just past the '}' that closes the object opening at text[start],
+    honouring strings and escapes, or None if the object is never closed (truncated).
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+
+def _remove_trailing_commas(object_text):
+    """Removes commas directly before a closing brace or bracket, outside of strings."""
+    pieces = []
+    last = 0
+    in_string = False
+    escaped = False
+    for index, char in enumerate(object_text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ',' and _TRAILING_COMMA.match(object_text, index):
+            pieces.append(object_text[last:index])
+            last = index + 1
+    pieces.append(object_text[last:])
+    return ''.join(pieces)
+
+
+class SalvageResult:
+    """Outcome of salvaging a JSON array: the recovered objects and what had to be dropped."""
+
+    def __init__(self):
+        self.objects = []
+        self.skipped = 0          # Objects that were complete but could not be parsed
+        self.truncated = False    # The text ended inside an object
+        self.closed = False       # The closing ']' of the array was reached
+
+    @property
+    def complete(self):
+        return self.closed and not self.skipped and not self.truncated
+
+
+def iter_json_objects(text, result=None):
+    """
+    Scans an LLM response in a single pass and yields every complete JSON object
+    of the first array of objects in it (or of bare, comma-separated objects when
+    the brackets are missing). Prose, markdown fences and garbage between objects
+    are skipped, trailing commas are repaired, and scanning stops cleanly at the
+    point of truncation. Pass a SalvageResult to collect what had to be dropped.
+    """
+    if result is None:
+        result = SalvageResult()
+
+    match = _ARRAY_OF_OBJECTS_START.search(text)
+    position = match.start() + 1 if match else text.find('{')
+    if position < 0:
+        return
+
+    length = len(text)
+    while position < length:
+        char = text[position]
+        if char in ' \t\r\n,':
+            position += 1
+            continue
+        if char == ']':
+            result.closed = True
+            return
+        if char != '{':
+            # Garbage between objects: resynchronise on the next object
+            next_object = text.find('{', position)
+            if next_object < 0:
+                return
+            position = next_object
+            continue
+
+        try:
+            obj, end = _decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            end = _find_object_end(text, position)
+            if end is None:
+                result.truncated = True
+                return
+            try:
+                obj = _decoder.decode(_remove_trailing_commas(text[position:end]))
+            except json.JSONDecodeError:
+                result.skipped += 1
+                position = end
+                continue
+
+        result.objects.append(obj)
+        yield obj
+        position = end
+
+
+def salvage_json_array(text):
+    """Returns a SalvageResult with every object that could be recovered from text."""
+    result = SalvageResult()
+    for _ in iter_json_objects(text, result):
+        pass
+    return result
@@ -0,0 +1,152 @@
+import abc
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+
+from .llm_gateway import get_llm_gateway
+
+DEFAULT_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+
+_PAGE_QUOTA = re.compile(r'^- Page (\d+): (\d+) questions?$', re.MULTILINE)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class LLMBackendError(Exception):
+    """Raised by a backend when a completion could not be produced."""
+
+
+class LLMBackend(abc.ABC):
+    """
+    Interface for chat completion providers. chat_completion returns an object shaped like
+    a Groq completion: choices[0].message.content, plus usage.prompt_tokens,
+    usage.completion_tokens and usage.total_tokens.
+    """
+
+    def __init__(self, model=None, **options):
+        self.model = model or DEFAULT_MODEL
+
+    @abc.abstractmethod
+    def chat_completion(self, *, messages, model=None, timeout=None, **params):
+        """Returns the completion for messages."""
+
+
+class GroqBackend(LLMBackend):
+    """Sends completions to Groq through the shared LLM gateway."""
+
+    def chat_completion(self, *, messages, model=None, timeout=None, **params):
+        return get_llm_gateway().chat_completion(
+            model=model or self.model, messages=messages, timeout=timeout, **params
+        )
+
+
+class FakeBackend(LLMBackend):
+    """
+    Local, deterministic stand-in for load testing and offline benchmarks. Question prompts
+    ("exactly N ...") are answered with N schema-valid questions; any other prompt gets
+    plain text. Latency, error rate and truncation are configurable, and the same seed and
+    prompt always produce the same response, regardless of thread scheduling.
+    """
+
+    def __init__(self, model=None, latency=0.5, latency_jitter=0.0, error_rate=0.0,
+                 truncation_rate=0.0, seed=0, **options):
+        super().__init__(model=model or 'fake-llm', **options)
+        self.latency = float(latency)
+        self.latency_jitter = float(latency_jitter)
+        self.error_rate = float(error_rate)
+        self.truncation_rate = float(truncation_rate)
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.calls_per_prompt = {}
+        self.calls = 0
+
+    def chat_completion(self, *, messages, model=None, timeout=None, **params):
+        prompt = "\x1e".join(message.get('content') or '' for message in messages)
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self.lock:
+            self.calls += 1
+            attempt = self.calls_per_prompt.get(prompt_hash, 0)
+            self.calls_per_prompt[prompt_hash] = attempt + 1
+        rng = random.Random(f"{self.seed}:{prompt_hash}:{attempt}")
+
+        delay = max(0.0, self.latency + rng.uniform(-self.latency_jitter, self.latency_jitter))
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise LLMBackendError(f"Simulated timeout after {timeout}s")
+        time.sleep(delay)
+
+        if rng.random() < self.error_rate:
+            raise LLMBackendError("Simulated provider error")
+
+        match = re.search(r'exactly (\d+)', messages[0].get('content') or '', re.IGNORECASE)
+        if match:
+            # Packed pages list a per-page quota; tag the questions with those pages
+            page_numbers = []
+            for page_number, count in _PAGE_QUOTA.findall(prompt):
+                page_numbers.extend([int(page_number)] * int(count))
+            content = self.make_questions(int(match.group(1)), prompt_hash, attempt, page_numbers)
+            if rng.random() < self.truncation_rate:
+                # Cut the response inside its last object, like a max_tokens cut-off
+                last_object = content.rfind('{')
+                content = content[:rng.randint(last_object + 1, len(content) - 2)]
+        else:
+            content = self.make_text(prompt_hash)
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            model=model or self.model,
+            choices=[SimpleNamespace(index=0, finish_reason='stop', message=SimpleNamespace(role='assistant', content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def make_questions(self, num_questions, prompt_hash, attempt, page_numbers=None):
+        # Stems depend on the prompt, so top-up requests never repeat accepted questions
+        tag = f"{prompt_hash[:8]}-{attempt}"
+        questions = [
+            {
+                "question_text": f"Which option is correct for generated question {tag}-{i + 1}?",
+                "options": {"A": "Alpha", "B": "Beta", "C": "Gamma", "D": "Delta"},
+                "correct_answer": "ABCD"[i % 4],
+                "explanation": f"Option {'ABCD'[i % 4]} is the correct answer for this generated question.",
+            }
+            for i in range(num_questions)
+        ]
+        for question, page_number in zip(questions, page_numbers or []):
+            question['page_number'] = page_number
+        return json.dumps(questions, indent=2)
+
+    def make_text(self, prompt_hash):
+        return "\n\n".join(
+            f"Section {i + 1}. Generated offline content ({prompt_hash[:8]}) describing key concept {i + 1} in detail."
+            for i in range(5)
+        )
+
+
+LLM_BACKENDS = {
+    'groq': GroqBackend,
+    'fake': FakeBackend,
+}
+
+def get_llm_backend():
+    """Returns the configured LLM backend (LLM_BACKEND['BACKEND']), creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            config = getattr(settings, 'LLM_BACKEND', {})
+            backend_name = (config.get('BACKEND') or 'groq').lower()
+            if backend_name not in LLM_BACKENDS:
+                raise ValueError(f"Unknown LLM backend '{backend_name}'. Choose one of: {', '.join(LLM_BACKENDS)}")
+            _backend = LLM_BACKENDS[backend_name](model=config.get('MODEL'), **config.get('OPTIONS', {}))
+        return _backend
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+# Hit/miss counters for this process
+_stats = {'hits': 0, 'misses': 0, 'stores': 0}
+_stats_lock = threading.Lock()
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def _record(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+def get_cache_stats():
+    """Returns the hit/miss/store counters of this process and the hit rate."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+    return stats
+
+def make_cache_key(model, messages, num_questions, sampling):
+    """
+    Builds a content-addressed key from the model, a hash of the prompt text,
+    the requested number of questions and the sampling parameters.
+    """
+    prompt_hash = hashlib.sha256(
+        "\x1e".join(message['content'] for message in messages).encode('utf-8')
+    ).hexdigest()
+    key_material = json.dumps({
+        'model': model,
+        'prompt': prompt_hash,
+        'num_questions': num_questions,
+        'sampling': sampling,
+    }, sort_keys=True)
+    return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+
+class DjangoCacheBackend:
+    """
+    Stores responses in one of the configured Django caches (eviction is handled by the cache).
+    The cache may be shared with the rest of the site, so clear() does not flush it: entries are
+    written under a generation number kept in the cache, and clear() moves to the next one. The
+    old entries are never read again and expire or get evicted like any other.
+    """
+    VERSION_KEY = "llm-response:version"
+
+    def __init__(self, alias='default', ttl=None, **kwargs):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def _version(self):
+        return self.cache.get_or_set(self.VERSION_KEY, 1, timeout=None)
+
+    def get(self, key):
+        value = self.cache.get(f"llm-response:{key}", version=self._version())
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.cache.set(f"llm-response:{key}", json.dumps(value), timeout=self.ttl, version=self._version())
+
+    def clear(self):
+        try:
+            self.cache.incr(self.VERSION_KEY)
+        except ValueError:
+            # The generation number was evicted; any new one hides the old entries
+            self.cache.set(self.VERSION_KEY, self._version() + 1, timeout=None)
+
+    def size(self):
+        return None
+
+
+class SQLiteCacheBackend:
+    """
+    Stores responses in a table of a standalone SQLite file.
+    Entries older than ttl seconds are ignored and purged; beyond max_entries the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=5000, **kwargs):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_response_cache_last_access ON llm_response_cache (last_access)")
+
+    def _connect(self):
+        # A short-lived connection per call keeps the backend safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if self.ttl is not None and now - created_at > self.ttl:
+                    conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE llm_response_cache SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+        finally:
+            conn.close()
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                if self.ttl is not None:
+                    conn.execute("DELETE FROM llm_response_cache WHERE created_at < ?", (now - self.ttl,))
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM llm_response_cache WHERE key IN ("
+                        "SELECT key FROM llm_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM llm_response_cache")
+        finally:
+            conn.close()
+
+    def size(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+        finally:
+            conn.close()
+
+
+CACHE_BACKENDS = {
+    'sqlite': SQLiteCacheBackend,
+    'django': DjangoCacheBackend,
+}
+
+def get_cache_backend():
+    """Returns the configured cache backend, or None when caching is disabled."""
+    global _backend
+    config = getattr(settings, 'LLM_RESPONSE_CACHE', {})
+    backend_name = (config.get('BACKEND') or 'none').lower()
+    if backend_name not in CACHE_BACKENDS:
+        return None
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = CACHE_BACKENDS[backend_name](
+                path=config.get('PATH'),
+                alias=config.get('CACHE_ALIAS', 'default'),
+                ttl=config.get('TTL'),
+                max_entries=config.get('MAX_ENTRIES'),
+            )
+        return _backend
+
+def get_cached_response(key):
+    """Looks up a cached validated question list. Cache errors are treated as misses."""
+    backend = get_cache_backend()
+    if backend is None:
+        return None
+    try:
+        value = backend.get(key)
+    except Exception as e:
+        print(f"Warning: LLM response cache lookup failed: {str(e)}")
+        value = None
+    _record('hits' if value is not None else 'misses')
+    return value
+
+def store_cached_response(key, value):
+    """Stores a validated question list. Cache errors never fail the generation."""
+    backend = get_cache_backend()
+    if backend is None:
+        return
+    try:
+        backend.set(key, value)
+        _record('stores')
+    except Exception as e:
+        print(f"Warning: LLM response cache store failed: {str(e)}")
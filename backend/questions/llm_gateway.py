@@ -0,0 +1,289 @@
+import os
+import random
+import re
+import threading
+import time
+
+import groq
+import httpx
+from django.conf import settings
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+DEFAULT_GATEWAY_CONFIG = {
+    'TIMEOUT': 60,                     # Seconds per call (read/write/pool)
+    'CONNECT_TIMEOUT': 10,
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 60,            # Seconds an idle pooled connection is kept open
+    'MAX_CONCURRENT_REQUESTS': 8,      # Calls in flight across the whole process
+    'REQUESTS_PER_MINUTE': 30,
+    'TOKENS_PER_MINUTE': 30000,
+    'MAX_RETRIES': 4,
+    'BACKOFF_BASE': 1.0,               # Seconds, doubled on every retry
+    'BACKOFF_MAX': 30.0,
+    'CIRCUIT_FAILURE_THRESHOLD': 5,    # Consecutive failures before the circuit opens
+    'CIRCUIT_RESET_TIMEOUT': 30,       # Seconds before a trial call is let through
+}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the circuit breaker is open and calls are being rejected."""
+
+
+def parse_reset_duration(value):
+    """Parses Groq reset headers such as '7.66s', '2m59.56s', '1h2m' or '450ms' into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    multipliers = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+    return sum(float(amount) * multipliers[unit] for amount, unit in parts)
+
+
+class TokenBucketRateLimiter:
+    """
+    Client-side limiter with one bucket for requests and one for tokens, refilled per minute.
+    Rate-limit headers returned by Groq override the local estimate when they are stricter.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.lock = threading.Lock()
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.requests = self.request_capacity
+        self.tokens = self.token_capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.requests = min(self.request_capacity, self.requests + elapsed * self.request_capacity / 60)
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.token_capacity / 60)
+
+    def acquire(self, estimated_tokens):
+        """Blocks until one request and estimated_tokens tokens are available, then takes them."""
+        # A single call larger than the whole bucket is let through once the bucket is full
+        estimated_tokens = min(float(estimated_tokens), self.token_capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.requests >= 1 and self.tokens >= estimated_tokens:
+                        self.requests -= 1
+                        self.tokens -= estimated_tokens
+                        return
+                    request_wait = (1 - self.requests) * 60 / self.request_capacity if self.requests < 1 else 0
+                    token_wait = (estimated_tokens - self.tokens) * 60 / self.token_capacity if self.tokens < estimated_tokens else 0
+                    wait = max(request_wait, token_wait)
+            time.sleep(min(max(wait, 0.05), 5))
+
+    def update_from_headers(self, headers):
+        """Applies x-ratelimit-* and retry-after headers from a Groq response."""
+        if not headers:
+            return
+        now = time.monotonic()
+        with self.lock:
+            self._refill(now)
+            remaining_requests = headers.get('x-ratelimit-remaining-requests')
+            remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+            if remaining_requests is not None:
+                try:
+                    self.requests = min(self.requests, float(remaining_requests))
+                except ValueError:
+                    pass
+                if self.requests < 1:
+                    reset = parse_reset_duration(headers.get('x-ratelimit-reset-requests'))
+                    if reset:
+                        self.blocked_until = max(self.blocked_until, now + reset)
+            if remaining_tokens is not None:
+                try:
+                    self.tokens = min(self.tokens, float(remaining_tokens))
+                except ValueError:
+                    pass
+                if self.tokens <= 0:
+                    reset = parse_reset_duration(headers.get('x-ratelimit-reset-tokens'))
+                    if reset:
+                        self.blocked_until = max(self.blocked_until, now + reset)
+            retry_after = parse_reset_duration(headers.get('retry-after'))
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_timeout
+    seconds, then lets a single trial call through (half-open) to decide whether to close.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.lock = threading.Lock()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return 'closed'
+        if now - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """Raises LLMUnavailableError while open. Returns True if this call is the half-open trial."""
+        with self.lock:
+            state = self._state(time.monotonic())
+            if state == 'open' or (state == 'half-open' and self.trial_in_progress):
+                raise LLMUnavailableError("LLM provider is unavailable (circuit open). Try again shortly.")
+            if state == 'half-open':
+                self.trial_in_progress = True
+                return True
+            return False
+
+    def release_trial(self):
+        """
+        Ends a trial call that neither succeeded nor failed (e.g. rate limited, or an unexpected
+        error), so the next call can be the trial instead of the circuit staying stuck.
+        """
+        with self.lock:
+            self.trial_in_progress = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_progress or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_in_progress:
+                    print(f"Warning: LLM circuit breaker opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self.trial_in_progress = False
+
+
+class LLMGateway:
+    """
+    Single entry point for chat completions: one pooled, keep-alive HTTP client shared by
+    all callers, per-call timeouts, a process-wide concurrency limit, a token-bucket rate
+    limiter fed by Groq's rate-limit headers, retries with exponential backoff and jitter,
+    and a circuit breaker.
+    """
+
+    def __init__(self, config=None, api_key=None):
+        self.config = dict(DEFAULT_GATEWAY_CONFIG, **(config or {}))
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(self.config['TIMEOUT'], connect=self.config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=self.config['MAX_CONNECTIONS'],
+                max_keepalive_connections=self.config['MAX_KEEPALIVE_CONNECTIONS'],
+                keepalive_expiry=self.config['KEEPALIVE_EXPIRY'],
+            ),
+        )
+        # Retries are handled here so they can respect the rate limiter and circuit breaker
+        self.client = groq.Groq(
+            api_key=api_key or os.getenv('GROQ_API_KEY'),
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self.semaphore = threading.BoundedSemaphore(self.config['MAX_CONCURRENT_REQUESTS'])
+        self.rate_limiter = TokenBucketRateLimiter(
+            self.config['REQUESTS_PER_MINUTE'], self.config['TOKENS_PER_MINUTE']
+        )
+        self.circuit_breaker = CircuitBreaker(
+            self.config['CIRCUIT_FAILURE_THRESHOLD'], self.config['CIRCUIT_RESET_TIMEOUT']
+        )
+
+    def _estimate_tokens(self, messages, max_tokens):
+        # Roughly 4 characters per token for English text
+        prompt_tokens = sum(len(message.get('content') or '') for message in messages) // 4
+        return prompt_tokens + (max_tokens or 0)
+
+    def _backoff(self, attempt):
+        delay = min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * (2 ** attempt))
+        return random.uniform(0, delay)  # Full jitter
+
+    def chat_completion(self, *, model, messages, timeout=None, **params):
+        """
+        Creates a chat completion and returns the Groq completion object.
+        timeout: Optional per-call timeout in seconds, overriding the configured default.
+        Raises LLMUnavailableError when the circuit is open, or the last provider error
+        once the retries are exhausted.
+        """
+        estimated_tokens = self._estimate_tokens(messages, params.get('max_tokens'))
+        max_retries = self.config['MAX_RETRIES']
+
+        for attempt in range(max_retries + 1):
+            is_trial = self.circuit_breaker.before_call()
+            try:
+                self.rate_limiter.acquire(estimated_tokens)
+                with self.semaphore:
+                    raw_response = self.client.chat.completions.with_raw_response.create(
+                        model=model,
+                        messages=messages,
+                        timeout=timeout if timeout is not None else groq.NOT_GIVEN,
+                        **params
+                    )
+                self.rate_limiter.update_from_headers(raw_response.headers)
+                completion = raw_response.parse()
+                self.circuit_breaker.record_success()
+                return completion
+
+            except groq.RateLimitError as e:
+                # Not a provider fault: wait for the window the headers tell us about
+                self.rate_limiter.update_from_headers(e.response.headers)
+                error = e
+            except (groq.APITimeoutError, groq.APIConnectionError, groq.InternalServerError) as e:
+                self.circuit_breaker.record_failure()
+                error = e
+            except groq.APIStatusError:
+                # Other 4xx errors (bad request, auth, ...) will not succeed on retry
+                self.circuit_breaker.record_success()
+                raise
+            finally:
+                if is_trial:
+                    self.circuit_breaker.release_trial()
+
+            if attempt == max_retries:
+                raise error
+            delay = self._backoff(attempt)
+            print(f"LLM call failed ({type(error).__name__}: {str(error)[:200]}). Retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1} of {max_retries})")
+            time.sleep(delay)
+
+    def close(self):
+        self.http_client.close()
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_llm_gateway():
+    """Returns the process-wide LLM gateway, creating it (and its connection pool) on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(getattr(settings, 'LLM_GATEWAY', None))
+        return _gateway
@@ -0,0 +1,89 @@
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from questions import utils
+from questions.chunking import CHARS_PER_TOKEN
+from questions.llm_backends import FakeBackend
+from questions.models import Source
+from sources.pages import save_source_pages
+
+
+def benchmark_page_text(page_number, tokens):
+    """Returns about tokens tokens of page text, so that no two pages fit in one packed prompt."""
+    sentence = f"Page {page_number} describes how cells convert nutrients into usable energy. "
+    return (sentence * (tokens * CHARS_PER_TOKEN // len(sentence) + 1)).strip()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks throughput and latency of the whole question generation flow against the "
+        "local fake LLM backend, serial vs. concurrent. Needs no network access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 10, 20, 40],
+                            help="Page counts to benchmark.")
+        parser.add_argument('--latency', type=float, default=0.5,
+                            help="Simulated LLM round-trip time in seconds.")
+        parser.add_argument('--latency-jitter', type=float, default=0.0,
+                            help="Random +/- variation added to each round trip, in seconds.")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of LLM calls that fail (0-1).")
+        parser.add_argument('--truncation-rate', type=float, default=0.0,
+                            help="Fraction of LLM responses cut off mid-object (0-1).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--questions-per-page', type=int, default=5)
+        parser.add_argument('--max-in-flight', type=int, default=None,
+                            help="Concurrency for the parallel run (defaults to QUESTION_GENERATION_MAX_IN_FLIGHT).")
+
+    def handle(self, *args, **options):
+        max_in_flight = options['max_in_flight'] or utils.get_max_in_flight()
+
+        self.stdout.write(
+            f"Simulated latency: {options['latency']}s (+/- {options['latency_jitter']}s), "
+            f"error rate: {options['error_rate']}, truncation rate: {options['truncation_rate']}, "
+            f"max in flight: {max_in_flight}"
+        )
+        self.stdout.write(
+            f"{'pages':>6} {'serial (s)':>12} {'parallel (s)':>14} {'speedup':>9} "
+            f"{'questions':>10} {'q/s':>8} {'LLM calls':>10}"
+        )
+
+        for page_count in options['pages']:
+            serial, _, _ = self.run_once(page_count, options, 1)
+            parallel, question_count, calls = self.run_once(page_count, options, max_in_flight)
+            speedup = serial / parallel if parallel else 0
+            self.stdout.write(
+                f"{page_count:>6} {serial:>12.2f} {parallel:>14.2f} {speedup:>8.1f}x "
+                f"{question_count:>10} {question_count / parallel:>8.1f} {calls:>10}"
+            )
+
+    def run_once(self, page_count, options, max_in_flight):
+        # A fresh backend per run, so both runs see the same seeded behaviour
+        backend = FakeBackend(
+            latency=options['latency'],
+            latency_jitter=options['latency_jitter'],
+            error_rate=options['error_rate'],
+            truncation_rate=options['truncation_rate'],
+            seed=options['seed'],
+        )
+        # Everything written during the run is rolled back afterwards
+        with mock.patch.object(utils, 'get_llm_backend', lambda: backend), transaction.atomic():
+            source = Source.objects.create(source_type='PDF', page_count=page_count)
+            # Pages fill the prompt token budget, so each one is its own LLM request like a real
+            # textbook page, instead of being packed together with its neighbours
+            page_tokens = utils.get_window_tokens()
+            save_source_pages(source.id, [benchmark_page_text(i + 1, page_tokens) for i in range(page_count)])
+            started = time.perf_counter()
+            questions = utils.generate_questions_from_text_content(
+                questions_per_page=options['questions_per_page'],
+                source_id=source.id,
+                max_in_flight=max_in_flight,
+                use_cache=False
+            )
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed, len(questions or []), backend.calls
@@ -0,0 +1,100 @@
+import json
+import re
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.json_salvage import salvage_json_array
+from questions.utils import validate_question_structure
+
+CORPUS_PATH = Path(__file__).resolve().parents[2] / 'corpus' / 'llm_responses.json'
+
+
+def legacy_parse(response_content):
+    """The parser generate_questions_batch used before the salvage parser, kept for comparison."""
+    json_match = re.search(r'\[\s*{.*}\s*\]', response_content, re.DOTALL)
+    if json_match:
+        response_content = json_match.group(0)
+    response_content = response_content.strip()
+    response_content = re.sub(r',(\s*[}\]])', r'\1', response_content)
+    response_content = re.sub(r'\s+', ' ', response_content)
+    response_content = response_content.replace('{ ', '{').replace(' }', '}')
+    response_content = response_content.replace('[ ', '[').replace(' ]', ']')
+    try:
+        parsed = json.loads(response_content)
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def salvage_parse(response_content):
+    return salvage_json_array(response_content).objects
+
+
+def count_valid(questions):
+    return sum(1 for question in questions if validate_question_structure(question)[0])
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the corpus of malformed LLM responses through the legacy parser and the salvage "
+        "parser, reporting valid questions recovered and parse time. Fails if the salvage parser "
+        "recovers a different number of questions than the corpus expects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=str(CORPUS_PATH), help="Path to the corpus JSON file.")
+        parser.add_argument('--iterations', type=int, default=200, help="Parses per case for timing.")
+
+    def handle(self, *args, **options):
+        with open(options['corpus'], encoding='utf-8') as f:
+            cases = json.load(f)
+
+        self.stdout.write(f"{'case':<26} {'expected':>8} {'legacy':>7} {'salvage':>8} {'legacy us':>10} {'salvage us':>11}")
+        failures = []
+        totals = {'expected': 0, 'legacy': 0, 'salvage': 0}
+        for case in cases:
+            response = case['response']
+            legacy_questions = legacy_parse(response)
+            salvaged_questions = salvage_parse(response)
+            legacy_valid = count_valid(legacy_questions)
+            salvage_valid = count_valid(salvaged_questions)
+
+            legacy_time = self.time_parser(legacy_parse, response, options['iterations'])
+            salvage_time = self.time_parser(salvage_parse, response, options['iterations'])
+
+            totals['expected'] += case['expected_questions']
+            totals['legacy'] += legacy_valid
+            totals['salvage'] += salvage_valid
+            self.stdout.write(
+                f"{case['name']:<26} {case['expected_questions']:>8} {legacy_valid:>7} {salvage_valid:>8} "
+                f"{legacy_time:>10.1f} {salvage_time:>11.1f}"
+            )
+            if salvage_valid != case['expected_questions']:
+                failures.append(case['name'])
+
+            # Whitespace inside strings (e.g. code indentation) must survive parsing
+            for original, salvaged in zip(self.original_questions(response), salvaged_questions):
+                if original.get('question_text') != salvaged.get('question_text'):
+                    failures.append(f"{case['name']} (question text altered)")
+                    break
+
+        self.stdout.write(
+            f"{'TOTAL':<26} {totals['expected']:>8} {totals['legacy']:>7} {totals['salvage']:>8}"
+        )
+        if failures:
+            raise CommandError(f"Salvage parser did not match the corpus for: {', '.join(failures)}")
+
+    def original_questions(self, response):
+        try:
+            parsed = json.loads(response)
+        except json.JSONDecodeError:
+            return []
+        return parsed if isinstance(parsed, list) else []
+
+    def time_parser(self, parser, response, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parser(response)
+        return (time.perf_counter() - started) / iterations * 1_000_000
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from questions.models import Question
+from questions.serializers import QuestionSerializer
+from questions.utils import save_generated_questions
+from sources.models import Source
+from sources.pages import save_source_pages
+from sources.search import unindex_question_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks question insert throughput: row-by-row QuestionSerializer saves vs. the "
+        "bulk_create path used by generation. Runs against the default database, so point "
+        "DATABASES at PostgreSQL to measure it there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, nargs='+', default=[100, 500, 2000],
+                            help="Numbers of questions to insert.")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Runs per measurement; the best one is reported.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor} ({connection.settings_dict['NAME']})")
+        self.stdout.write(f"{'questions':>10} {'serializer (q/s)':>18} {'bulk (q/s)':>12} {'speedup':>9}")
+
+        source = Source.objects.create(source_type='TXT')
+        save_source_pages(source.id, ["Benchmark source."])
+        try:
+            for count in options['count']:
+                serializer_rate = self.best_rate(self.insert_with_serializer, source, count, options['repeat'])
+                bulk_rate = self.best_rate(self.insert_with_bulk_create, source, count, options['repeat'])
+                self.stdout.write(
+                    f"{count:>10} {serializer_rate:>18.0f} {bulk_rate:>12.0f} {bulk_rate / serializer_rate:>8.1f}x"
+                )
+        finally:
+            source.delete()
+
+    def best_rate(self, insert, source, count, repeat):
+        best = None
+        for _ in range(repeat):
+            questions_data = self.make_questions(source, count)
+            started = time.perf_counter()
+            insert(questions_data)
+            elapsed = time.perf_counter() - started
+            questions = Question.objects.filter(source=source)
+            unindex_question_queryset(questions)
+            questions.delete()
+            best = elapsed if best is None else min(best, elapsed)
+        return count / best
+
+    def insert_with_serializer(self, questions_data):
+        # The previous persistence path: full DRF validation and one INSERT per question
+        serializer = QuestionSerializer(data=questions_data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def insert_with_bulk_create(self, questions_data):
+        save_generated_questions(questions_data, content_fingerprint='0' * 64)
+
+    def make_questions(self, source, count):
+        return [
+            {
+                "source": source.id,
+                "page_number": i // 5 + 1,
+                "question_text": f"Benchmark question {i + 1}?",
+                "options": {"A": "Alpha", "B": "Beta", "C": "Gamma", "D": "Delta"},
+                "correct_answer": "A",
+                "explanation": "Alpha is the first option.",
+            }
+            for i in range(count)
+        ]
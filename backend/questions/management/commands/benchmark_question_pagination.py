@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from questions.models import Question
+from questions.pagination import keyset_page
+from sources.models import Source
+
+INSERT_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks question list page fetches at increasing depths: OFFSET pagination vs. keyset "
+        "pagination on (created_at, id), for all questions and for one source. Inserts --count "
+        "benchmark questions into the default database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000, help="Questions to insert.")
+        parser.add_argument('--sources', type=int, default=10, help="Sources the questions are spread over.")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5, help="Fetches per measurement; the best one is reported.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark sources and questions.")
+
+    def handle(self, *args, **options):
+        count, source_count, page_size = options['count'], options['sources'], options['page_size']
+        if count <= 0 or source_count <= 0 or page_size <= 0:
+            raise CommandError("--count, --sources and --page-size must be positive.")
+        self.stdout.write(f"Database: {connection.vendor} ({connection.settings_dict['NAME']})")
+
+        sources = [Source.objects.create(source_type='TXT') for _ in range(source_count)]
+        try:
+            started = time.perf_counter()
+            self.insert_questions(sources, count)
+            self.stdout.write(f"Inserted {count} questions in {time.perf_counter() - started:.1f} s")
+            if connection.vendor in ('sqlite', 'postgresql'):
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+            all_questions = Question.objects.all()
+            source_questions = Question.objects.filter(source=sources[0])
+            self.stdout.write(f"{'list':<8} {'depth':>9} {'offset ms':>10} {'keyset ms':>10}")
+            for label, queryset, total in (('all', all_questions, all_questions.count()),
+                                           ('source', source_questions, source_questions.count())):
+                depths = sorted({0, min(1_000, total - 1), total // 10, total // 2, max(total - page_size, 0)})
+                for depth in depths:
+                    offset_ms = self.best_ms(lambda: list(queryset.order_by('-created_at', '-id')[depth:depth + page_size]), options['repeat'])
+                    # The keyset position is the last row of the previous page, as a cursor would carry it
+                    if depth:
+                        position = queryset.order_by('-created_at', '-id').values_list('created_at', 'id')[depth - 1]
+                    else:
+                        position = (None, None)
+                    keyset_ms = self.best_ms(lambda: keyset_page(queryset, page_size, *position), options['repeat'])
+                    self.stdout.write(f"{label:<8} {depth:>9} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+            if connection.vendor == 'sqlite':
+                position = source_questions.order_by('-created_at', '-id').values_list('created_at', 'id')[0]
+                sql, params = source_questions.order_by('-created_at', '-id').filter(
+                    created_at__lte=position[0]
+                ).query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                    self.stdout.write("Keyset query plan: " + "; ".join(row[-1] for row in cursor.fetchall()))
+        finally:
+            if not options['keep']:
+                started = time.perf_counter()
+                Source.objects.filter(id__in=[source.id for source in sources]).delete()
+                self.stdout.write(f"Deleted benchmark data in {time.perf_counter() - started:.1f} s")
+
+    def insert_questions(self, sources, count):
+        # Questions are spread over the sources in page order, 5 per page, like generation saves them
+        inserted = 0
+        while inserted < count:
+            batch = []
+            for i in range(inserted, min(count, inserted + INSERT_BATCH_SIZE)):
+                source = sources[i % len(sources)]
+                batch.append(Question(
+                    source=source,
+                    page_number=(i // len(sources)) // 5 + 1,
+                    question_text=f"Benchmark question {i + 1}?",
+                    options={"A": "Alpha", "B": "Beta", "C": "Gamma", "D": "Delta"},
+                    correct_answer="A",
+                    explanation="Alpha is the first option.",
+                ))
+            with transaction.atomic():
+                Question.objects.bulk_create(batch)
+            inserted += len(batch)
+            if inserted % 100_000 < INSERT_BATCH_SIZE:
+                self.stdout.write(f"  {inserted} questions inserted")
+
+    def best_ms(self, fetch, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fetch()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
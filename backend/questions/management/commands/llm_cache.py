@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from questions.llm_cache import get_cache_backend
+
+
+class Command(BaseCommand):
+    help = "Shows the size of the LLM response cache or clears it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Remove all cached responses.")
+
+    def handle(self, *args, **options):
+        backend = get_cache_backend()
+        if backend is None:
+            self.stdout.write("LLM response cache is disabled.")
+            return
+
+        if options['clear']:
+            backend.clear()
+            self.stdout.write("LLM response cache cleared.")
+
+        size = backend.size()
+        self.stdout.write(f"Backend: {type(backend).__name__}")
+        self.stdout.write(f"Entries: {size if size is not None else 'unknown'}")
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.jobs import recover_stale_generation_jobs, run_generation_job
+from questions.models import GenerationJob
+
+
+class Command(BaseCommand):
+    help = "Runs pending question generation jobs in a standalone local worker process (no broker needed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Process the jobs that are currently pending, then exit.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when no job is pending.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Waiting for generation jobs...")
+        while True:
+            # Pending jobs are picked up below
+            recover_stale_generation_jobs(requeue_pending=False)
+            job_ids = list(
+                GenerationJob.objects.filter(status='PENDING').order_by('created_at').values_list('id', flat=True)
+            )
+            for job_id in job_ids:
+                # run_generation_job claims the job atomically, so several workers can share the queue
+                run_generation_job(job_id)
+
+            if options['once']:
+                break
+            if not job_ids:
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0005_source_source_metadata_alter_source_file_and_more'),
+        ('questions', '0002_question_page_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('RUNNING', 'RUNNING'), ('SUCCEEDED', 'SUCCEEDED'), ('FAILED', 'FAILED'), ('CANCELLED', 'CANCELLED')], default='PENDING', max_length=10)),
+                ('parameters', models.JSONField(blank=True, null=True)),
+                ('total_pages', models.IntegerField(default=0)),
+                ('completed_pages', models.IntegerField(default=0)),
+                ('page_progress', models.JSONField(blank=True, default=dict)),
+                ('question_count', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to='sources.source')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='generation_job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='questions', to='questions.generationjob'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_generationjob_question_generation_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# The SQL is kept here rather than imported from sources.search, so that applied migrations
+# do not change when the search code does.
+TOKENIZE = "porter unicode61 remove_diacritics 2"
+SEARCH_CONFIG = 'english'
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Holds its own copy of the text (rowid = question id); maintained from code, not triggers
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS questions_question_fts USING fts5("
+            f"question_text, explanation, tokenize='{TOKENIZE}')"
+        )
+        schema_editor.execute(
+            "INSERT INTO questions_question_fts(rowid, question_text, explanation) "
+            "SELECT id, question_text, coalesce(explanation, '') FROM questions_question"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE questions_question ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(question_text, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(explanation, '')), 'B')) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS questions_question_search_idx ON questions_question USING GIN (search_vector)"
+        )
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS questions_question_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS questions_question_search_idx")
+        schema_editor.execute("ALTER TABLE questions_question DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_question_content_fingerprint'),
+        ('sources', '0013_source_page_search_index'),
+    ]
+
+    # Full-text index of question_text and explanation: an FTS5 table on SQLite, a generated
+    # tsvector column with a GIN index on PostgreSQL (see sources/search.py).
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_question_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['source', 'page_number'], name='question_source_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['source', 'created_at', 'id'], name='question_source_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['created_at', 'id'], name='question_created_idx'),
+        ),
+    ]
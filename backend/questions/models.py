@@ -14,6 +14,49 @@ class Question(models.Model):
     explanation = models.TextField(blank=True, null=True)
     page_number = models.IntegerField(blank=True, null=True) # Page number from which the question was generated
     created_at = models.DateTimeField(auto_now_add=True)
+    # The background generation job that created this question, if any
+    generation_job = models.ForeignKey('GenerationJob', related_name='questions', on_delete=models.SET_NULL, blank=True, null=True)
+    # SHA-256 of the page text the question was generated from, used to detect stale pages
+    content_fingerprint = models.CharField(max_length=64, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Per-page lookups and replacement during generation, page range filters
+            models.Index(fields=['source', 'page_number'], name='question_source_page_idx'),
+            # Keyset pagination (newest first) of all questions and of one source's questions
+            models.Index(fields=['source', 'created_at', 'id'], name='question_source_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='question_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Q: {self.question_text[:50]}... (Source: {self.source.id})"
+
+class GenerationJob(models.Model):
+    STATUS_CHOICES = (
+        ('PENDING', 'PENDING'),
+        ('RUNNING', 'RUNNING'),
+        ('SUCCEEDED', 'SUCCEEDED'),
+        ('FAILED', 'FAILED'),
+        ('CANCELLED', 'CANCELLED'),
+    )
+    ACTIVE_STATUSES = ('PENDING', 'RUNNING')
+
+    source = models.ForeignKey(Source, related_name='generation_jobs', on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    # Generation parameters as sent to the generate_questions endpoint
+    parameters = models.JSONField(blank=True, null=True)
+    total_pages = models.IntegerField(default=0)
+    completed_pages = models.IntegerField(default=0)
+    # Per-page state keyed by 1-indexed page number, e.g. {"3": {"status": "done", "questions": 5}}
+    page_progress = models.JSONField(default=dict, blank=True)
+    question_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    cancel_requested = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Bumped on every progress update, used to detect jobs orphaned by a dead worker
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Q: {self.question_text[:50]}... (Source: {self.source.id})"
\ No newline at end of file
+        return f"Generation job {self.id} for source {self.source_id} ({self.status})"
@@ -0,0 +1,101 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_page(queryset, page_size, created_at=None, pk=None, reverse=False):
+    """
+    Returns up to page_size + 1 questions after (created_at, pk) in newest-first order, or
+    before it with reverse (then oldest-first). The extra row tells whether there is more.
+    The query is a range scan on the (created_at, id) indexes however deep the position is,
+    unlike OFFSET, which reads and discards every row before the page.
+    """
+    if reverse:
+        queryset = queryset.order_by('created_at', 'id')
+        if created_at is not None:
+            # created_at__gte bounds the index range, the Q breaks ties between equal timestamps
+            queryset = queryset.filter(created_at__gte=created_at).filter(Q(created_at__gt=created_at) | Q(id__gt=pk))
+    else:
+        queryset = queryset.order_by('-created_at', '-id')
+        if created_at is not None:
+            queryset = queryset.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+    return list(queryset[:page_size + 1])
+
+
+class QuestionKeysetPagination(BasePagination):
+    """
+    Keyset pagination for questions, newest first, on (created_at, id). Like the sources'
+    OptInCursorPagination it only applies with ?page_size= or ?cursor=, so the frontend keeps
+    getting a plain array. The response is {'next', 'previous', 'results'} with opaque cursors.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_size_query_param not in request.query_params and self.cursor_query_param not in request.query_params:
+            return None
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            created_at, pk, reverse = None, None, False
+        else:
+            created_at, pk, reverse = cursor
+
+        rows = keyset_page(queryset, page_size, created_at, pk, reverse)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going backwards there is always a next page (the one we came from), and vice versa
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else cursor is not None
+        self.next_cursor = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], True) if rows and has_previous else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, question, reverse):
+        position = {'t': question.created_at.isoformat(), 'i': question.id}
+        if reverse:
+            position['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            created_at = parse_datetime(position['t'])
+            pk = int(position['i'])
+        except (ValueError, TypeError, KeyError, UnicodeEncodeError):
+            raise NotFound("Invalid cursor.")
+        if created_at is None:
+            raise NotFound("Invalid cursor.")
+        return created_at, pk, bool(position.get('r'))
+
+    def get_link(self, cursor):
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor) if cursor else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data,
+        })
@@ -1,8 +1,15 @@
 from rest_framework import serializers
-from .models import Question
+from .models import Question, GenerationJob
 
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = ['id', 'source', 'question_text', 'options', 'correct_answer', 'explanation', 'page_number', 'created_at']
-        read_only_fields = ['id', 'created_at']  # Removed 'source' from here
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']  # Removed 'source' from here
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'source', 'status', 'parameters', 'total_pages', 'completed_pages', 'page_progress',
+                  'question_count', 'error', 'cancel_requested', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
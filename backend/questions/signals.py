@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from sources.search import index_questions
+
+from .models import Question
+
+
+# bulk_create sends no signals; save_generated_questions indexes those questions itself.
+# Deletes are unindexed in bulk by the callers (see sources.search), not per row.
+@receiver(post_save, sender=Question)
+def index_saved_question(sender, instance, **kwargs):
+    index_questions([instance])
@@ -0,0 +1,435 @@
+import json
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from sources.models import Source
+from sources.pages import save_source_pages
+
+from . import jobs, llm_backends, llm_gateway, utils
+from .chunking import CHARS_PER_TOKEN
+from .json_salvage import salvage_json_array
+from .llm_cache import DjangoCacheBackend
+from .llm_gateway import CircuitBreaker, LLMUnavailableError, TokenBucketRateLimiter, parse_reset_duration
+from .models import GenerationJob, Question
+from .utils import (
+    generate_questions_batch, generate_questions_from_text_content, get_window_tokens, validate_question_structure
+)
+
+CORPUS_PATH = Path(__file__).resolve().parent / 'corpus' / 'llm_responses.json'
+
+
+class JsonSalvageCorpusTests(SimpleTestCase):
+    """Runs the recorded malformed LLM responses (see benchmark_json_salvage) through the salvage parser."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(CORPUS_PATH, encoding='utf-8') as f:
+            cls.cases = json.load(f)
+
+    def test_recovers_expected_question_counts(self):
+        for case in self.cases:
+            with self.subTest(case=case['name']):
+                questions = salvage_json_array(case['response']).objects
+                valid = [question for question in questions if validate_question_structure(question)[0]]
+                self.assertEqual(len(valid), case['expected_questions'], case['description'])
+
+    def test_keeps_question_text_of_valid_json_unchanged(self):
+        # Whitespace inside strings (e.g. code indentation) must survive parsing
+        for case in self.cases:
+            try:
+                original = json.loads(case['response'])
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(original, list):
+                continue
+            with self.subTest(case=case['name']):
+                questions = salvage_json_array(case['response']).objects
+                self.assertEqual(
+                    [question.get('question_text') for question in questions],
+                    [question.get('question_text') for question in original],
+                )
+
+    def test_reports_truncated_and_complete_responses(self):
+        cases = {case['name']: case for case in self.cases}
+        self.assertTrue(salvage_json_array(cases['clean_array']['response']).complete)
+        self.assertTrue(salvage_json_array(cases['truncated_max_tokens']['response']).truncated)
+        self.assertEqual(salvage_json_array(cases['no_json']['response']).objects, [])
+
+
+class RecordingExecutor:
+    """Stands in for the job pool: records submissions instead of running them."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+
+@override_settings(GENERATION_JOBS_IN_PROCESS=True, GENERATION_JOB_STALE_AFTER=600)
+class StaleGenerationJobTests(TestCase):
+
+    def setUp(self):
+        self.source = Source.objects.create(source_type='TXT')
+        self.executor = RecordingExecutor()
+        patcher = mock.patch.object(jobs, 'get_job_executor', return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(jobs._queued_job_ids.clear)
+
+    def make_job(self, status, age_seconds):
+        job = GenerationJob.objects.create(source=self.source, status=status)
+        stamp = timezone.now() - timedelta(seconds=age_seconds)
+        GenerationJob.objects.filter(id=job.id).update(created_at=stamp, updated_at=stamp)
+        return job
+
+    def test_orphaned_pending_job_is_queued_again(self):
+        orphaned = self.make_job('PENDING', 3600)
+        self.make_job('PENDING', 10)  # Just created
+        jobs.recover_stale_generation_jobs()
+        self.assertEqual(self.executor.submitted, [(orphaned.id,)])
+
+    def test_pending_job_queued_by_this_process_is_not_queued_twice(self):
+        job = self.make_job('PENDING', 3600)
+        jobs._queued_job_ids.add(job.id)
+        jobs.recover_stale_generation_jobs()
+        jobs.recover_stale_generation_jobs(requeue_pending=False)
+        self.assertEqual(self.executor.submitted, [])
+
+    def test_running_job_without_progress_fails(self):
+        job = self.make_job('RUNNING', 3600)
+        jobs.recover_stale_generation_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+
+
+def full_page_text(label):
+    """About a prompt's worth of text, so that pages are not packed into one LLM request."""
+    sentence = f"{label} explains how cells convert nutrients into usable energy. "
+    return (sentence * (get_window_tokens() * CHARS_PER_TOKEN // len(sentence) + 1)).strip()
+
+
+@override_settings(
+    LLM_BACKEND={'BACKEND': 'fake', 'OPTIONS': {'latency': 0.02, 'latency_jitter': 0.02, 'seed': 1}},
+    LLM_RESPONSE_CACHE={'BACKEND': 'none'},
+)
+class GenerationTestCase(TestCase):
+    """Runs generation against the fake LLM backend (no network access, no response cache)."""
+
+    def setUp(self):
+        # The backend is created from the settings on first use
+        llm_backends._backend = None
+        self.addCleanup(setattr, llm_backends, '_backend', None)
+
+    def make_pdf_source(self, page_texts):
+        source = Source.objects.create(source_type='PDF', page_count=len(page_texts))
+        save_source_pages(source.id, page_texts)
+        return source
+
+    def generate(self, source, **kwargs):
+        kwargs.setdefault('questions_per_page', 2)
+        return generate_questions_from_text_content(source_id=source.id, **kwargs)
+
+
+class ConcurrentGenerationTests(GenerationTestCase):
+
+    def test_questions_come_back_in_page_order(self):
+        source = self.make_pdf_source([full_page_text(f"Page {i + 1}") for i in range(8)])
+        questions = self.generate(source, questions_per_page=3, max_in_flight=4)
+        self.assertEqual([question['page_number'] for question in questions], [n for n in range(1, 9) for _ in range(3)])
+        self.assertEqual(llm_backends.get_llm_backend().calls, 8)
+
+    def test_total_question_limit_holds_under_concurrency(self):
+        source = self.make_pdf_source([full_page_text(f"Page {i + 1}") for i in range(6)])
+        questions = self.generate(source, questions_per_page=3, total_question_limit=7, max_in_flight=4)
+        self.assertEqual([question['page_number'] for question in questions], [1, 1, 1, 2, 2, 2, 3])
+        self.assertEqual(Question.objects.filter(source=source).count(), 7)
+
+    def test_empty_pages_are_skipped(self):
+        source = self.make_pdf_source([full_page_text("Page 1"), "", full_page_text("Page 3")])
+        questions = self.generate(source, max_in_flight=4)
+        self.assertEqual(sorted({question['page_number'] for question in questions}), [1, 3])
+
+
+class IncrementalGenerationTests(GenerationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pages = [full_page_text(f"Page {i + 1}") for i in range(3)]
+        self.source = self.make_pdf_source(self.pages)
+        self.generate(self.source)
+        self.original_ids = self.question_ids_by_page()
+
+    def question_ids_by_page(self):
+        ids = {}
+        for question_id, page_number in Question.objects.filter(source=self.source).values_list('id', 'page_number'):
+            ids.setdefault(page_number, set()).add(question_id)
+        return ids
+
+    def test_unchanged_pages_are_kept(self):
+        questions = self.generate(self.source, incremental=True)
+        self.assertEqual(self.question_ids_by_page(), self.original_ids)
+        # The kept questions are returned too, in page order
+        self.assertEqual([question['page_number'] for question in questions], [1, 1, 2, 2, 3, 3])
+
+    def test_changed_page_is_replaced(self):
+        self.pages[1] = full_page_text("Revised page 2")
+        save_source_pages(self.source.id, self.pages)
+        self.generate(self.source, incremental=True)
+        ids = self.question_ids_by_page()
+        self.assertEqual(ids[1], self.original_ids[1])
+        self.assertEqual(ids[3], self.original_ids[3])
+        self.assertEqual(len(ids[2]), 2)
+        self.assertFalse(ids[2] & self.original_ids[2])
+
+    def test_page_with_too_few_questions_is_regenerated(self):
+        self.generate(self.source, incremental=True, questions_per_page=3)
+        self.assertEqual({page: len(ids) for page, ids in self.question_ids_by_page().items()}, {1: 3, 2: 3, 3: 3})
+
+    def test_pages_outside_the_selection_are_kept_only_when_incremental(self):
+        self.generate(self.source, pages_to_generate_str="2", incremental=True)
+        ids = self.question_ids_by_page()
+        self.assertEqual((ids[1], ids[3]), (self.original_ids[1], self.original_ids[3]))
+
+        self.generate(self.source, pages_to_generate_str="2")
+        self.assertEqual(set(self.question_ids_by_page()), {2})
+
+
+def question_json(stem):
+    return {
+        "question_text": stem,
+        "options": {"A": "Actin", "B": "Myosin", "C": "Keratin", "D": "Collagen"},
+        "correct_answer": "A",
+        "explanation": "Actin is the answer.",
+    }
+
+
+class ScriptedBackend(llm_backends.LLMBackend):
+    """Answers each call with the next of the given response texts and records the prompts."""
+
+    def __init__(self, responses):
+        super().__init__(model='scripted')
+        self.responses = list(responses)
+        self.requests = []
+
+    def chat_completion(self, *, messages, model=None, timeout=None, **params):
+        self.requests.append(messages)
+        message = SimpleNamespace(role='assistant', content=self.responses.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)], usage=None)
+
+
+@override_settings(LLM_RESPONSE_CACHE={'BACKEND': 'none'})
+class TopUpRetryTests(SimpleTestCase):
+
+    def generate(self, responses, num_questions=3):
+        backend = ScriptedBackend(responses)
+        with mock.patch.object(utils, 'get_llm_backend', return_value=backend):
+            questions = generate_questions_batch("Cells contain actin.", num_questions, 1, 'PDF')
+        return questions, backend.requests
+
+    def test_partial_response_is_kept_and_only_the_shortfall_is_requested(self):
+        first = json.dumps([question_json("First?"), question_json("Second?"), question_json("Third?")])
+        truncated = first[:first.rindex('{') + 20]  # Cut off inside the third question
+        questions, requests = self.generate([truncated, json.dumps([question_json("Third?")])])
+
+        self.assertEqual([question['question_text'] for question in questions], ["First?", "Second?", "Third?"])
+        self.assertEqual(len(requests), 2)
+        self.assertIn("exactly 1 multiple-choice", requests[1][0]['content'])
+        # The top-up prompt lists the accepted questions so they are not repeated
+        self.assertIn("- First?\n- Second?", requests[1][1]['content'])
+
+    def test_top_up_duplicates_are_dropped(self):
+        questions, requests = self.generate([
+            json.dumps([question_json("First?"), question_json("Second?")]),
+            json.dumps([question_json("  second?"), question_json("Third?")]),
+        ])
+        self.assertEqual([question['question_text'] for question in questions], ["First?", "Second?", "Third?"])
+        self.assertEqual(len(requests), 2)
+
+    def test_gives_up_after_three_attempts_with_what_was_accepted(self):
+        questions, requests = self.generate([json.dumps([question_json("First?")]), "Sorry, I cannot help.", "[{"])
+        self.assertEqual([question['question_text'] for question in questions], ["First?"])
+        self.assertEqual(len(requests), 3)
+
+
+class FakeClock:
+    """Replaces time.monotonic and time.sleep in the gateway; sleeping advances the clock."""
+
+    def __init__(self, test_case):
+        self.now = 1000.0
+        self.slept = 0.0
+        patcher = mock.patch.object(llm_gateway, 'time', SimpleNamespace(monotonic=self.monotonic, sleep=self.sleep))
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(self)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def open_circuit(self):
+        for _ in range(3):
+            self.assertFalse(self.breaker.before_call())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()  # Resets the count
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(LLMUnavailableError):
+            self.breaker.before_call()
+
+    def test_half_open_lets_one_trial_through(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertTrue(self.breaker.before_call())
+        with self.assertRaises(LLMUnavailableError):
+            self.breaker.before_call()  # Only one trial at a time
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertFalse(self.breaker.before_call())
+
+    def test_failed_trial_reopens_the_circuit(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.before_call())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.clock.now += 29
+        with self.assertRaises(LLMUnavailableError):
+            self.breaker.before_call()
+
+    def test_released_trial_lets_the_next_call_try(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.before_call())
+        self.breaker.release_trial()  # E.g. the trial was rate limited
+        self.assertTrue(self.breaker.before_call())
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(self)
+
+    def test_requests_beyond_the_bucket_wait_for_the_refill(self):
+        limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=100_000)
+        for _ in range(60):
+            limiter.acquire(10)
+        self.assertEqual(self.clock.slept, 0)
+        limiter.acquire(10)
+        # One request per second is refilled
+        self.assertAlmostEqual(self.clock.slept, 1.0, delta=0.06)
+
+    def test_tokens_are_limited_too(self):
+        limiter = TokenBucketRateLimiter(requests_per_minute=1000, tokens_per_minute=6000)
+        limiter.acquire(6000)
+        limiter.acquire(3000)
+        self.assertAlmostEqual(self.clock.slept, 30.0, delta=0.06)
+
+    def test_call_larger_than_the_bucket_waits_for_a_full_bucket(self):
+        limiter = TokenBucketRateLimiter(requests_per_minute=1000, tokens_per_minute=6000)
+        limiter.acquire(100)
+        limiter.acquire(50_000)
+        self.assertAlmostEqual(self.clock.slept, 1.0, delta=0.06)
+
+    def test_rate_limit_headers_block_until_reset(self):
+        limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=100_000)
+        limiter.update_from_headers({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '7.5s'})
+        limiter.acquire(10)
+        self.assertAlmostEqual(self.clock.slept, 7.5, delta=0.06)
+
+    def test_parse_reset_duration(self):
+        self.assertEqual(parse_reset_duration('2m59.5s'), 179.5)
+        self.assertEqual(parse_reset_duration('450ms'), 0.45)
+        self.assertEqual(parse_reset_duration('12'), 12.0)
+        self.assertIsNone(parse_reset_duration('soon'))
+
+
+class QuestionKeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.source = Source.objects.create(source_type='TXT')
+        other_source = Source.objects.create(source_type='TXT')
+        for i in range(7):
+            Question.objects.create(
+                source=self.source if i != 3 else other_source, page_number=i + 1, question_text=f"Question {i + 1}?",
+                options={"A": "a", "B": "b", "C": "c", "D": "d"}, correct_answer="A", explanation="A.",
+            )
+        # Several questions saved in the same instant, as bulk_create does; ids break the ties
+        Question.objects.filter(page_number__in=[2, 3, 4, 5]).update(created_at=timezone.now())
+        self.newest_first = list(Question.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [question['id'] for question in response.data['results']], response.data['next'], response.data['previous']
+
+    def test_pages_forward_and_back(self):
+        first, next_url, previous_url = self.get_page('/api/questions/?page_size=3')
+        self.assertEqual((first, previous_url), (self.newest_first[:3], None))
+        second, next_url, previous_url = self.get_page(next_url)
+        self.assertEqual(second, self.newest_first[3:6])
+        third, last_next_url, third_previous_url = self.get_page(next_url)
+        self.assertEqual((third, last_next_url), (self.newest_first[6:], None))
+
+        back, _, _ = self.get_page(third_previous_url)
+        self.assertEqual(back, second)
+        back, _, before_first_url = self.get_page(previous_url)
+        self.assertEqual((back, before_first_url), (first, None))
+
+    def test_cursor_keeps_the_filters(self):
+        ids, next_url, _ = self.get_page(f'/api/questions/?source_id={self.source.id}&page_size=4')
+        more, last_next_url, _ = self.get_page(next_url)
+        expected = list(Question.objects.filter(source=self.source).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual((ids + more, last_next_url), (expected, None))
+
+    def test_plain_list_without_pagination_parameters(self):
+        response = self.client.get('/api/questions/')
+        self.assertEqual([question['id'] for question in response.data], self.newest_first)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/questions/?cursor=bm90LWpzb24').status_code, 404)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm-cache-tests'}})
+class DjangoCacheBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.backend = DjangoCacheBackend(alias='default')
+
+    def test_clear_only_drops_llm_responses(self):
+        self.backend.set('prompt-key', [{'question_text': 'Cached?'}])
+        self.cache.set('session:abc', 'site data')
+        self.assertEqual(self.backend.get('prompt-key'), [{'question_text': 'Cached?'}])
+
+        self.backend.clear()
+        self.assertIsNone(self.backend.get('prompt-key'))
+        self.assertEqual(self.cache.get('session:abc'), 'site data')
+
+        self.backend.set('prompt-key', [{'question_text': 'Fresh?'}])
+        self.assertEqual(self.backend.get('prompt-key'), [{'question_text': 'Fresh?'}])
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import QuestionViewSet
+from .views import QuestionViewSet, GenerationJobViewSet
 
 router = DefaultRouter()
+# Registered before the question routes so that 'jobs/' is not captured as a question pk
+router.register(r'jobs', GenerationJobViewSet, basename='generation-job')
 router.register(r'', QuestionViewSet, basename='question')
 
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
@@ -1,17 +1,17 @@
 from .models import Question, Source
 from .serializers import QuestionSerializer
-import groq
-import json
-import os
+from .chunking import CHARS_PER_TOKEN, allocate_questions, pack_pages, split_into_windows
+from .json_salvage import salvage_json_array
+from .llm_cache import make_cache_key, get_cached_response, store_cached_response, get_cache_stats
+from .llm_backends import get_llm_backend
+from .llm_gateway import LLMUnavailableError
+from sources.pages import load_page_stats, load_page_texts
+from sources.search import index_questions, unindex_question_queryset
+import hashlib
 import re
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Initialize Groq client
-groq_api_key = os.getenv('GROQ_API_KEY')
-groq_client = groq.Client(api_key=groq_api_key)
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
 
 def parse_page_ranges(pages_str):
     """Parses a page string like "1-3,5,7-8" into a list of page numbers (0-indexed)."""
@@ -35,26 +35,6 @@ def parse_page_ranges(pages_str):
         return []
     return sorted(list(pages_to_generate))
 
-def clean_json_response(response_content):
-    """Clean common JSON formatting issues from AI responses."""
-    # Remove any text before the first [ and after the last ]
-    json_match = re.search(r'\[\s*{.*}\s*\]', response_content, re.DOTALL)
-    if json_match:
-        response_content = json_match.group(0)
-    
-    # Clean up common issues
-    response_content = response_content.strip()
-    
-    # Remove trailing commas before closing braces and brackets
-    response_content = re.sub(r',(\s*[}\]])', r'\1', response_content)
-    
-    # Fix spacing issues
-    response_content = re.sub(r'\s+', ' ', response_content)
-    response_content = response_content.replace('{ ', '{').replace(' }', '}')
-    response_content = response_content.replace('[ ', '[').replace(' ]', ']')
-    
-    return response_content
-
 def validate_question_structure(question):
     """Validate that a question has the required structure."""
     required_fields = ['question_text', 'options', 'correct_answer', 'explanation']
@@ -91,22 +71,39 @@ def validate_question_structure(question):
     
     return True, "Valid"
 
-def generate_questions_batch(text_content, num_questions, source_id, source_type, batch_number=None):
+def build_generation_messages(text_content, num_questions, accepted_question_texts=None, page_quotas=None):
     """
-    Generate a batch of questions from text content.
-    Returns a list of valid question dictionaries.
+    Builds the chat messages asking for num_questions questions about text_content.
+    accepted_question_texts: Stems of questions already accepted for this batch; a top-up
+        request lists them so the model does not repeat them.
+    page_quotas: For packed pages, a {page_number: num_questions} dict. The text is then expected
+        to contain [Page N] markers, and each question must say which page it is based on.
     """
-    
-    # Limit text length to prevent overwhelming the AI
-    max_text_length = 3000
-    if len(text_content) > max_text_length:
-        text_content = text_content[:max_text_length] + "..."
-        print(f"Info: Truncated text for {source_type} source to {max_text_length} characters")
+    already_accepted = ""
+    if accepted_question_texts:
+        accepted_list = "\n".join(f"- {question_text}" for question_text in accepted_question_texts)
+        already_accepted = f"""
+THESE QUESTIONS HAVE ALREADY BEEN ACCEPTED. Do NOT repeat them or ask about the same facts:
+{accepted_list}
+"""
+
+    pages_instructions = ""
+    page_number_example = ""
+    if page_quotas:
+        quota_list = "\n".join(
+            f"- Page {page_number}: {count} question{'s' if count != 1 else ''}"
+            for page_number, count in page_quotas.items()
+        )
+        pages_instructions = f"""
+PAGES:
+The text is split into pages, each starting with a marker like [Page {next(iter(page_quotas))}].
+Generate this many questions for each page, using only that page's text:
+{quota_list}
+Every question MUST include a "page_number" field with the number of the page it is based on.
+"""
+        page_number_example = f"""
+        "page_number": {next(iter(page_quotas))},"""
 
-    # Log generation attempt
-    batch_info = f" (batch {batch_number})" if batch_number else ""
-    print(f"Generating exactly {num_questions} questions for {source_type} source {source_id}{batch_info} using Groq API.")
-    
     # Enhanced prompt with better constraints
     prompt = f"""
 You are an expert question generator. Based on the following text, generate EXACTLY {num_questions} multiple-choice questions.
@@ -121,7 +118,7 @@ CRITICAL REQUIREMENTS:
 7. Make sure incorrect options are plausible but clearly wrong
 8. Do not generate duplicate questions
 9. Avoid What is the output of the program type questions if there is no code in your question
-
+{already_accepted}{pages_instructions}
 RESPONSE FORMAT REQUIREMENTS:
 - Return ONLY a valid JSON array
 - No additional text, no markdown formatting, no code blocks
@@ -129,7 +126,7 @@ RESPONSE FORMAT REQUIREMENTS:
 
 Example format (generate {num_questions} questions like this):
 [
-    {{
+    {{{page_number_example}
         "question_text": "What is the main topic discussed in the text?",
         "options": {{
             "A": "First option",
@@ -147,107 +144,318 @@ TEXT TO ANALYZE:
 
 Generate exactly {num_questions} questions in valid JSON format:
 """
+
+    return [
+        {
+            "role": "system", 
+            "content": f"You are an expert question generator. You MUST generate exactly {num_questions} multiple-choice questions in valid JSON format. Each question must have exactly 4 options (A, B, C, D) and one correct answer. Return only valid JSON array, no other text."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def normalize_question_text(question_text):
+    """Normalizes a question stem for duplicate detection."""
+    return re.sub(r'\s+', ' ', question_text).strip().lower()
+
+def generate_questions_batch(text_content, num_questions, source_id, source_type, batch_number=None, use_cache=True, page_quotas=None):
+    """
+    Generate a batch of questions from text content.
+    Valid questions from a partial response are kept; retries only ask for the shortfall.
+    use_cache: When False, skips the LLM response cache lookup ("fresh" generation); the new result is still cached.
+    page_quotas: For several packed pages, a {page_number: num_questions} dict. Every accepted
+        question then carries the page_number it was generated for.
+    Returns a list of valid question dictionaries.
+    """
     
+    # Limit text length to prevent overwhelming the AI
+    max_text_length = get_window_tokens() * CHARS_PER_TOKEN
+    if len(text_content) > max_text_length:
+        text_content = text_content[:max_text_length] + "..."
+        print(f"Info: Truncated text for {source_type} source to {max_text_length} characters")
+
+    # Log generation attempt
+    batch_info = f" (batch {batch_number})" if batch_number else ""
+    backend = get_llm_backend()
+    model = backend.model
+    print(f"Generating exactly {num_questions} questions for {source_type} source {source_id}{batch_info} using {model}.")
+    
+    messages = build_generation_messages(text_content, num_questions, page_quotas=page_quotas)
+    sampling = {
+        'temperature': 0.2,  # Lower temperature for more consistent output
+        'max_tokens': 2000,  # Adequate for the required number of questions
+        'top_p': 0.9,
+    }
+
+    # Identical prompts with identical parameters are answered from the response cache
+    cache_key = make_cache_key(model, messages, num_questions, sampling)
+    if use_cache:
+        cached_questions = get_cached_response(cache_key)
+        if cached_questions is not None:
+            print(f"Cache hit: reusing {len(cached_questions)} questions for {source_type} source {source_id}{batch_info}")
+            return cached_questions
+
     max_retries = 3
-    generated_questions = None
+    accepted_questions = []
+    accepted_texts = set()
+    accepted_per_page = dict.fromkeys(page_quotas, 0) if page_quotas else None
+    total_tokens_used = 0
     
     for attempt in range(max_retries):
+        shortfall = num_questions - len(accepted_questions)
+        if shortfall <= 0:
+            break
+
+        # After a partial response, only ask for the missing questions
+        if attempt > 0:
+            print(f"Requesting {shortfall} more questions for {source_type} source{batch_info} (attempt {attempt + 1})")
+            remaining_quotas = None
+            if page_quotas:
+                remaining_quotas = {
+                    page_number: count - accepted_per_page[page_number]
+                    for page_number, count in page_quotas.items()
+                    if count > accepted_per_page[page_number]
+                }
+            messages = build_generation_messages(
+                text_content, shortfall, [question['question_text'] for question in accepted_questions], remaining_quotas
+            )
+
         try:
-            # Call Groq API with more conservative settings
-            completion = groq_client.chat.completions.create(
-                model="meta-llama/llama-4-scout-17b-16e-instruct",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": f"You are an expert question generator. You MUST generate exactly {num_questions} multiple-choice questions in valid JSON format. Each question must have exactly 4 options (A, B, C, D) and one correct answer. Return only valid JSON array, no other text."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,  # Lower temperature for more consistent output
-                max_tokens=2000,  # Adequate for the required number of questions
-                top_p=0.9,
-                stream=False
+            # Call the configured LLM backend (Groq via the shared gateway, or the local fake)
+            completion = backend.chat_completion(
+                model=model,
+                messages=messages,
+                stream=False,
+                **sampling
             )
+
+            # Log token usage per attempt so the cost of retries can be measured
+            usage = getattr(completion, 'usage', None)
+            if usage is not None:
+                total_tokens_used += usage.total_tokens or 0
+                print(f"Token usage for {source_type} source {source_id}{batch_info}, attempt {attempt + 1}: "
+                      f"prompt={usage.prompt_tokens}, completion={usage.completion_tokens}, total={usage.total_tokens} "
+                      f"(requested {shortfall} questions)")
             
             # Extract the generated questions from the response
             response_content = completion.choices[0].message.content.strip()
             
-            # Clean the JSON response
-            response_content = clean_json_response(response_content)
+            # Salvage every complete question object, even from truncated or partly corrupted output
+            salvage = salvage_json_array(response_content)
+            if not salvage.complete:
+                print(f"Warning: Malformed JSON response for {source_type} source{batch_info}, attempt {attempt + 1}: "
+                      f"salvaged {len(salvage.objects)} objects (truncated={salvage.truncated}, skipped={salvage.skipped})")
             
-            # Parse the JSON response
             try:
-                generated_questions = json.loads(response_content)
+                generated_questions = salvage.objects
+                if not generated_questions:
+                    raise ValueError("No JSON objects found in the response")
                 
-                # Validate that it's a list
-                if not isinstance(generated_questions, list):
-                    raise ValueError(f"Expected list, got {type(generated_questions)}")
-                
-                # Validate each question structure
-                valid_questions = []
+                # Validate each question structure and keep the new, valid ones
+                newly_accepted = 0
                 for i, question in enumerate(generated_questions):
                     is_valid, error_msg = validate_question_structure(question)
-                    if is_valid:
-                        valid_questions.append(question)
-                    else:
+                    if not is_valid:
                         print(f"Warning: Question {i+1} for {source_type} source{batch_info} is invalid: {error_msg}")
-                
-                generated_questions = valid_questions
-                
-                # Check if we got the expected number of questions
-                if len(generated_questions) != num_questions:
-                    print(f"Warning: Expected {num_questions} questions, got {len(generated_questions)} valid questions for {source_type} source{batch_info} (attempt {attempt + 1})")
-                    
-                    # If we got fewer questions than expected and this isn't the last attempt, retry
-                    if len(generated_questions) < num_questions and attempt < max_retries - 1:
-                        print(f"Retrying to get exactly {num_questions} questions...")
                         continue
+                    normalized_text = normalize_question_text(question['question_text'])
+                    if normalized_text in accepted_texts:
+                        print(f"Warning: Question {i+1} for {source_type} source{batch_info} duplicates an accepted question")
+                        continue
+                    if len(accepted_questions) >= num_questions:
+                        break
+                    if page_quotas:
+                        # Packed pages: the question must name one of the pages that still needs questions
+                        try:
+                            page_number = int(question.get('page_number'))
+                        except (TypeError, ValueError):
+                            print(f"Warning: Question {i+1} for {source_type} source{batch_info} has no valid page_number")
+                            continue
+                        if accepted_per_page.get(page_number, 0) >= page_quotas.get(page_number, 0):
+                            print(f"Warning: Question {i+1} for {source_type} source{batch_info} is for page {page_number}, which needs no more questions")
+                            continue
+                        question['page_number'] = page_number
+                        accepted_per_page[page_number] += 1
+                    accepted_questions.append(question)
+                    accepted_texts.add(normalized_text)
+                    newly_accepted += 1
                 
-                if generated_questions:  # If we have at least some valid questions
-                    break
-                else:
-                    raise ValueError("No valid questions generated")
+                # Check if we got the expected number of questions
+                if len(accepted_questions) < num_questions:
+                    print(f"Warning: Expected {num_questions} questions, have {len(accepted_questions)} valid questions for {source_type} source{batch_info} after attempt {attempt + 1} ({newly_accepted} accepted from this response)")
                     
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing failed for {source_type} source{batch_info}, attempt {attempt + 1}: {str(e)}")
-                if attempt == max_retries - 1:
-                    print(f"Raw response: {response_content[:500]}...")  # Limit output
-                continue
             except ValueError as e:
                 print(f"Question validation failed for {source_type} source{batch_info}, attempt {attempt + 1}: {str(e)}")
+                if attempt == max_retries - 1:
+                    print(f"Raw response: {response_content[:500]}...")  # Limit output
                 continue
                 
+        except LLMUnavailableError as e:
+            # The gateway already retried with backoff; further attempts would be rejected too
+            print(f"Skipping {source_type} source{batch_info}: {str(e)}")
+            break
         except Exception as e:
             print(f"Error generating questions for {source_type} source{batch_info}, attempt {attempt + 1}: {str(e)}")
             if attempt == max_retries - 1:
                 print(f"Failed to generate questions for {source_type} source{batch_info} after {max_retries} attempts")
             continue
+
+    if total_tokens_used:
+        print(f"Total token usage for {source_type} source {source_id}{batch_info}: {total_tokens_used} tokens for {len(accepted_questions)} questions")
     
-    return generated_questions if generated_questions else []
+    # Only complete batches are cached, so a flaky response is not replayed forever
+    if len(accepted_questions) >= num_questions:
+        store_cached_response(cache_key, accepted_questions)
 
-def generate_questions_from_text_content(*, source_text_content=None, questions_per_page=None, pages_to_generate_str=None, total_question_limit=None, source_id=None):
+    return accepted_questions
+
+def get_window_tokens():
+    """Returns the token budget for the source text sent with a single generation prompt."""
+    try:
+        return max(100, int(getattr(settings, 'QUESTION_GENERATION_WINDOW_TOKENS', 750)))
+    except (TypeError, ValueError):
+        print("Warning: QUESTION_GENERATION_WINDOW_TOKENS must be an integer. Falling back to 750.")
+        return 750
+
+def get_max_in_flight():
+    """Returns the configured maximum number of concurrent LLM requests per generation run."""
+    try:
+        return max(1, int(getattr(settings, 'QUESTION_GENERATION_MAX_IN_FLIGHT', 4)))
+    except (TypeError, ValueError):
+        print("Warning: QUESTION_GENERATION_MAX_IN_FLIGHT must be an integer. Falling back to 4.")
+        return 4
+
+def iter_generated_batches(batches, source_id, source_type, max_in_flight=None, use_cache=True):
     """
-    Generates questions from the given text_content using the Groq API with llama-4-scout model.
-    source_text_content: List of strings (text per page for PDF, list with one string for others).
-    questions_per_page: Max number of questions to generate per selected page.
-    pages_to_generate_str: Optional string indicating page ranges (e.g., "1-3,5"). For non-PDFs, this is ignored.
-    total_question_limit: Optional overall limit on questions.
-    source_id: The ID of the source object.
-    Returns a list of created Question objects (serialized).
+    Runs generate_questions_batch for every batch using a bounded thread pool.
+    batches: List of dicts with 'text_content', 'num_questions' and optionally 'batch_number'
+        and 'page_quotas' (for packed pages).
+    max_in_flight: Maximum number of concurrent LLM requests (defaults to the setting).
+    use_cache: Whether cached LLM responses may be reused.
+    Yields (batch, generated_questions) pairs in the same order as batches, as soon as
+    each batch and all batches before it have finished.
+    """
+    if not batches:
+        return
+
+    if max_in_flight is None:
+        max_in_flight = get_max_in_flight()
+    max_in_flight = max(1, min(max_in_flight, len(batches)))
+
+    def run_batch(batch):
+        try:
+            return generate_questions_batch(
+                batch['text_content'],
+                batch['num_questions'],
+                source_id,
+                source_type,
+                batch.get('batch_number'),
+                use_cache=use_cache,
+                page_quotas=batch.get('page_quotas')
+            )
+        except Exception as e:
+            print(f"Error generating questions for {source_type} source {source_id}: {str(e)}")
+            return []
+
+    # A single request in flight needs no pool
+    if max_in_flight == 1:
+        for batch in batches:
+            yield batch, run_batch(batch)
+        return
+
+    print(f"Dispatching {len(batches)} batches for {source_type} source {source_id} with up to {max_in_flight} requests in flight")
+    executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='question-generation')
+    try:
+        futures = [executor.submit(run_batch, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            yield batch, future.result()
+    finally:
+        # Drop batches that have not started yet if the caller stops consuming early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def page_fingerprint(page_text):
+    """Returns the content fingerprint stored with questions generated from page_text."""
+    return hashlib.sha256(page_text.encode('utf-8')).hexdigest()
+
+def save_generated_questions(questions_data, generation_job=None, content_fingerprint=None, replace_page=None):
+    """
+    Validates and saves a list of question dictionaries (with 'source' and 'page_number' set)
+    with a single bulk INSERT inside one transaction.
+    generation_job: Optional GenerationJob the created questions belong to.
+    content_fingerprint: Fingerprint of the page text the questions were generated from.
+    replace_page: Optional (source_id, page_number); the existing questions for that page are
+        deleted in the same transaction, so readers never see the page without questions.
+    Returns the serialized data of the created questions, or an empty list if none were valid.
+    """
+    # The questions were already checked by generate_questions_batch, so the cheap structural
+    # check is enough here instead of running full serializer validation row by row
+    question_objects = []
+    for i, question in enumerate(questions_data):
+        is_valid, error_msg = validate_question_structure(question)
+        if not is_valid:
+            print(f"ERROR: Question {i} cannot be saved: {error_msg}")
+            print(f"Question {i} data: {question}")
+            continue
+        question_objects.append(Question(
+            source_id=question['source'],
+            question_text=question['question_text'],
+            options=question['options'],
+            correct_answer=question['correct_answer'],
+            explanation=question['explanation'],
+            page_number=question.get('page_number'),
+            generation_job=generation_job,
+            content_fingerprint=content_fingerprint,
+        ))
+
+    if not question_objects:
+        return []
+
+    with transaction.atomic():
+        if replace_page is not None:
+            replace_source_id, replace_page_number = replace_page
+            replaced = Question.objects.filter(source_id=replace_source_id, page_number=replace_page_number)
+            unindex_question_queryset(replaced)
+            deleted_count, _ = replaced.delete()
+            if deleted_count:
+                print(f"Replacing {deleted_count} existing questions for page {replace_page_number} of source {replace_source_id}")
+        if connection.features.can_return_rows_from_bulk_insert:
+            created_questions = Question.objects.bulk_create(question_objects)
+            # bulk_create sends no post_save signals (see questions.signals)
+            index_questions(created_questions)
+        else:
+            # Backends that cannot return primary keys from a bulk INSERT fall back to one INSERT per row
+            for question_object in question_objects:
+                question_object.save()
+            created_questions = question_objects
+
+    return list(QuestionSerializer(created_questions, many=True).data)
+
+def iter_question_generation(*, source_text_content=None, questions_per_page=None, pages_to_generate_str=None, total_question_limit=None, source_id=None, max_in_flight=None, generation_job=None, use_cache=True, incremental=False):
+    """
+    Generates and saves questions batch by batch, yielding progress events along the way.
+    Takes the same arguments as generate_questions_from_text_content, plus an optional
+    GenerationJob that the created questions are linked to.
+    Yields a {'event': 'plan'} dict listing the scheduled pages first, then one {'event': 'batch'}
+    dict per batch, in page order, with the serialized questions saved for that batch.
+    Closing the generator early stops dispatching batches that have not started yet.
+
+    Existing questions of a page are swapped for the new ones in a single transaction once the
+    page's first batch is saved. Without incremental, questions of pages that are not part of this
+    run are removed after it finishes (only if it produced anything). With incremental, they are
+    kept, and requested pages whose questions match the page fingerprint are not regenerated.
     """
     
-    # Validate required parameters
-    if not source_text_content or not isinstance(source_text_content, list):
+    # Validate required parameters (without source_text_content, the source's stored pages are used)
+    if source_text_content is not None and (not source_text_content or not isinstance(source_text_content, list)):
         print("Error: source_text_content must be a non-empty list")
-        return []
+        return
     
     if source_id is None:
         print("Error: source_id is required")
-        return []
+        return
     
     if questions_per_page is None or questions_per_page <= 0:
         print("Error: questions_per_page must be a positive integer")
-        return []
+        return
     
     # Ensure questions_per_page is reasonable (between 1 and 15)
     if questions_per_page > 15:
@@ -259,25 +467,38 @@ def generate_questions_from_text_content(*, source_text_content=None, questions_
         source = Source.objects.get(id=source_id)
     except Source.DoesNotExist:
         print(f"Error: Source with id {source_id} not found")
-        return []
-    
-    # DELETE EXISTING QUESTIONS FOR THIS SOURCE BEFORE GENERATING NEW ONES
-    try:
-        existing_questions = Question.objects.filter(source_id=source_id)
-        existing_count = existing_questions.count()
-        if existing_count > 0:
-            print(f"Found {existing_count} existing questions for source {source_id}. Deleting them...")
-            existing_questions.delete()
-            print(f"Successfully deleted {existing_count} existing questions")
-        else:
-            print(f"No existing questions found for source {source_id}")
-    except Exception as e:
-        print(f"Error deleting existing questions for source {source_id}: {str(e)}")
-        # You might want to return here if deletion fails, or continue with generation
-        # return []  # Uncomment this line if you want to stop generation when deletion fails
+        return
+
+    # Hash and word count of every page up front; texts are only loaded for the pages that get generated
+    if source_text_content is not None:
+        page_stats = {index + 1: (page_fingerprint(text or ""), len((text or "").split())) for index, text in enumerate(source_text_content)}
+        load_texts = lambda page_numbers: {page_number: source_text_content[page_number - 1] or "" for page_number in page_numbers}
+    else:
+        page_stats = load_page_stats(source_id)
+        load_texts = lambda page_numbers: load_page_texts(source_id, page_numbers)
+    page_count = max(page_stats, default=0)
+    if not page_count:
+        print(f"Error: Source {source_id} has no extracted text")
+        return
     
-    all_questions_data = []
-    actual_pages_processed = 0
+    # Existing questions stay in place until replacements are saved; collect what each page has
+    existing_pages = {}
+    for page_number, fingerprint in Question.objects.filter(source_id=source_id).values_list('page_number', 'content_fingerprint'):
+        page = existing_pages.setdefault(page_number, {'count': 0, 'fingerprints': set()})
+        page['count'] += 1
+        page['fingerprints'].add(fingerprint)
+    if existing_pages:
+        print(f"Found {sum(page['count'] for page in existing_pages.values())} existing questions for source {source_id} on {len(existing_pages)} pages")
+    else:
+        print(f"No existing questions found for source {source_id}")
+
+    def is_page_current(page_number, fingerprint, num_questions):
+        # A page is up to date if all its questions came from the current text and there are enough of them
+        page = existing_pages.get(page_number)
+        return page is not None and page['fingerprints'] == {fingerprint} and page['count'] >= num_questions
+
+    batches = []
+    kept_pages = []
 
     # Handle PDF files (existing logic unchanged)
     if source.source_type == 'PDF':
@@ -286,194 +507,264 @@ def generate_questions_from_text_content(*, source_text_content=None, questions_
             pages_indices = parse_page_ranges(pages_to_generate_str)
             if not pages_indices:
                 print(f"Warning: No valid pages to process from string '{pages_to_generate_str}' for PDF source {source.id}. Processing all available content.")
-                pages_indices = list(range(len(source_text_content)))
+                pages_indices = list(range(page_count))
             else:
                 # Validate page indices against available content length
-                valid_pages_indices = [p for p in pages_indices if 0 <= p < len(source_text_content)]
+                valid_pages_indices = [p for p in pages_indices if 0 <= p < page_count]
                 if len(valid_pages_indices) != len(pages_indices):
-                    print(f"Warning: Some page numbers in '{pages_to_generate_str}' are out of bounds for PDF source {source.id} (total pages: {len(source_text_content)}). Processing valid pages only.")
+                    print(f"Warning: Some page numbers in '{pages_to_generate_str}' are out of bounds for PDF source {source.id} (total pages: {page_count}). Processing valid pages only.")
                 pages_indices = valid_pages_indices
                 if not pages_indices:
                     print(f"Warning: All specified pages in '{pages_to_generate_str}' were invalid for PDF source {source.id}. Processing all available content.")
-                    pages_indices = list(range(len(source_text_content)))
+                    pages_indices = list(range(page_count))
         else:
             # No specific pages, process all
-            pages_indices = list(range(len(source_text_content)))
+            pages_indices = list(range(page_count))
         
-        print(f"PDF source {source.id}: Processing pages {[p+1 for p in pages_indices]} (total available: {len(source_text_content)})")
+        print(f"PDF source {source.id}: Processing pages {[p+1 for p in pages_indices]} (total available: {page_count})")
 
-        # Process each selected page for PDF
+        # Reserve a question quota for every selected page up front, in page order,
+        # so the pages can be generated concurrently without overshooting the total limit
+        questions_remaining = total_question_limit
+        page_entries = []
         for page_index in pages_indices:
-            # Check if we've reached the total question limit before processing this page
-            if total_question_limit is not None and len(all_questions_data) >= total_question_limit:
-                print(f"Reached total question limit of {total_question_limit}. Stopping generation.")
+            if questions_remaining is not None and questions_remaining <= 0:
+                print(f"Reached total question limit of {total_question_limit}. Not scheduling further pages.")
                 break
 
-            if page_index < 0 or page_index >= len(source_text_content):
-                print(f"Warning: Page index {page_index + 1} is out of bounds for source {source.id}. Skipping.")
-                continue
-
-            page_text = source_text_content[page_index]
-            if not page_text or not page_text.strip():
+            fingerprint, word_count = page_stats.get(page_index + 1, (None, 0))
+            if not word_count:
                 print(f"Info: Page {page_index + 1} of source {source.id} is empty or has no text. Skipping question generation for this page.")
                 continue
-            
-            # Calculate how many questions to request for this specific page
-            questions_remaining = None
-            if total_question_limit is not None:
-                questions_remaining = total_question_limit - len(all_questions_data)
-                if questions_remaining <= 0:
-                    print(f"Total question limit reached. Stopping generation.")
-                    break
-            
+
             # Determine number of questions to request for this page
             num_to_request_this_iteration = min(
                 questions_per_page,
                 questions_remaining if questions_remaining is not None else questions_per_page
             )
+            if questions_remaining is not None:
+                questions_remaining -= num_to_request_this_iteration
 
-            if num_to_request_this_iteration <= 0:
+            if incremental and is_page_current(page_index + 1, fingerprint, num_to_request_this_iteration):
+                print(f"Info: Page {page_index + 1} of source {source.id} already has up-to-date questions. Keeping them.")
+                kept_pages.append(page_index + 1)
                 continue
 
-            # Generate questions for this page
-            generated_questions = generate_questions_batch(
-                page_text, 
-                num_to_request_this_iteration, 
-                source_id, 
-                source.source_type
-            )
-            
-            # Add generated questions to collection
-            if generated_questions:
-                questions_added_this_page = 0
-                for question in generated_questions:
-                    # Check total limit before adding each question
-                    if total_question_limit is not None and len(all_questions_data) >= total_question_limit:
-                        print(f"Reached total question limit of {total_question_limit} while processing page {page_index + 1}")
-                        break
-                        
-                    question["source"] = source_id
-                    question["page_number"] = page_index + 1  # Store 1-indexed page number
-                    
-                    all_questions_data.append(question)
-                    questions_added_this_page += 1
-                
-                print(f"Successfully added {questions_added_this_page} questions from page {page_index + 1}")
-                actual_pages_processed += 1
+            page_entries.append({
+                'page_number': page_index + 1,  # Store 1-indexed page number
+                'text_content': None,  # Loaded below
+                'num_questions': num_to_request_this_iteration,
+                'fingerprint': fingerprint,
+            })
+
+        # Fetch the text of just the pages that are generated, in one query
+        page_texts = load_texts([page['page_number'] for page in page_entries])
+        for page in page_entries:
+            page['text_content'] = page_texts.get(page['page_number'], "")
+
+        # Small adjacent pages share one LLM request, up to the prompt's token budget
+        for group in pack_pages(page_entries, get_window_tokens(), max_questions=15):
+            if len(group) == 1:
+                page = group[0]
+                batches.append({
+                    'text_content': page['text_content'],
+                    'num_questions': page['num_questions'],
+                    'batch_number': None,
+                    'parts': [page],
+                })
             else:
-                print(f"Failed to generate any valid questions for page {page_index + 1}")
+                batches.append({
+                    'text_content': "\n\n".join(f"[Page {page['page_number']}]\n{page['text_content'].strip()}" for page in group),
+                    'num_questions': sum(page['num_questions'] for page in group),
+                    'batch_number': None,
+                    'page_quotas': {page['page_number']: page['num_questions'] for page in group},
+                    'parts': group,
+                })
+        if len(batches) < len(page_entries):
+            print(f"Packed {len(page_entries)} pages into {len(batches)} LLM requests")
 
     else:
-        # Handle non-PDF files (YOUTUBE, TXT, PPTX, DOCX, etc.) with batching
+        # Handle non-PDF files (YOUTUBE, TXT, PPTX, DOCX, etc.) with coverage-aware batching
         if pages_to_generate_str:
             print(f"Info: Page selection '{pages_to_generate_str}' is ignored for {source.source_type} source type. Processing entire content.")
         
-        # For non-PDF files, use the first (and typically only) item in source_text_content
-        content_text = source_text_content[0] if source_text_content else ""
-        
-        if not content_text or not content_text.strip():
+        # Split the whole content (every DOCX pseudo-page, PPTX slide or the full transcript)
+        # into windows that each fit in one prompt
+        page_texts = load_texts(range(1, page_count + 1))
+        windows = split_into_windows([page_texts.get(page_number, "") for page_number in range(1, page_count + 1)], get_window_tokens())
+        if not windows:
             print(f"Info: Content of {source.source_type} source {source.id} is empty or has no text. Skipping question generation.")
-            return []
+            return
         
         # Calculate total questions to generate
         total_questions_to_generate = total_question_limit if total_question_limit is not None else questions_per_page
         
-        print(f"Processing {source.source_type} source {source.id}: Generating {total_questions_to_generate} total questions")
+        # Spread the questions over the windows so the whole document is covered
+        question_counts = allocate_questions(windows, total_questions_to_generate)
+        used_windows = sum(1 for count in question_counts if count)
+        print(f"Processing {source.source_type} source {source.id}: Generating {total_questions_to_generate} total questions "
+              f"from {used_windows} of {len(windows)} content windows")
         
-        # If total questions <= 15, generate in single batch
-        if total_questions_to_generate <= 15:
-            generated_questions = generate_questions_batch(
-                content_text, 
-                total_questions_to_generate, 
-                source_id, 
-                source.source_type
-            )
-            
-            if generated_questions:
-                for question in generated_questions:
-                    question["source"] = source_id
-                    question["page_number"] = 1  # Non-PDF files are treated as single page
-                    all_questions_data.append(question)
-                
-                print(f"Successfully added {len(generated_questions)} questions from {source.source_type} source")
-                actual_pages_processed = 1
-            else:
-                print(f"Failed to generate any valid questions for {source.source_type} source")
+        # Windows are generated concurrently, in batches of at most 15 questions each.
+        # Questions are attributed to the first source page of their window.
+        batch_size = 15
+        window_batches = []
+        for window, window_questions in zip(windows, question_counts):
+            fingerprint = page_fingerprint(window['text'])
+            for offset in range(0, window_questions, batch_size):
+                window_batches.append({
+                    'page_number': window['first_page'],
+                    'text_content': window['text'],
+                    'num_questions': min(batch_size, window_questions - offset),
+                    'fingerprint': fingerprint,
+                })
         
-        else:
-            # If total questions > 15, divide into batches of 15
-            batch_size = 15
-            total_batches = (total_questions_to_generate + batch_size - 1) // batch_size  # Ceiling division
-            
-            print(f"Generating {total_questions_to_generate} questions in {total_batches} batches of {batch_size}")
-            
-            for batch_num in range(total_batches):
-                # Calculate questions for this batch
-                questions_remaining = total_questions_to_generate - len(all_questions_data)
-                questions_for_this_batch = min(batch_size, questions_remaining)
-                
-                if questions_for_this_batch <= 0:
-                    break
-                
-                # Generate batch
-                generated_questions = generate_questions_batch(
-                    content_text, 
-                    questions_for_this_batch, 
-                    source_id, 
-                    source.source_type,
-                    batch_num + 1
+        # In incremental mode, keep pages whose questions came from exactly the current windows
+        pages_to_keep = set()
+        if incremental:
+            for page_number in {batch['page_number'] for batch in window_batches}:
+                page_batches = [batch for batch in window_batches if batch['page_number'] == page_number]
+                page = existing_pages.get(page_number)
+                if (page is not None
+                        and page['fingerprints'] == {batch['fingerprint'] for batch in page_batches}
+                        and page['count'] >= sum(batch['num_questions'] for batch in page_batches)):
+                    pages_to_keep.add(page_number)
+            if pages_to_keep:
+                print(f"Info: Pages {sorted(pages_to_keep)} of {source.source_type} source {source.id} already have up-to-date questions. Keeping them.")
+                kept_pages.extend(sorted(pages_to_keep))
+        
+        window_batches = [batch for batch in window_batches if batch['page_number'] not in pages_to_keep]
+        for batch_num, batch in enumerate(window_batches):
+            batches.append({
+                'text_content': batch['text_content'],
+                'num_questions': batch['num_questions'],
+                'batch_number': batch_num + 1 if len(window_batches) > 1 else None,
+                'parts': [batch],
+            })
+
+    yield {
+        'event': 'plan',
+        'source_type': source.source_type,
+        'pages': sorted({part['page_number'] for batch in batches for part in batch['parts']}),
+        'kept_pages': kept_pages,
+        'batches': [
+            {'page_number': part['page_number'], 'batch_number': batch['batch_number'], 'requested': part['num_questions']}
+            for batch in batches
+            for part in batch['parts']
+        ],
+    }
+
+    total_questions_saved = 0
+    actual_pages_processed = set()
+    saved_question_ids = []
+
+    # Generate questions for all batches concurrently; results come back in page order
+    for batch, generated_questions in iter_generated_batches(batches, source_id, source.source_type, max_in_flight=max_in_flight, use_cache=use_cache):
+        packed = len(batch['parts']) > 1
+        for part in batch['parts']:
+            if batch['batch_number']:
+                batch_label = f"batch {batch['batch_number']}"
+            elif source.source_type == 'PDF':
+                batch_label = f"page {part['page_number']}"
+            else:
+                batch_label = f"{source.source_type} source"
+
+            # Packed requests tag each question with its page; never keep more than the page's quota
+            part_questions = generated_questions or []
+            if packed:
+                part_questions = [question for question in part_questions if question.get('page_number') == part['page_number']]
+            questions_data = []
+            for question in part_questions[:part['num_questions']]:
+                question["source"] = source_id
+                question["page_number"] = part['page_number']
+                questions_data.append(question)
+
+            saved_questions = []
+            if questions_data:
+                # The first successful batch of a page swaps out the page's previous questions
+                replace_page = None if part['page_number'] in actual_pages_processed else (source_id, part['page_number'])
+                saved_questions = save_generated_questions(
+                    questions_data,
+                    generation_job,
+                    content_fingerprint=part['fingerprint'],
+                    replace_page=replace_page
                 )
-                
-                if generated_questions:
-                    questions_added_this_batch = 0
-                    for question in generated_questions:
-                        if len(all_questions_data) >= total_questions_to_generate:
-                            break
-                            
-                        question["source"] = source_id
-                        question["page_number"] = 1  # Non-PDF files are treated as single page
-                        all_questions_data.append(question)
-                        questions_added_this_batch += 1
-                    
-                    print(f"Successfully added {questions_added_this_batch} questions from batch {batch_num + 1}")
-                else:
-                    print(f"Failed to generate questions for batch {batch_num + 1}")
-            
-            if all_questions_data:
-                actual_pages_processed = 1
-                print(f"Successfully generated {len(all_questions_data)} total questions across {total_batches} batches")
+            if saved_questions:
+                print(f"Successfully added {len(saved_questions)} questions from {batch_label}")
+                total_questions_saved += len(saved_questions)
+                actual_pages_processed.add(part['page_number'])
+                saved_question_ids.extend(question['id'] for question in saved_questions)
+            else:
+                print(f"Failed to generate any valid questions for {batch_label}")
+
+            yield {
+                'event': 'batch',
+                'page_number': part['page_number'],
+                'batch_number': batch['batch_number'],
+                'requested': part['num_questions'],
+                'questions': saved_questions,
+            }
+
+    # A full (non-incremental) run replaces the whole question set, but only if it produced something
+    if not incremental and saved_question_ids:
+        with transaction.atomic():
+            removed = Question.objects.filter(source_id=source_id).exclude(id__in=saved_question_ids)
+            unindex_question_queryset(removed)
+            removed_count, _ = removed.delete()
+        if removed_count:
+            print(f"Removed {removed_count} questions from pages that were not part of this run")
 
     # Log summary
     if source.source_type == 'PDF':
-        print(f"SUMMARY: Successfully processed {actual_pages_processed} pages, generated {len(all_questions_data)} total questions")
+        print(f"SUMMARY: Successfully processed {len(actual_pages_processed)} pages, generated {total_questions_saved} total questions")
         print(f"Selected pages were: {[p+1 for p in pages_indices]}")
         print(f"Questions per page requested: {questions_per_page}")
         if total_question_limit:
             print(f"Total question limit: {total_question_limit}")
     else:
-        print(f"SUMMARY: Successfully processed {source.source_type} source, generated {len(all_questions_data)} questions")
-        if total_question_limit and total_question_limit > 15:
-            print(f"Used batching approach for {total_question_limit} questions")
+        print(f"SUMMARY: Successfully processed {source.source_type} source, generated {total_questions_saved} questions")
+        if len(batches) > 1:
+            print(f"Used {len(batches)} batches across the content windows")
+    print(f"LLM response cache: {get_cache_stats()}")
 
-    # Serialize and save questions
-    if all_questions_data:
-        print(f"DEBUG: About to serialize {len(all_questions_data)} questions")
-        
-        serializer = QuestionSerializer(data=all_questions_data, many=True)
-        if serializer.is_valid():
-            serializer.save() # This will create the Question objects
-            print(f"SUCCESS: Created {len(serializer.data)} questions in database")
-            return serializer.data # Return serialized data of created questions
-        else:
-            print(f"ERROR: Failed to serialize questions: {serializer.errors}")
-            # Print detailed error info for debugging
-            for i, error in enumerate(serializer.errors):
-                if error:
-                    print(f"Question {i} errors: {error}")
-                    if i < len(all_questions_data):
-                        print(f"Question {i} data: {all_questions_data[i]}")
-            return [] # Return empty list on serialization error
-    else:
+    if not total_questions_saved:
         print("No questions were generated")
-    
-    return [] # Return empty list if no questions were generated
\ No newline at end of file
+
+def generate_questions_from_text_content(*, source_text_content=None, questions_per_page=None, pages_to_generate_str=None, total_question_limit=None, source_id=None, max_in_flight=None, use_cache=True, incremental=False):
+    """
+    Generates questions from the given text_content using the configured LLM backend.
+    source_text_content: Optional list of strings (text per page for PDF, list with one string for others).
+        Defaults to the source's stored pages, of which only the pages to generate are loaded.
+    questions_per_page: Max number of questions to generate per selected page.
+    pages_to_generate_str: Optional string indicating page ranges (e.g., "1-3,5"). For non-PDFs, this is ignored.
+    total_question_limit: Optional overall limit on questions.
+    source_id: The ID of the source object.
+    max_in_flight: Optional override for the number of concurrent LLM requests.
+    use_cache: Set to False for "fresh" generation that bypasses cached LLM responses.
+    incremental: Keep questions of pages that are not requested and only regenerate requested
+        pages that have no questions yet or whose text changed since they were generated.
+    Returns a list of created Question objects (serialized). In incremental mode the
+    questions kept for requested pages are included, ordered by page.
+    """
+    created_questions = []
+    kept_pages = []
+    for event in iter_question_generation(
+        source_text_content=source_text_content,
+        questions_per_page=questions_per_page,
+        pages_to_generate_str=pages_to_generate_str,
+        total_question_limit=total_question_limit,
+        source_id=source_id,
+        max_in_flight=max_in_flight,
+        use_cache=use_cache,
+        incremental=incremental
+    ):
+        if event['event'] == 'plan':
+            kept_pages = event['kept_pages']
+        elif event['event'] == 'batch':
+            created_questions.extend(event['questions'])
+
+    if kept_pages:
+        kept_questions = Question.objects.filter(source_id=source_id, page_number__in=kept_pages)
+        created_questions.extend(QuestionSerializer(kept_questions, many=True).data)
+        created_questions.sort(key=lambda question: (question['page_number'] or 0, question['id']))
+    return created_questions
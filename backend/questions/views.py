@@ -1,6 +1,11 @@
-from rest_framework import viewsets, permissions
-from .models import Question
-from .serializers import QuestionSerializer
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .models import Question, GenerationJob
+from .pagination import QuestionKeysetPagination
+from .serializers import QuestionSerializer, GenerationJobSerializer
 
 class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -9,14 +14,66 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = QuestionSerializer
     permission_classes = [permissions.AllowAny] # Or configure as needed
+    pagination_class = QuestionKeysetPagination
 
     def get_queryset(self):
         """
         Optionally restricts the returned questions,
         e.g., to questions belonging to a specific source if a 'source_id' query param is provided.
+        'page_number', 'page_from' and 'page_to' (inclusive) restrict them to source pages.
         """
-        queryset = Question.objects.all().order_by('-created_at')
+        queryset = Question.objects.all().order_by('-created_at', '-id')
         source_id = self.request.query_params.get('source_id')
         if source_id is not None:
             queryset = queryset.filter(source_id=source_id)
+        page_filters = {'page_number': 'page_number', 'page_from': 'page_number__gte', 'page_to': 'page_number__lte'}
+        for param, lookup in page_filters.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: int(value)})
+            except ValueError:
+                raise ValidationError({param: "Must be an integer."})
         return queryset
+
+class GenerationJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status, per-page progress, partial results and cancellation for background generation jobs.
+    Jobs are created by the 'generate_questions' action in SourceViewSet when 'async' is set.
+    """
+    serializer_class = GenerationJobSerializer
+    permission_classes = [permissions.AllowAny] # Or configure as needed
+
+    def get_queryset(self):
+        queryset = GenerationJob.objects.all().order_by('-created_at')
+        source_id = self.request.query_params.get('source_id')
+        if source_id is not None:
+            queryset = queryset.filter(source_id=source_id)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        """Returns the questions saved by this job so far, in page order."""
+        job = self.get_object()
+        questions = job.questions.all().order_by('page_number', 'id')
+        return Response({
+            'status': job.status,
+            'completed_pages': job.completed_pages,
+            'total_pages': job.total_pages,
+            'questions': QuestionSerializer(questions, many=True).data,
+        })
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if job.status not in GenerationJob.ACTIVE_STATUSES:
+            return Response({"error": f"Job {job.id} has already finished with status {job.status}."}, status=status.HTTP_409_CONFLICT)
+
+        # Pending jobs are cancelled right away, running jobs stop after the page in progress
+        GenerationJob.objects.filter(id=job.id, status='PENDING').update(
+            status='CANCELLED', cancel_requested=True, finished_at=timezone.now()
+        )
+        GenerationJob.objects.filter(id=job.id, status='RUNNING').update(cancel_requested=True)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
@@ -140,6 +140,102 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
+# Resumable chunked uploads (/api/sources/uploads/) stream each chunk to a part file in
+# CHUNKED_UPLOAD_DIR, so they can accept much larger files than a single multipart request
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 200 * 1024 * 1024))  # 200 MB
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB per request
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, 'upload_sessions')
+# Unfinished uploads without a new chunk for this many seconds are deleted
+CHUNKED_UPLOAD_EXPIRE_AFTER = 24 * 60 * 60
+# Uploaded files are hashed while they stream in, so re-uploads of known content can be detected
+FILE_UPLOAD_HANDLERS = [
+    'sources.upload_handlers.ContentHashUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Uploaded files are extracted in a thread pool inside each web process (upload returns 202, then
+# poll /api/sources/<id>/status/). Set SOURCE_EXTRACTION_IN_PROCESS to False to run extraction
+# with `manage.py run_source_extractions` instead.
+SOURCE_EXTRACTION_IN_PROCESS = os.getenv('SOURCE_EXTRACTION_IN_PROCESS', 'true').lower() in ('1', 'true', 'yes')
+SOURCE_EXTRACTION_WORKERS = int(os.getenv('SOURCE_EXTRACTION_WORKERS', 2))
+# Sources still EXTRACTING after this many seconds are marked as failed; sources left PENDING
+# that long by a restarted process are queued again
+SOURCE_EXTRACTION_STALE_AFTER = 900
+# Extraction runs in separate worker processes with a memory cap and time budgets, so a pathological
+# file cannot hang or exhaust the web process. Pages that fail are reported in Source.page_errors.
+SOURCE_EXTRACTION_SANDBOX = os.getenv('SOURCE_EXTRACTION_SANDBOX', 'true').lower() in ('1', 'true', 'yes')
+SOURCE_EXTRACTION_TIMEOUT = 600  # seconds for a whole document (below SOURCE_EXTRACTION_STALE_AFTER)
+SOURCE_EXTRACTION_PAGE_TIMEOUT = 60  # seconds per page
+SOURCE_EXTRACTION_MEMORY_LIMIT = int(os.getenv('SOURCE_EXTRACTION_MEMORY_LIMIT_MB', 1024)) * 1024 * 1024
+# Extracted page text is compressed in the database: 'zlib', 'zstd' (needs the zstandard package)
+# or 'none'. Existing pages are converted with `manage.py compress_source_pages`.
+SOURCE_PAGE_COMPRESSION = os.getenv('SOURCE_PAGE_COMPRESSION', 'zlib')
+
+# PDF text extraction: files with at least PDF_PARALLEL_MIN_PAGES pages are split into page
+# ranges and extracted by a pool of PDF_EXTRACTION_WORKERS processes; smaller files are extracted serially
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 40))
+# PDF text extraction library: 'pypdfium2', 'pypdf', 'pypdf2', 'pdfminer', or 'auto' for the
+# fastest one installed. Compare them with `manage.py benchmark_pdf_engines`.
+PDF_EXTRACTION_ENGINE = os.getenv('PDF_EXTRACTION_ENGINE', 'auto')
+
+# Question generation
+# Maximum number of LLM requests dispatched concurrently for a single generation run
+QUESTION_GENERATION_MAX_IN_FLIGHT = int(os.getenv('QUESTION_GENERATION_MAX_IN_FLIGHT', 4))
+# Token budget for the source text in one generation prompt (about 4 characters per token).
+# Long DOCX, PPTX, TXT and YouTube sources are split into windows of this size.
+QUESTION_GENERATION_WINDOW_TOKENS = int(os.getenv('QUESTION_GENERATION_WINDOW_TOKENS', 750))
+# Background generation jobs run in a thread pool inside each web process.
+# Set GENERATION_JOBS_IN_PROCESS to False to run them with `manage.py run_generation_jobs` instead.
+GENERATION_JOBS_IN_PROCESS = os.getenv('GENERATION_JOBS_IN_PROCESS', 'true').lower() in ('1', 'true', 'yes')
+GENERATION_JOB_WORKERS = int(os.getenv('GENERATION_JOB_WORKERS', 2))
+# Running jobs without a progress update for this many seconds are marked as failed; jobs left
+# PENDING that long by a restarted process are queued again
+GENERATION_JOB_STALE_AFTER = 600
+
+# Cache of validated LLM responses, keyed by model, prompt hash, question count and sampling parameters.
+# BACKEND is 'sqlite' (standalone file at PATH), 'django' (the Django cache named CACHE_ALIAS) or 'none'.
+LLM_RESPONSE_CACHE = {
+    'BACKEND': os.getenv('LLM_RESPONSE_CACHE_BACKEND', 'sqlite'),
+    'PATH': BASE_DIR / 'llm_cache.sqlite3',
+    'CACHE_ALIAS': 'default',
+    'TTL': 7 * 24 * 60 * 60,  # 7 days
+    'MAX_ENTRIES': 5000,
+}
+
+# LLM backend used for question and content generation. 'groq' calls the Groq API through
+# the gateway below; 'fake' is a local, deterministic stand-in for load tests and benchmarks
+# that needs no network access (latency in seconds, rates between 0 and 1).
+LLM_BACKEND = {
+    'BACKEND': os.getenv('LLM_BACKEND', 'groq'),
+    'MODEL': os.getenv('LLM_MODEL'),  # Defaults to meta-llama/llama-4-scout-17b-16e-instruct for Groq
+    'OPTIONS': {
+        'latency': float(os.getenv('LLM_FAKE_LATENCY', 0.5)),
+        'latency_jitter': float(os.getenv('LLM_FAKE_LATENCY_JITTER', 0)),
+        'error_rate': float(os.getenv('LLM_FAKE_ERROR_RATE', 0)),
+        'truncation_rate': float(os.getenv('LLM_FAKE_TRUNCATION_RATE', 0)),
+        'seed': int(os.getenv('LLM_FAKE_SEED', 0)),
+    },
+}
+
+# Shared LLM gateway: one pooled HTTP client for all Groq calls, with client-side
+# rate limiting (also fed by Groq's x-ratelimit-* headers), retries and a circuit breaker
+LLM_GATEWAY = {
+    'TIMEOUT': int(os.getenv('LLM_TIMEOUT', 60)),  # Seconds per call
+    'CONNECT_TIMEOUT': 10,
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 60,
+    'MAX_CONCURRENT_REQUESTS': int(os.getenv('LLM_MAX_CONCURRENT_REQUESTS', 8)),
+    'REQUESTS_PER_MINUTE': int(os.getenv('LLM_REQUESTS_PER_MINUTE', 30)),
+    'TOKENS_PER_MINUTE': int(os.getenv('LLM_TOKENS_PER_MINUTE', 30000)),
+    'MAX_RETRIES': 4,
+    'BACKOFF_BASE': 1.0,
+    'BACKOFF_MAX': 30.0,
+    'CIRCUIT_FAILURE_THRESHOLD': 5,
+    'CIRCUIT_RESET_TIMEOUT': 30,
+}
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
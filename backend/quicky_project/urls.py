@@ -26,6 +26,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/sources/', include('sources.urls')),
     path('api/sources/<int:source_id>/preview/', views.source_preview, name='source_preview'),
+    path('api/search/', views.search, name='search'),
     path('api/questions/', include('questions.urls')),  # Add this line
     path('api/content_generation/', include('content_generation.urls')), 
     path('api/wakeUP/', include('wakeUP.urls')),
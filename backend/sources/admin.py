@@ -1,9 +1,16 @@
 from django.contrib import admin
-from .models import Source
+from .models import Source, UploadSession
 
 @admin.register(Source)
 class SourceAdmin(admin.ModelAdmin):
-    list_display = ('id', 'source_type', 'file', 'youtube_link', 'uploaded_at')
-    list_filter = ('source_type', 'uploaded_at')
-    search_fields = ('file__name', 'youtube_link', 'text_content')
-    readonly_fields = ('text_content', 'page_count', 'video_duration', 'uploaded_at')
\ No newline at end of file
+    list_display = ('id', 'source_type', 'status', 'file', 'youtube_link', 'uploaded_at')
+    list_filter = ('source_type', 'status', 'uploaded_at')
+    search_fields = ('file__name', 'youtube_link')
+    readonly_fields = ('text_content', 'page_count', 'video_duration', 'uploaded_at',
+                       'extraction_error', 'page_errors', 'extraction_started_at', 'extraction_finished_at')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'file_name', 'status', 'received_size', 'total_size', 'source', 'updated_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('received_size', 'created_at', 'updated_at')
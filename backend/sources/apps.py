@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class SourcesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'sources'
\ No newline at end of file
+    name = 'sources'
+
+    def ready(self):
+        # Registers the signal receivers and system checks
+        from . import checks, signals  # noqa: F401
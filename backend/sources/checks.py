@@ -0,0 +1,35 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+
+@register(Tags.database)
+def check_search_index(app_configs, databases=None, **kwargs):
+    """Warns when the SQLite full-text search tables are missing or out of date (see sources.search)."""
+    warnings = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        tables = set(connection.introspection.table_names())
+        if 'questions_question' not in tables or 'sources_sourcepage' not in tables:
+            continue  # Not migrated yet
+        missing = [table for table in ('sources_sourcepage_fts', 'questions_question_fts') if table not in tables]
+        if missing:
+            warnings.append(Warning(
+                f"Full-text search tables are missing: {', '.join(missing)}.",
+                hint="Run `manage.py migrate`, then `manage.py rebuild_search_index`.",
+                id='sources.W001',
+            ))
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM questions_question")
+            question_count = cursor.fetchone()[0]
+            cursor.execute("SELECT count(*) FROM questions_question_fts")
+            indexed_count = cursor.fetchone()[0]
+        if question_count != indexed_count:
+            warnings.append(Warning(
+                f"The question search index has {indexed_count} rows for {question_count} questions.",
+                hint="Run `manage.py rebuild_search_index`.",
+                id='sources.W002',
+            ))
+    return warnings
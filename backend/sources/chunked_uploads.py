@@ -0,0 +1,82 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import UploadSession
+from .utils import TEXT_SNIFF_BYTES, sniff_text_encoding
+
+# Size of the reads used to stream request bodies and part files
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class AssembledUpload(File):
+    """
+    A finished part file. Exposing temporary_file_path() lets FileSystemStorage move it into
+    place instead of copying it, just like a large regular upload.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def get_upload_dir():
+    upload_dir = getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'upload_sessions'))
+    os.makedirs(upload_dir, exist_ok=True)
+    return upload_dir
+
+def part_file_path(session):
+    return os.path.join(get_upload_dir(), f"{session.id}.part")
+
+def delete_part_file(session):
+    try:
+        os.remove(part_file_path(session))
+    except FileNotFoundError:
+        pass
+
+def expire_upload_sessions():
+    """Deletes unfinished sessions (and their part files) that have not received a chunk for a while."""
+    expire_after = getattr(settings, 'CHUNKED_UPLOAD_EXPIRE_AFTER', 24 * 60 * 60)
+    cutoff = timezone.now() - timedelta(seconds=expire_after)
+    expired = list(UploadSession.objects.filter(status='ACTIVE', updated_at__lt=cutoff))
+    for session in expired:
+        delete_part_file(session)
+        session.delete()
+    return len(expired)
+
+def write_chunk(session, offset, stream, length):
+    """
+    Streams length bytes from stream into the session's part file at offset, COPY_BUFFER_SIZE
+    bytes at a time, so a chunk is never held in memory. Returns the number of bytes written.
+    """
+    path = part_file_path(session)
+    written = 0
+    # 'r+b' keeps what is already there; the part file is created by the first chunk
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as part:
+        part.seek(offset)
+        while written < length:
+            data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            part.write(data)
+            written += len(data)
+        # Drop anything beyond this chunk left by an earlier, interrupted attempt
+        part.truncate(offset + written)
+    return written
+
+def inspect_part_file(session):
+    """
+    Reads the complete part file once, computing its SHA-256 and sniffing the text encoding
+    from its first bytes. Returns (content_hash, encoding).
+    """
+    sha256 = hashlib.sha256()
+    sample = b""
+    with open(part_file_path(session), 'rb') as part:
+        for data in iter(lambda: part.read(COPY_BUFFER_SIZE), b''):
+            if len(sample) < TEXT_SNIFF_BYTES:
+                sample += data[:TEXT_SNIFF_BYTES - len(sample)]
+            sha256.update(data)
+    return sha256.hexdigest(), sniff_text_encoding(sample, complete=session.total_size <= TEXT_SNIFF_BYTES)
@@ -0,0 +1,85 @@
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import zstandard
+except ImportError:  # Optional: zlib is always available
+    zstandard = None
+
+# Compressed page text is stored as MAGIC + one codec byte + the compressed UTF-8 payload
+MAGIC = b'QT'
+CODEC_IDS = {
+    'zlib': b'z',
+    'zstd': b's',
+}
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+# Shorter texts are stored as plain text: the header and codec framing would outweigh any saving
+MIN_COMPRESS_CHARS = 128
+
+
+def available_codecs():
+    """Codecs that can be used with the installed libraries."""
+    return [codec for codec in CODEC_IDS if codec != 'zstd' or zstandard is not None]
+
+def get_page_compression():
+    """
+    Returns the codec new page text is compressed with (SOURCE_PAGE_COMPRESSION), or None to
+    store it as plain text. Falls back to zlib when zstd is configured but zstandard is missing.
+    """
+    codec = getattr(settings, 'SOURCE_PAGE_COMPRESSION', 'zlib')
+    if not codec or codec == 'none':
+        return None
+    if codec not in CODEC_IDS:
+        raise ImproperlyConfigured(f"Unknown SOURCE_PAGE_COMPRESSION '{codec}'. Choose from: none, {', '.join(CODEC_IDS)}.")
+    if codec == 'zstd' and zstandard is None:
+        print("Warning: SOURCE_PAGE_COMPRESSION is 'zstd' but zstandard is not installed. Using zlib.")
+        return 'zlib'
+    return codec
+
+def compress_text(text, codec):
+    """
+    Returns text compressed with codec (header included), or None if codec is None or
+    compressing would not make the text smaller; the text is then stored as is.
+    """
+    if codec is None or len(text) < MIN_COMPRESS_CHARS:
+        return None
+    data = text.encode('utf-8')
+    if codec == 'zlib':
+        payload = zlib.compress(data, ZLIB_LEVEL)
+    elif codec == 'zstd':
+        if zstandard is None:
+            raise ImproperlyConfigured("zstd compression requires the zstandard package.")
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+    blob = MAGIC + CODEC_IDS[codec] + payload
+    if len(blob) >= len(data):
+        return None
+    return blob
+
+def compressed_codec(blob):
+    """Returns the name of the codec a compressed text was written with."""
+    blob = bytes(blob)
+    if blob[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a compressed text (missing header).")
+    codec_id = blob[len(MAGIC):len(MAGIC) + 1]
+    for codec, known_id in CODEC_IDS.items():
+        if codec_id == known_id:
+            return codec
+    raise ValueError(f"Unknown codec id {codec_id!r} in compressed text header.")
+
+def decompress_text(blob):
+    """Decompresses text written by compress_text. Accepts bytes or a memoryview (PostgreSQL)."""
+    blob = bytes(blob)
+    codec = compressed_codec(blob)
+    payload = blob[len(MAGIC) + 1:]
+    if codec == 'zlib':
+        data = zlib.decompress(payload)
+    else:
+        if zstandard is None:
+            raise ImproperlyConfigured("This page was compressed with zstd; install zstandard to read it.")
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    return data.decode('utf-8')
@@ -0,0 +1,184 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Source
+from .pages import SourcePageWriter, delete_source_pages
+from .sandbox import extract_in_sandbox
+from .utils import extract_text_from_pdf, extract_text_from_docx, extract_text_from_pptx, extract_text_from_txt
+
+# Source types that are extracted from an uploaded file, keyed by file extension
+FILE_SOURCE_TYPES = {
+    'pdf': 'PDF',
+    'docx': 'DOCX',
+    'pptx': 'PPTX',
+    'txt': 'TXT',
+}
+
+# In-process worker pool shared by all requests handled by this process
+_executor = None
+_executor_lock = threading.Lock()
+# Sources submitted to this process's pool that have not finished yet
+_queued_source_ids = set()
+
+def get_extraction_executor():
+    """Returns the process-wide thread pool that extracts uploaded files, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = max(1, int(getattr(settings, 'SOURCE_EXTRACTION_WORKERS', 2)))
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='source-extraction')
+        return _executor
+
+def enqueue_source_extraction(source):
+    """
+    Hands a PENDING source to the in-process worker pool once the surrounding transaction commits.
+    When SOURCE_EXTRACTION_IN_PROCESS is False the source is left for `manage.py run_source_extractions`.
+    """
+    if not getattr(settings, 'SOURCE_EXTRACTION_IN_PROCESS', True):
+        return
+    source_id = source.id
+    transaction.on_commit(lambda: _submit_source_extraction(source_id))
+
+def _submit_source_extraction(source_id):
+    _queued_source_ids.add(source_id)
+    get_extraction_executor().submit(run_source_extraction, source_id)
+
+def recover_stale_extractions(requeue_pending=True):
+    """
+    Recovers sources orphaned by a restart. Sources stuck in EXTRACTING are marked as FAILED and
+    their files removed. With in-process extraction, sources PENDING for longer than
+    SOURCE_EXTRACTION_STALE_AFTER that this process has not queued (their pool went away with
+    the old process) are queued again; a source queued by another web process is at worst
+    submitted twice, and only one worker claims it. Otherwise (or with requeue_pending=False)
+    PENDING sources are the queue of `manage.py run_source_extractions` and are left alone.
+    """
+    stale_after = getattr(settings, 'SOURCE_EXTRACTION_STALE_AFTER', 900)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale_count = 0
+    for source in Source.objects.filter(status='EXTRACTING', extraction_started_at__lt=cutoff).only('id', 'file'):
+        fail_source_extraction(source, "Extraction stopped before finishing and was marked as failed.")
+        stale_count += 1
+    if requeue_pending and getattr(settings, 'SOURCE_EXTRACTION_IN_PROCESS', True):
+        pending_ids = Source.objects.filter(status='PENDING', uploaded_at__lt=cutoff).values_list('id', flat=True)
+        for source_id in pending_ids:
+            if source_id not in _queued_source_ids:
+                print(f"Queueing extraction of source {source_id} again; it was left pending")
+                _submit_source_extraction(source_id)
+                stale_count += 1
+    return stale_count
+
+def fail_source_extraction(source, error):
+    """Marks a source as FAILED and deletes its stored file, like a failed synchronous upload did."""
+    file_name = source.file.name if source.file else None
+    if file_name and default_storage.exists(file_name):
+        default_storage.delete(file_name)
+    if file_name:
+        error = f"{error} (file '{file_name}')"
+    # Pages stored before the failure are dropped; the file reference and content hash are
+    # cleared so that the same file can be uploaded again
+    delete_source_pages(source.id)
+    Source.objects.filter(id=source.id).update(
+        status='FAILED', extraction_error=error, file=None, content_hash=None, extraction_finished_at=timezone.now()
+    )
+
+def extract_source_pages(source_type, file_path, on_page, text_encoding=None):
+    """
+    Extracts the text of an uploaded file, handing each page to on_page(index, text) as soon as
+    it is extracted (pages of large PDFs may arrive out of order). text_encoding is the encoding
+    sniffed for TXT uploads. With SOURCE_EXTRACTION_SANDBOX (the default) the file is extracted
+    in resource-limited worker processes (see sources.sandbox), otherwise in this process.
+    Returns (page_count, page_errors); page_count is None on failure, and page_errors lists the
+    pages that could not be extracted.
+    """
+    if getattr(settings, 'SOURCE_EXTRACTION_SANDBOX', True):
+        return extract_in_sandbox(source_type, file_path, on_page, text_encoding)
+
+    page_count = None
+    if source_type == 'PDF':
+        _, page_count = extract_text_from_pdf(file_path, on_page=on_page)
+        page_count = page_count or None
+    elif source_type == 'DOCX':
+        page_count = extract_text_from_docx(file_path, on_page)
+    elif source_type == 'PPTX':
+        page_count = extract_text_from_pptx(file_path, on_page)
+    elif source_type == 'TXT':
+        # A TXT file is stored as a single page
+        text_content = extract_text_from_txt(file_path, encoding=text_encoding)
+        if isinstance(text_content, str):
+            on_page(0, text_content)
+            page_count = 1
+    return page_count, []
+
+def run_source_extraction(source_id):
+    """
+    Extracts the text of an uploaded file and moves the source to READY, or to FAILED on error.
+    Pages are stored as they are extracted, while the source is still EXTRACTING.
+    """
+    try:
+        # Claim the source so that no other worker picks it up
+        claimed = Source.objects.filter(id=source_id, status='PENDING').update(
+            status='EXTRACTING', extraction_started_at=timezone.now()
+        )
+        if not claimed:
+            return
+
+        source = Source.objects.only('id', 'source_type', 'file', 'text_encoding').get(id=source_id)
+        print(f"Extracting text for {source.source_type} source {source.id}")
+        # Pages left by an earlier, interrupted attempt
+        delete_source_pages(source.id)
+        writer = SourcePageWriter(source.id)
+        try:
+            page_count, page_errors = extract_source_pages(
+                source.source_type, source.file.path, lambda index, text: writer.add(index + 1, text), source.text_encoding
+            )
+        except Exception as e:
+            print(f"Error extracting source {source.id}: {str(e)}")
+            page_count, page_errors = None, []
+
+        # A document is only usable if at least one page was extracted
+        error = None
+        if page_count is None or (page_errors and len(page_errors) >= page_count):
+            error = "Failed to extract text from file."
+            if page_errors:
+                error = f"{error} {page_errors[0]['error']}"
+        elif source.source_type != 'PDF' and not writer.has_text:
+            # Like the in-process extractors, documents without any text count as failed
+            print(f"Warning: {source.source_type} file {source.file.path} appears to be empty")
+            error = "Failed to extract text from file."
+        if error is not None:
+            fail_source_extraction(source, error)
+            print(f"Extraction failed for source {source.id}")
+            return
+
+        with transaction.atomic():
+            # Pages that failed are stored empty; clients can show which ones are missing
+            writer.finish(page_count)
+            Source.objects.filter(id=source.id).update(
+                status='READY',
+                page_count=page_count if source.source_type != 'TXT' else None,
+                page_errors=page_errors or None,
+                extraction_finished_at=timezone.now()
+            )
+        if page_errors:
+            print(f"Source {source.id}: {len(page_errors)} pages could not be extracted")
+        print(f"Source {source.id} is ready ({page_count} pages)")
+
+    except Exception as e:
+        print(f"Error running extraction for source {source_id}: {str(e)}")
+        try:
+            # Same cleanup as any other failure: stored pages, the uploaded file and its content hash
+            source = Source.objects.only('id', 'file').filter(id=source_id).first()
+            if source is not None:
+                fail_source_extraction(source, str(e))
+        except Exception as cleanup_error:
+            print(f"Error cleaning up failed extraction of source {source_id}: {str(cleanup_error)}")
+    finally:
+        _queued_source_ids.discard(source_id)
+        # Worker threads outlive the request cycle, so they must release their own connections
+        connections.close_all()
@@ -0,0 +1,124 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sources.compression import available_codecs, compress_text, decompress_text
+from sources.models import SourcePage
+
+VOCABULARY = (
+    "the of and to in is that for it as with was on be by this are or from at which an have "
+    "not were has their more also can been other its these than such into only one two new "
+    "cell membrane protein energy enzyme reaction molecule structure function process system "
+    "analysis theory evidence result method sample control variable outcome temperature pressure "
+    "population equation chapter section figure table example definition property value rate "
+    "increase decrease between during because therefore however although example important"
+).split()
+
+
+def synthetic_pages(documents, pages_per_document, words_per_page, seed):
+    """Yields (source_id, page_number, text) for a corpus of textbook-like pages."""
+    rng = random.Random(seed)
+    for source_id in range(1, documents + 1):
+        for page_number in range(1, pages_per_document + 1):
+            sentences = []
+            words_left = words_per_page
+            while words_left > 0:
+                length = min(words_left, rng.randint(8, 24))
+                words = [rng.choice(VOCABULARY) for _ in range(length)]
+                if rng.random() < 0.3:
+                    words.insert(rng.randrange(len(words)), f"{rng.randint(1, 999)}.{rng.randint(0, 99)}")
+                sentences.append(" ".join(words).capitalize() + ".")
+                words_left -= length
+            yield source_id, page_number, "\n".join(sentences)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares plain and compressed page text storage: SQLite file size and page read latency "
+        "(fetch plus decompression), using standalone SQLite files with the SourcePage layout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-db', action='store_true',
+                            help="Use the pages stored in the configured database instead of a synthetic corpus.")
+        parser.add_argument('--limit', type=int, default=20000, help="Maximum number of pages taken with --from-db.")
+        parser.add_argument('--documents', type=int, default=20, help="Synthetic documents.")
+        parser.add_argument('--pages', type=int, default=300, help="Pages per synthetic document.")
+        parser.add_argument('--words', type=int, default=450, help="Words per synthetic page.")
+        parser.add_argument('--reads', type=int, default=5000, help="Random single-page reads per codec.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            pages = [
+                (page.source_id, page.page_number, page.text)
+                for page in SourcePage.objects.order_by('id').only('source_id', 'page_number', 'plain_text', 'compressed_text')[:options['limit']]
+            ]
+            if not pages:
+                raise CommandError("No pages stored in the database.")
+        else:
+            pages = list(synthetic_pages(options['documents'], options['pages'], options['words'], options['seed']))
+        text_mb = sum(len(text.encode('utf-8')) for _, _, text in pages) / 1024 / 1024
+        documents = sorted({source_id for source_id, _, _ in pages})
+        self.stdout.write(f"Corpus: {len(pages)} pages in {len(documents)} documents, {text_mb:.1f} MB of text")
+        self.stdout.write(
+            f"{'codec':<6} {'write s':>8} {'DB MB':>8} {'ratio':>6} {'page read us':>13} {'document read ms':>17}"
+        )
+
+        rng = random.Random(options['seed'])
+        lookups = [rng.choice(pages)[:2] for _ in range(options['reads'])]
+        baseline_mb = None
+        with tempfile.TemporaryDirectory() as directory:
+            for codec in ['none'] + available_codecs():
+                path = os.path.join(directory, f'pages_{codec}.sqlite3')
+                db = sqlite3.connect(path)
+                db.execute(
+                    "CREATE TABLE sources_sourcepage (id INTEGER PRIMARY KEY, source_id INTEGER NOT NULL, "
+                    "page_number INTEGER NOT NULL, plain_text TEXT NOT NULL, compressed_text BLOB NULL)"
+                )
+                db.execute("CREATE UNIQUE INDEX unique_source_page ON sources_sourcepage (source_id, page_number)")
+
+                started = time.perf_counter()
+                rows = []
+                for source_id, page_number, text in pages:
+                    blob = compress_text(text, None if codec == 'none' else codec)
+                    rows.append((source_id, page_number, "" if blob is not None else text, blob))
+                db.executemany(
+                    "INSERT INTO sources_sourcepage (source_id, page_number, plain_text, compressed_text) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                db.commit()
+                write_seconds = time.perf_counter() - started
+                db.execute("VACUUM")
+                db.close()
+                db_mb = os.path.getsize(path) / 1024 / 1024
+                if baseline_mb is None:
+                    baseline_mb = db_mb
+
+                # Random single-page reads, as generation and previews do them
+                db = sqlite3.connect(path)
+                query = "SELECT plain_text, compressed_text FROM sources_sourcepage WHERE source_id = ? AND page_number = ?"
+                started = time.perf_counter()
+                for source_id, page_number in lookups:
+                    plain_text, compressed_text = db.execute(query, (source_id, page_number)).fetchone()
+                    text = decompress_text(compressed_text) if compressed_text is not None else plain_text
+                page_read_us = (time.perf_counter() - started) / len(lookups) * 1_000_000
+
+                # Whole documents in page order, as the non-PDF generation path reads them
+                query = "SELECT plain_text, compressed_text FROM sources_sourcepage WHERE source_id = ? ORDER BY page_number"
+                started = time.perf_counter()
+                for source_id in documents:
+                    for plain_text, compressed_text in db.execute(query, (source_id,)):
+                        if compressed_text is not None:
+                            decompress_text(compressed_text)
+                document_read_ms = (time.perf_counter() - started) / len(documents) * 1000
+                db.close()
+
+                self.stdout.write(
+                    f"{codec:<6} {write_seconds:>8.2f} {db_mb:>8.1f} {baseline_mb / db_mb:>5.1f}x "
+                    f"{page_read_us:>13.0f} {document_read_ms:>17.1f}"
+                )
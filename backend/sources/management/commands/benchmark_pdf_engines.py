@@ -0,0 +1,101 @@
+import importlib
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sources.pdf_engines import PDF_ENGINES, available_pdf_engines, get_pdf_engine
+
+
+def memory_kb(field):
+    """
+    Reads VmHWM (peak RSS) or VmRSS from /proc. ru_maxrss is only a fallback: on Linux it
+    carries over the parent's peak through fork and exec.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def measure_engine(engine_name, file_path):
+    """
+    Extracts every page of file_path with one engine. Runs in a fresh process, so the peak
+    RSS is that of this engine alone. Returns (pages, seconds, characters, baseline_kb, peak_kb).
+    """
+    engine = get_pdf_engine(engine_name)
+    importlib.import_module(engine.module)
+    baseline_kb = memory_kb('VmRSS')
+
+    started = time.perf_counter()
+    characters = 0
+    with engine.open(file_path) as document:
+        page_count = len(document)
+        for index in range(page_count):
+            characters += len(document.extract_page(index) or "")
+    elapsed = time.perf_counter() - started
+
+    peak_kb = memory_kb('VmHWM')
+    return page_count, elapsed, characters, baseline_kb, peak_kb
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the installed PDF extraction engines on a fixed corpus of synthetic PDFs "
+        "(plus any --files), reporting pages/sec and peak RSS. Each measurement runs in its "
+        "own process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[100, 400],
+                            help="Page counts of the synthetic PDFs in the corpus.")
+        parser.add_argument('--files', nargs='*', default=[], help="Additional PDF files to include.")
+        parser.add_argument('--engines', nargs='*', default=None,
+                            help=f"Engines to compare (default: all installed of {', '.join(PDF_ENGINES)}).")
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or available_pdf_engines()
+        missing = [name for name in engines if name not in PDF_ENGINES or not PDF_ENGINES[name].is_available()]
+        if missing:
+            raise CommandError(f"Engines not installed or unknown: {', '.join(missing)}")
+        self.stdout.write(f"Engines: {', '.join(engines)}")
+        self.stdout.write(
+            f"{'file':<24} {'engine':<10} {'pages':>6} {'seconds':>8} {'pages/s':>8} "
+            f"{'chars':>9} {'peak RSS MB':>12} {'RSS growth MB':>14}"
+        )
+
+        # Imported here so that the measuring processes do not load the other extractors
+        from sources.management.commands.benchmark_pdf_extraction import build_synthetic_pdf
+
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = []
+            for page_count in options['pages']:
+                path = os.path.join(directory, f'synthetic_{page_count}p.pdf')
+                build_synthetic_pdf(path, page_count)
+                corpus.append(path)
+            corpus.extend(options['files'])
+
+            context = multiprocessing.get_context('spawn')
+            for path in corpus:
+                for engine_name in engines:
+                    # A new process per measurement keeps peak RSS from leaking between engines
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        try:
+                            pages, elapsed, characters, baseline_kb, peak_kb = executor.submit(
+                                measure_engine, engine_name, path
+                            ).result()
+                        except Exception as e:
+                            self.stdout.write(f"{os.path.basename(path)[:24]:<24} {engine_name:<10} failed: {str(e)}")
+                            continue
+                    self.stdout.write(
+                        f"{os.path.basename(path)[:24]:<24} {engine_name:<10} {pages:>6} {elapsed:>8.2f} "
+                        f"{pages / elapsed:>8.0f} {characters:>9} {peak_kb / 1024:>12.1f} "
+                        f"{(peak_kb - baseline_kb) / 1024:>14.1f}"
+                    )
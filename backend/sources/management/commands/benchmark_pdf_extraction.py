@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sources.utils import extract_text_from_pdf
+
+WORDS = (
+    "cell membrane protein energy enzyme reaction molecule structure function process "
+    "system analysis theory evidence result method sample control variable outcome"
+).split()
+
+
+def _pdf_string(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_synthetic_pdf(path, page_count, lines_per_page=40, blank_every=10):
+    """
+    Writes a text-only PDF with page_count pages, using hand-written PDF syntax so that no
+    PDF writing library is needed. Every blank_every-th page is left blank.
+    """
+    objects = []  # Object bodies; object number is index + 1
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for page_index in range(page_count):
+        if blank_every and (page_index + 1) % blank_every == 0:
+            stream = b""
+        else:
+            lines = []
+            for line_index in range(lines_per_page):
+                words = [WORDS[(page_index * 7 + line_index * 3 + i) % len(WORDS)] for i in range(12)]
+                lines.append(f"({_pdf_string(f'Page {page_index + 1} line {line_index + 1}: ' + ' '.join(words))}) Tj T*")
+            stream = ("BT /F1 9 Tf 11 TL 40 800 Td\n" + "\n".join(lines) + "\nET").encode('latin-1')
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages
+    objects[pages - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), page_count
+    )
+
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref_offset))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks PDF text extraction on synthetic multi-hundred-page PDFs: serial vs. the "
+        "process pool. Fails if the two paths return different page texts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[50, 200, 400],
+                            help="Page counts of the generated PDFs.")
+        parser.add_argument('--lines-per-page', type=int, default=40)
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes for the parallel run (defaults to PDF_EXTRACTION_WORKERS).")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or getattr(settings, 'PDF_EXTRACTION_WORKERS', os.cpu_count() or 1)
+        self.stdout.write(f"Workers: {workers} (CPUs available: {os.cpu_count()})")
+        self.stdout.write(f"{'pages':>6} {'serial (s)':>11} {'pages/s':>9} {'parallel (s)':>13} {'pages/s':>9} {'speedup':>8}")
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Start the pool before timing so process start-up is not counted against one file
+            warmup_path = os.path.join(directory, 'warmup.pdf')
+            build_synthetic_pdf(warmup_path, workers * 2, options['lines_per_page'])
+            extract_text_from_pdf(warmup_path, max_workers=workers, min_parallel_pages=0)
+
+            for page_count in options['pages']:
+                path = os.path.join(directory, f'synthetic_{page_count}.pdf')
+                build_synthetic_pdf(path, page_count, options['lines_per_page'])
+
+                started = time.perf_counter()
+                serial_texts, serial_count = extract_text_from_pdf(path, max_workers=1)
+                serial = time.perf_counter() - started
+
+                started = time.perf_counter()
+                parallel_texts, parallel_count = extract_text_from_pdf(path, max_workers=workers, min_parallel_pages=0)
+                parallel = time.perf_counter() - started
+
+                if serial_texts is None or serial_count != page_count:
+                    raise CommandError(f"Serial extraction failed for the {page_count}-page PDF")
+                if parallel_texts != serial_texts or parallel_count != serial_count:
+                    raise CommandError(f"Parallel extraction returned different page texts for the {page_count}-page PDF")
+
+                self.stdout.write(
+                    f"{page_count:>6} {serial:>11.2f} {page_count / serial:>9.0f} {parallel:>13.2f} "
+                    f"{page_count / parallel:>9.0f} {serial / parallel:>7.1f}x"
+                )
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sources.compression import available_codecs, compressed_codec, get_page_compression
+from sources.models import SourcePage
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites stored page text with the configured SOURCE_PAGE_COMPRESSION (or --codec), in "
+        "batches. Use --codec none to store every page as plain text again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codec', choices=available_codecs() + ['none'], default=None,
+                            help="Codec to convert to (defaults to SOURCE_PAGE_COMPRESSION).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Pages rewritten per UPDATE batch.")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="Run VACUUM afterwards so SQLite returns the freed space to the file system.")
+
+    def handle(self, *args, **options):
+        codec = options['codec'] if options['codec'] is not None else get_page_compression()
+        if codec == 'none':
+            codec = None
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be positive.")
+
+        converted = 0
+        bytes_before = 0
+        bytes_after = 0
+        last_id = 0
+        while True:
+            # Walk the table by primary key so each batch is a cheap range scan
+            pages = list(
+                SourcePage.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'plain_text', 'compressed_text')[:batch_size]
+            )
+            if not pages:
+                break
+            last_id = pages[-1].id
+
+            changed = []
+            for page in pages:
+                current_codec = compressed_codec(page.compressed_text) if page.compressed_text is not None else None
+                if current_codec == codec:
+                    continue
+                size = len(page.compressed_text) if page.compressed_text is not None else len(page.plain_text.encode('utf-8'))
+                page.set_text(page.text, codec)
+                if current_codec is None and page.compressed_text is None:
+                    continue  # Too short or incompressible: stays plain text
+                bytes_before += size
+                bytes_after += len(page.compressed_text) if page.compressed_text is not None else len(page.plain_text.encode('utf-8'))
+                changed.append(page)
+            if changed:
+                SourcePage.objects.bulk_update(changed, ['plain_text', 'compressed_text'])
+                converted += len(changed)
+                self.stdout.write(f"Converted {converted} pages (up to page id {last_id})")
+
+        self.stdout.write(
+            f"Done: {converted} pages converted to {codec or 'plain text'}; "
+            f"{bytes_before / 1024 / 1024:.1f} MB -> {bytes_after / 1024 / 1024:.1f} MB of page text."
+        )
+        if options['vacuum']:
+            if connection.vendor != 'sqlite':
+                self.stdout.write("--vacuum only applies to SQLite; skipped.")
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute("VACUUM")
+                self.stdout.write("VACUUM finished.")
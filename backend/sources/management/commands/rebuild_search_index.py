@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sources.search import rebuild_page_index, rebuild_question_index, search_supported
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the full-text search index from the stored pages and questions, e.g. after "
+        "rows were changed outside the application or the sources.W001/W002 checks warn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Pages indexed per batch.")
+
+    def handle(self, *args, **options):
+        if not search_supported():
+            raise CommandError("Full-text search is only available on SQLite and PostgreSQL.")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+        # One transaction, so searches never see a half-built index
+        with transaction.atomic():
+            indexed = rebuild_page_index(batch_size=options['batch_size'], stdout=self.stdout)
+            rebuild_question_index()
+        self.stdout.write(f"Done: {indexed} pages indexed, question index rebuilt.")
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sources.extraction import recover_stale_extractions, run_source_extraction
+from sources.models import Source
+
+
+class Command(BaseCommand):
+    help = "Extracts the text of pending uploads in a standalone local worker process (no broker needed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Process the sources that are currently pending, then exit.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when no source is pending.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Waiting for uploads to extract...")
+        while True:
+            # Pending sources are picked up below
+            recover_stale_extractions(requeue_pending=False)
+            source_ids = list(
+                Source.objects.filter(status='PENDING').order_by('uploaded_at').values_list('id', flat=True)
+            )
+            for source_id in source_ids:
+                # run_source_extraction claims the source atomically, so several workers can share the queue
+                run_source_extraction(source_id)
+
+            if options['once']:
+                break
+            if not source_ids:
+                time.sleep(options['poll_interval'])
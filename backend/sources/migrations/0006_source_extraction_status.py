@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0005_source_source_metadata_alter_source_file_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='extraction_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='extraction_finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='extraction_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('EXTRACTING', 'Extracting'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='READY', max_length=10),
+        ),
+    ]
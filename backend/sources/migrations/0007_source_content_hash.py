@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:19
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def hash_existing_files(apps, schema_editor):
+    # Existing uploads get their hash so that re-uploads of them are recognised too.
+    # If the same content was uploaded twice before, only the oldest source gets the hash.
+    Source = apps.get_model('sources', 'Source')
+    seen = set()
+    for source in Source.objects.exclude(file__isnull=True).exclude(file='').only('id', 'file').order_by('id'):
+        try:
+            sha256 = hashlib.sha256()
+            with default_storage.open(source.file.name, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha256.update(chunk)
+        except (OSError, ValueError):
+            continue  # File is missing from storage
+        content_hash = sha256.hexdigest()
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        Source.objects.filter(id=source.id).update(content_hash=content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0006_source_extraction_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(hash_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0007_source_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='text_encoding',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
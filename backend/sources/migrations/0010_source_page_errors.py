@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0009_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='page_errors',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:30
+
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def page_text(item):
+    # Older YouTube sources may hold None or a list of transcript snippets instead of a string
+    if item is None:
+        return ""
+    if isinstance(item, list):
+        return " ".join(str(part) for part in item)
+    return str(item)
+
+
+def copy_text_content_to_pages(apps, schema_editor):
+    # Every item of the text_content JSON list becomes one SourcePage row
+    Source = apps.get_model('sources', 'Source')
+    SourcePage = apps.get_model('sources', 'SourcePage')
+    sources = Source.objects.exclude(text_content__isnull=True).only('id', 'text_content').order_by('id')
+    for source in sources.iterator(chunk_size=20):
+        if not isinstance(source.text_content, list):
+            continue
+        pages = []
+        for index, item in enumerate(source.text_content):
+            text = page_text(item)
+            pages.append(SourcePage(
+                source_id=source.id,
+                page_number=index + 1,
+                text=text,
+                char_count=len(text),
+                word_count=len(text.split()),
+                content_hash=hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            ))
+        SourcePage.objects.bulk_create(pages, batch_size=500)
+
+
+def copy_pages_to_text_content(apps, schema_editor):
+    Source = apps.get_model('sources', 'Source')
+    SourcePage = apps.get_model('sources', 'SourcePage')
+    for source_id in SourcePage.objects.values_list('source_id', flat=True).distinct():
+        texts = list(SourcePage.objects.filter(source_id=source_id).order_by('page_number').values_list('text', flat=True))
+        Source.objects.filter(id=source_id).update(text_content=texts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0010_source_page_errors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourcePage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField()),
+                ('text', models.TextField(blank=True, default='')),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='sources.source')),
+            ],
+            options={
+                'ordering': ['source', 'page_number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sourcepage',
+            constraint=models.UniqueConstraint(fields=('source', 'page_number'), name='unique_source_page'),
+        ),
+        migrations.RunPython(copy_text_content_to_pages, copy_pages_to_text_content),
+        migrations.RemoveField(
+            model_name='source',
+            name='text_content',
+        ),
+    ]
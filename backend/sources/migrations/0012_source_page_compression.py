@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:40
+
+import zlib
+
+from django.db import migrations, models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def decompress_text(blob):
+    # Kept here rather than imported from sources.compression, so this migration cannot change.
+    # Compressed text is b'QT' + a codec byte (b'z' zlib, b's' zstd) + the compressed UTF-8 payload.
+    blob = bytes(blob)
+    if blob[2:3] == b'z':
+        return zlib.decompress(blob[3:]).decode('utf-8')
+    if zstandard is None:
+        raise RuntimeError("Some pages are compressed with zstd; install zstandard to migrate.")
+    return zstandard.ZstdDecompressor().decompress(blob[3:]).decode('utf-8')
+
+def decompress_pages(apps, schema_editor):
+    # Before compressed_text is dropped on reverse, move its text back to the plain column
+    SourcePage = apps.get_model('sources', 'SourcePage')
+    pages = SourcePage.objects.exclude(compressed_text__isnull=True).only('id', 'compressed_text')
+    batch = []
+    for page in pages.iterator(chunk_size=500):
+        page.plain_text = decompress_text(page.compressed_text)
+        page.compressed_text = None
+        batch.append(page)
+        if len(batch) >= 500:
+            SourcePage.objects.bulk_update(batch, ['plain_text', 'compressed_text'])
+            batch = []
+    SourcePage.objects.bulk_update(batch, ['plain_text', 'compressed_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0011_source_pages'),
+    ]
+
+    # Existing pages stay plain text; `manage.py compress_source_pages` compresses them
+    operations = [
+        migrations.RenameField(
+            model_name='sourcepage',
+            old_name='text',
+            new_name='plain_text',
+        ),
+        migrations.AddField(
+            model_name='sourcepage',
+            name='compressed_text',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, decompress_pages),
+    ]
@@ -0,0 +1,83 @@
+import zlib
+
+from django.db import migrations
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# The SQL and the page text decoding are kept here rather than imported from sources.search
+# and sources.compression, so that applied migrations do not change when that code does.
+TOKENIZE = "porter unicode61 remove_diacritics 2"
+SEARCH_CONFIG = 'english'
+BATCH_SIZE = 500
+
+
+def decompress_text(blob):
+    # Compressed text is b'QT' + a codec byte (b'z' zlib, b's' zstd) + the compressed UTF-8 payload
+    blob = bytes(blob)
+    if blob[2:3] == b'z':
+        return zlib.decompress(blob[3:]).decode('utf-8')
+    if zstandard is None:
+        raise RuntimeError("Some pages are compressed with zstd; install zstandard to migrate.")
+    return zstandard.ZstdDecompressor().decompress(blob[3:]).decode('utf-8')
+
+def index_rows(schema_editor, rows):
+    if not rows:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'sqlite':
+            cursor.executemany("INSERT INTO sources_sourcepage_fts(rowid, body) VALUES (%s, %s)", rows)
+        else:
+            cursor.executemany(
+                f"UPDATE sources_sourcepage SET search_vector = to_tsvector('{SEARCH_CONFIG}', %s) WHERE id = %s",
+                [(text, page_id) for page_id, text in rows]
+            )
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Contentless: page text may be stored compressed, so pages are indexed from code
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS sources_sourcepage_fts USING fts5(body, content='', tokenize='{TOKENIZE}')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE sources_sourcepage ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS sources_sourcepage_search_idx ON sources_sourcepage USING GIN (search_vector)"
+        )
+    else:
+        return
+
+    # Index the pages that are already stored
+    SourcePage = apps.get_model('sources', 'SourcePage')
+    rows = []
+    for page in SourcePage.objects.order_by('id').only('id', 'plain_text', 'compressed_text').iterator(chunk_size=BATCH_SIZE):
+        text = decompress_text(page.compressed_text) if page.compressed_text is not None else page.plain_text
+        rows.append((page.id, text))
+        if len(rows) >= BATCH_SIZE:
+            index_rows(schema_editor, rows)
+            rows = []
+    index_rows(schema_editor, rows)
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS sources_sourcepage_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS sources_sourcepage_search_idx")
+        schema_editor.execute("ALTER TABLE sources_sourcepage DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0012_source_page_compression'),
+    ]
+
+    # Full-text index of page text: FTS5 on SQLite, a tsvector column with a GIN index on
+    # PostgreSQL (see sources/search.py). Nothing is created on other database backends.
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models 
-import json
-from django.core.exceptions import ValidationError
+import uuid
+
+from .compression import compress_text, decompress_text, get_page_compression
 
 
 class Source(models.Model):
@@ -12,16 +13,32 @@ class Source(models.Model):
         ('YOUTUBE', 'YOUTUBE'),
     )
 
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('EXTRACTING', 'Extracting'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    )
+
     source_type = models.CharField(max_length=10, choices=SOURCE_TYPES)
     file = models.FileField(upload_to='uploads/', blank=True, null=True)
     youtube_link = models.URLField(blank=True, null=True)
-    # For PDFs: list of strings (text per page). For others: list containing a single string (full text).
-    text_content = models.JSONField(null=True, blank=True)
     page_count = models.IntegerField(blank=True, null=True) # For PDF files
     video_duration = models.CharField(max_length=20, blank=True, null=True) # For YouTube videos (e.g., "10:35")
     # To store any specific metadata used for generation, e.g., page ranges, time ranges.
     source_metadata = models.JSONField(blank=True, null=True) 
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Uploaded files are extracted in the background; pages are only stored once READY
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='READY')
+    # SHA-256 of the uploaded file; identical uploads reuse this source instead of being extracted again
+    content_hash = models.CharField(max_length=64, unique=True, blank=True, null=True)
+    # Encoding of TXT uploads, sniffed while the upload streamed in
+    text_encoding = models.CharField(max_length=20, blank=True, null=True)
+    extraction_error = models.TextField(blank=True, null=True)
+    # Pages that could not be extracted (timed out, crashed, ...): list of {'page', 'error'} dicts
+    page_errors = models.JSONField(blank=True, null=True)
+    extraction_started_at = models.DateTimeField(blank=True, null=True)
+    extraction_finished_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         if self.file:
@@ -30,9 +47,81 @@ class Source(models.Model):
             return f"{self.get_source_type_display()}: {self.youtube_link}"
         return f"{self.get_source_type_display()} - Unknown"
 
-    def clean(self):
-        if self.text_content:
-            try:
-                json.loads(self.text_content)
-            except json.JSONDecodeError:
-                raise ValidationError("text_content must be valid JSON.")
\ No newline at end of file
+    @property
+    def text_content(self):
+        """
+        The extracted text as a list of page texts (one per PDF page, PPTX slide or DOCX page,
+        a single item for TXT and YouTube), or None if nothing was extracted. Kept for
+        compatibility: it loads every page, so code that needs only some pages should query
+        SourcePage directly (see sources.pages).
+        """
+        page_texts = [page.text for page in self.pages.order_by('page_number').only('plain_text', 'compressed_text')]
+        return page_texts or None
+
+class SourcePage(models.Model):
+    """
+    Extracted text of one page of a source: a PDF page, a PPTX slide, a group of DOCX
+    paragraphs, or the whole text of a TXT file or YouTube transcript.
+    """
+    source = models.ForeignKey(Source, related_name='pages', on_delete=models.CASCADE)
+    page_number = models.PositiveIntegerField() # 1-indexed
+    # The text is stored in one of two columns: compressed_text (header + zlib/zstd payload, see
+    # sources.compression) when SOURCE_PAGE_COMPRESSION is set and compression pays off, otherwise
+    # plain_text. Read and write it through the text property.
+    plain_text = models.TextField(blank=True, default='')
+    compressed_text = models.BinaryField(blank=True, null=True)
+    char_count = models.PositiveIntegerField(default=0)
+    word_count = models.PositiveIntegerField(default=0)
+    # SHA-256 of the text; the same value as the content fingerprint of questions generated from it
+    content_hash = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ['source', 'page_number']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'page_number'], name='unique_source_page'),
+        ]
+
+    def __str__(self):
+        return f"Page {self.page_number} of source {self.source_id}"
+
+    @property
+    def text(self):
+        """The page text; compressed text is decompressed on first access and then cached."""
+        if self.compressed_text is None:
+            return self.plain_text
+        if getattr(self, '_text', None) is None:
+            self._text = decompress_text(self.compressed_text)
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        self.set_text(value, get_page_compression())
+
+    def set_text(self, value, codec):
+        """Stores value compressed with codec (None for plain text)."""
+        value = value or ""
+        self.compressed_text = compress_text(value, codec)
+        self.plain_text = "" if self.compressed_text is not None else value
+        self._text = value
+
+class UploadSession(models.Model):
+    """
+    A resumable upload sent in chunks. Chunks are appended to a part file on disk at
+    increasing offsets; finalizing the session turns the complete file into a Source.
+    """
+    STATUS_CHOICES = (
+        ('ACTIVE', 'Active'),
+        ('COMPLETE', 'Complete'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)  # Offset at which the next chunk must start
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE')
+    source = models.ForeignKey(Source, on_delete=models.SET_NULL, related_name='upload_sessions', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id}: {self.file_name} ({self.received_size}/{self.total_size} bytes)"
@@ -0,0 +1,109 @@
+import hashlib
+
+from django.db import transaction
+
+from .models import SourcePage
+from .search import index_pages, unindex_source_pages
+
+# Pages written per INSERT when a source's pages are saved
+PAGE_INSERT_BATCH_SIZE = 500
+
+
+def page_content_hash(text):
+    """SHA-256 of a page's text (the same value questions.utils.page_fingerprint computes)."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def build_source_page(source_id, page_number, text):
+    text = text or ""
+    return SourcePage(
+        source_id=source_id,
+        page_number=page_number,
+        text=text,
+        char_count=len(text),
+        word_count=len(text.split()),
+        content_hash=page_content_hash(text),
+    )
+
+class SourcePageWriter:
+    """
+    Stores the pages of a source as they are extracted, PAGE_INSERT_BATCH_SIZE at a time, so
+    a large document is never held in memory as a whole. Pages may arrive in any order (PDF
+    page ranges are extracted in parallel); finish() stores the ones that never arrived as "".
+    """
+
+    def __init__(self, source_id, batch_size=PAGE_INSERT_BATCH_SIZE):
+        self.source_id = source_id
+        self.batch_size = batch_size
+        self.batch = []
+        self.page_numbers = set()
+        self.has_text = False
+
+    def add(self, page_number, text):
+        text = text or ""
+        self.batch.append(build_source_page(self.source_id, page_number, text))
+        self.page_numbers.add(page_number)
+        self.has_text = self.has_text or bool(text.strip())
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        # bulk_create sets the ids on SQLite 3.35+ and PostgreSQL, which the search index is keyed by
+        pages = SourcePage.objects.bulk_create(self.batch)
+        index_pages(pages)
+        self.batch = []
+
+    def finish(self, page_count):
+        """Stores the pages up to page_count that were never added (failed pages) as empty pages."""
+        for page_number in range(1, page_count + 1):
+            if page_number not in self.page_numbers:
+                self.add(page_number, "")
+        self.flush()
+
+def delete_source_pages(source_id):
+    """Deletes the stored pages of a source, removing them from the search index first."""
+    with transaction.atomic():
+        unindex_source_pages(source_id)
+        SourcePage.objects.filter(source_id=source_id).delete()
+
+def save_source_pages(source_id, page_texts):
+    """Replaces the stored pages of a source with page_texts (any iterable in page order, "" for blank pages)."""
+    with transaction.atomic():
+        delete_source_pages(source_id)
+        writer = SourcePageWriter(source_id)
+        for index, text in enumerate(page_texts):
+            writer.add(index + 1, text)
+        writer.flush()
+
+def load_page_texts(source_id, page_numbers=None):
+    """
+    Returns {page_number: text} for the given page numbers of a source (all pages if None),
+    fetching only those rows. Page numbers that do not exist are left out.
+    """
+    pages = SourcePage.objects.filter(source_id=source_id)
+    if page_numbers is not None:
+        pages = pages.filter(page_number__in=list(page_numbers))
+    return {page.page_number: page.text for page in pages.only('page_number', 'plain_text', 'compressed_text')}
+
+def load_page_stats(source_id):
+    """Returns {page_number: (content_hash, word_count)} for every page of a source, without the texts."""
+    return {
+        page_number: (content_hash, word_count)
+        for page_number, content_hash, word_count
+        in SourcePage.objects.filter(source_id=source_id).values_list('page_number', 'content_hash', 'word_count')
+    }
+
+def iter_page_texts(source_id, max_chars=None):
+    """
+    Yields the page texts of a source in page order, reading them in chunks. With max_chars,
+    stops once that many characters have been yielded, so only the pages needed are fetched.
+    """
+    yielded_chars = 0
+    pages = SourcePage.objects.filter(source_id=source_id).order_by('page_number').only('plain_text', 'compressed_text')
+    for page in pages.iterator(chunk_size=50):
+        if max_chars is not None and yielded_chars >= max_chars:
+            return
+        text = page.text
+        yielded_chars += len(text)
+        yield text
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Cursor pagination that only applies when the client asks for it with ?page_size= or
+    ?cursor=. Without either, the full list is returned as a plain array, which is what
+    the existing frontend expects.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-uploaded_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_size_query_param not in request.query_params and self.cursor_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,196 @@
+import abc
+import importlib.util
+import io
+import threading
+
+from django.conf import settings
+
+
+class PDFDocument(abc.ABC):
+    """An open PDF: len() gives the page count and extract_page(index) the text of one page."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    @abc.abstractmethod
+    def __len__(self):
+        """Returns the number of pages."""
+
+    @abc.abstractmethod
+    def extract_page(self, index):
+        """Returns the text of the page at index (0-based), "" if it has none."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PDFEngine(abc.ABC):
+    """A PDF text extraction library. Subclasses name the module they need and open documents."""
+
+    name = None
+    module = None
+
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec(cls.module) is not None
+
+    @abc.abstractmethod
+    def open(self, file_path):
+        """Returns a PDFDocument for file_path."""
+
+
+class _ReaderDocument(PDFDocument):
+    """PyPDF2 and pypdf share the same PdfReader API."""
+
+    def __init__(self, file_path, reader_class):
+        super().__init__(file_path)
+        self.file = open(file_path, 'rb')
+        try:
+            self.reader = reader_class(self.file)
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self):
+        return len(self.reader.pages)
+
+    def extract_page(self, index):
+        return self.reader.pages[index].extract_text() or ""
+
+    def close(self):
+        self.file.close()
+
+
+class PyPDF2Engine(PDFEngine):
+    name = 'pypdf2'
+    module = 'PyPDF2'
+
+    def open(self, file_path):
+        import PyPDF2
+        return _ReaderDocument(file_path, PyPDF2.PdfReader)
+
+
+class PypdfEngine(PDFEngine):
+    name = 'pypdf'
+    module = 'pypdf'
+
+    def open(self, file_path):
+        import pypdf
+        return _ReaderDocument(file_path, pypdf.PdfReader)
+
+
+# PDFium is not thread-safe, so calls into it are serialised within a process
+_pdfium_lock = threading.RLock()
+
+class _PdfiumDocument(PDFDocument):
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        import pypdfium2
+        with _pdfium_lock:
+            self.document = pypdfium2.PdfDocument(file_path)
+
+    def __len__(self):
+        return len(self.document)
+
+    def extract_page(self, index):
+        with _pdfium_lock:
+            page = self.document[index]
+            try:
+                text_page = page.get_textpage()
+                try:
+                    text = text_page.get_text_range()
+                finally:
+                    text_page.close()
+            finally:
+                page.close()
+        # PDFium uses CRLF line endings; normalise to match the other engines
+        return text.replace('\r\n', '\n') if text and text.strip() else ""
+
+    def close(self):
+        with _pdfium_lock:
+            self.document.close()
+
+
+class Pypdfium2Engine(PDFEngine):
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+
+    def open(self, file_path):
+        return _PdfiumDocument(file_path)
+
+
+class _PdfminerDocument(PDFDocument):
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        from pdfminer.pdfdocument import PDFDocument as MinerDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+        self.file = open(file_path, 'rb')
+        try:
+            self.pages = list(PDFPage.create_pages(MinerDocument(PDFParser(self.file))))
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self):
+        return len(self.pages)
+
+    def extract_page(self, index):
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        output = io.StringIO()
+        resource_manager = PDFResourceManager()
+        with TextConverter(resource_manager, output, laparams=LAParams()) as device:
+            PDFPageInterpreter(resource_manager, device).process_page(self.pages[index])
+        text = output.getvalue()
+        return text if text.strip() else ""
+
+    def close(self):
+        self.file.close()
+
+
+class PdfminerEngine(PDFEngine):
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def open(self, file_path):
+        return _PdfminerDocument(file_path)
+
+
+# Engines in order of preference for PDF_EXTRACTION_ENGINE = 'auto' (fastest first)
+PDF_ENGINES = {
+    engine.name: engine
+    for engine in (Pypdfium2Engine, PypdfEngine, PyPDF2Engine, PdfminerEngine)
+}
+
+def available_pdf_engines():
+    """Returns the names of the engines whose library is installed, in order of preference."""
+    return [name for name, engine in PDF_ENGINES.items() if engine.is_available()]
+
+def get_pdf_engine(name=None):
+    """
+    Returns the PDF engine named by name or the PDF_EXTRACTION_ENGINE setting.
+    'auto' picks the fastest installed engine. A configured engine that is not installed
+    falls back to 'auto' with a warning.
+    """
+    name = (name or getattr(settings, 'PDF_EXTRACTION_ENGINE', 'auto') or 'auto').lower()
+    if name != 'auto':
+        if name not in PDF_ENGINES:
+            raise ValueError(f"Unknown PDF engine '{name}'. Choose one of: auto, {', '.join(PDF_ENGINES)}")
+        if PDF_ENGINES[name].is_available():
+            return PDF_ENGINES[name]()
+        print(f"Warning: PDF engine '{name}' is not installed. Picking one automatically.")
+
+    available = available_pdf_engines()
+    if not available:
+        raise RuntimeError("No PDF extraction library is installed (install pypdfium2, pypdf or PyPDF2).")
+    return PDF_ENGINES[available[0]]()
@@ -0,0 +1,272 @@
+import multiprocessing
+import resource
+import signal
+import time
+from multiprocessing.connection import wait
+
+import docx
+from django.conf import settings
+from pptx import Presentation
+
+from .pdf_engines import get_pdf_engine
+from .utils import extract_text_from_txt, iter_docx_pages, iter_pdf_pages, iter_pptx_slides
+
+# Seconds a worker may stay silent beyond the page time budget before it is killed. The budget is
+# enforced inside the worker with a timer signal, which cannot interrupt a call stuck in C code.
+PAGE_KILL_GRACE = 5
+# A page range whose worker keeps crashing is given up after this many restarts
+MAX_WORKER_RESTARTS = 3
+
+
+class PageTimeoutError(Exception):
+    pass
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeoutError()
+
+def _open_document(source_type, file_path, text_encoding, engine_name):
+    """
+    Opens a document in the worker. Returns (page_count, iter_pages, close): page_count is None
+    when it is only known after a full pass (DOCX), and iter_pages(start) returns a generator over
+    the page texts from page start on.
+    """
+    if source_type == 'PDF':
+        document = get_pdf_engine(engine_name).open(file_path)
+        return len(document), lambda start: iter_pdf_pages(document, start), document.close
+    if source_type == 'PPTX':
+        prs = Presentation(file_path)
+        return len(prs.slides), lambda start: iter_pptx_slides(prs, start), lambda: None
+    if source_type == 'DOCX':
+        doc = docx.Document(file_path)
+        return None, lambda start: iter_docx_pages(doc, start), lambda: None
+    if source_type == 'TXT':
+        return 1, lambda start: (extract_text_from_txt(file_path, encoding=text_encoding) or "" for _ in range(start, 1)), lambda: None
+    raise ValueError(f"Unsupported source type: {source_type}")
+
+def _extraction_worker(conn, source_type, file_path, text_encoding, engine_name, start, stop, wait_for_stop,
+                       memory_limit, cpu_limit, page_timeout):
+    """
+    Runs in a child process. Extracts pages [start, stop) (to the end if stop is None) and sends
+    one message per page, so the parent keeps every page that finished even if this process is
+    killed later. With wait_for_stop the parent sends stop after receiving the page count.
+    """
+    # Limits apply to this process only: a runaway document cannot take the web worker with it
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    if cpu_limit:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 5))
+    signal.signal(signal.SIGALRM, _raise_page_timeout)
+
+    try:
+        page_count, iter_pages, close = _open_document(source_type, file_path, text_encoding, engine_name)
+    except MemoryError:
+        conn.send(('error', "Ran out of memory while opening the document."))
+        return
+    except Exception as e:
+        conn.send(('error', f"Could not open the document: {e}"))
+        return
+
+    try:
+        conn.send(('count', page_count))
+        if wait_for_stop:
+            stop = conn.recv()
+        pages = None
+        index = start
+        while stop is None or index < stop:
+            error = None
+            try:
+                if page_timeout:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                if pages is None:
+                    pages = iter_pages(index)
+                text = next(pages)
+            except StopIteration:
+                break
+            except PageTimeoutError:
+                error = f"Extraction took longer than {page_timeout} seconds."
+            except MemoryError:
+                error = "Ran out of memory."
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            if error is None:
+                conn.send(('page', index, text))
+            else:
+                conn.send(('page_error', index, error))
+                # A generator cannot continue after raising; a new one resumes after this page
+                pages = None
+            index += 1
+        conn.send(('done',))
+    finally:
+        close()
+        conn.close()
+
+def _describe_exit(process, memory_limit):
+    if process.exitcode == -signal.SIGXCPU:
+        return "Worker exceeded its CPU time limit."
+    if process.exitcode == -signal.SIGKILL:
+        return "Worker was killed."
+    if process.exitcode and process.exitcode < 0:
+        return f"Worker crashed (signal {-process.exitcode})."
+    if memory_limit:
+        return f"Worker exited unexpectedly (exit code {process.exitcode}), possibly after exceeding the {memory_limit // (1024 * 1024)} MB memory limit."
+    return f"Worker exited unexpectedly (exit code {process.exitcode})."
+
+def extract_in_sandbox(source_type, file_path, on_page, text_encoding=None, timeout=None, page_timeout=None,
+                       memory_limit=None, max_workers=None, engine=None):
+    """
+    Extracts a document in separate, resource-limited processes, so that a pathological file
+    can neither hang nor exhaust the memory of the calling process.
+    on_page: Callable(index, text) that receives each page as soon as a worker sends it, so the
+    caller can store it right away; pages of large PDFs arrive out of order (one range per worker).
+    timeout: Wall-clock seconds for the whole document (defaults to SOURCE_EXTRACTION_TIMEOUT).
+    page_timeout: Seconds per page, slide or paragraph group (defaults to SOURCE_EXTRACTION_PAGE_TIMEOUT).
+    memory_limit: Address space limit of each worker in bytes (defaults to SOURCE_EXTRACTION_MEMORY_LIMIT).
+    max_workers: Worker processes for large PDFs, which are split into page ranges like in
+    extract_text_from_pdf (defaults to PDF_EXTRACTION_WORKERS).
+    engine: PDF engine name (defaults to PDF_EXTRACTION_ENGINE, see sources.pdf_engines).
+    A page that fails, times out or crashes its worker is not passed to on_page and is reported,
+    and the worker is restarted after it. Pages that finished before the overall timeout are kept.
+    Returns (page_count, page_errors). page_errors is a list of {'page', 'error'} dicts (page
+    numbers start at 1; page is None for errors about the whole document). page_count is None if
+    the document could not be opened.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'SOURCE_EXTRACTION_TIMEOUT', 600)
+    if page_timeout is None:
+        page_timeout = getattr(settings, 'SOURCE_EXTRACTION_PAGE_TIMEOUT', 60)
+    if memory_limit is None:
+        memory_limit = getattr(settings, 'SOURCE_EXTRACTION_MEMORY_LIMIT', 1024 * 1024 * 1024)
+    if max_workers is None:
+        max_workers = getattr(settings, 'PDF_EXTRACTION_WORKERS', 1)
+    min_parallel_pages = getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 40)
+    # Resolved here so that the workers use this process's settings
+    engine_name = get_pdf_engine(engine).name if source_type == 'PDF' else None
+
+    context = multiprocessing.get_context('spawn')
+    deadline = time.monotonic() + timeout
+    page_count = None
+    opened = False
+    last_page = -1  # Highest page index seen, for documents whose page count is not known upfront
+    page_errors = {}
+    document_error = None
+    workers = []
+
+    def start_worker(start, stop, restarts=0, wait_for_stop=False):
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_extraction_worker,
+            args=(child_conn, source_type, file_path, text_encoding, engine_name, start, stop, wait_for_stop,
+                  memory_limit, int(timeout) + 1, page_timeout),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        workers.append({'process': process, 'conn': parent_conn, 'next': start, 'stop': stop,
+                        'restarts': restarts, 'last_activity': None})
+
+    def stop_worker(worker):
+        workers.remove(worker)
+        if worker['process'].is_alive():
+            worker['process'].kill()
+        worker['process'].join()
+        worker['conn'].close()
+
+    def give_up_page(worker, error):
+        # The current page gets the error; the rest of the range is retried by a new worker
+        stop_worker(worker)
+        stop = worker['stop']
+        if stop is not None and worker['next'] >= stop:
+            return
+        page_errors[worker['next']] = error
+        if stop is not None and worker['next'] + 1 >= stop:
+            return
+        if worker['restarts'] < MAX_WORKER_RESTARTS:
+            start_worker(worker['next'] + 1, stop, worker['restarts'] + 1)
+        elif stop is not None:
+            for index in range(worker['next'] + 1, stop):
+                page_errors[index] = "Skipped after repeated worker failures."
+
+    start_worker(0, None, wait_for_stop=True)
+    try:
+        while workers:
+            now = time.monotonic()
+            if now >= deadline:
+                error = f"Document extraction exceeded {timeout} seconds."
+                if not opened:
+                    document_error = error
+                for worker in list(workers):
+                    if worker['stop'] is None:
+                        # The number of remaining pages is unknown
+                        page_errors[worker['next']] = f"{error} Later pages were not extracted."
+                    for index in range(worker['next'], worker['stop'] or 0):
+                        page_errors[index] = error
+                    stop_worker(worker)
+                break
+
+            # Workers stuck on one page for longer than the page budget are killed
+            for worker in list(workers):
+                if worker['last_activity'] is not None and now - worker['last_activity'] > page_timeout + PAGE_KILL_GRACE:
+                    print(f"Killing extraction worker stuck on page {worker['next'] + 1} of {file_path}")
+                    give_up_page(worker, f"Extraction took longer than {page_timeout} seconds.")
+
+            wait_for = deadline - now
+            if page_timeout:
+                wait_for = min(wait_for, page_timeout + PAGE_KILL_GRACE)
+            for conn in wait([worker['conn'] for worker in workers], timeout=wait_for):
+                worker = next((worker for worker in workers if worker['conn'] is conn), None)
+                if worker is None:
+                    continue  # Killed above
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    worker['process'].join(1)
+                    if not opened:
+                        stop_worker(worker)
+                        document_error = _describe_exit(worker['process'], memory_limit)
+                    else:
+                        give_up_page(worker, _describe_exit(worker['process'], memory_limit))
+                    continue
+
+                kind = message[0]
+                worker['last_activity'] = time.monotonic()
+                if kind == 'count':
+                    if not opened:
+                        opened = True
+                        page_count = message[1]
+                        # Large PDFs are split into page ranges for several workers, like extract_text_from_pdf
+                        if source_type == 'PDF' and max_workers > 1 and page_count >= min_parallel_pages:
+                            shard_size = max(1, -(-page_count // max_workers))
+                            worker['stop'] = shard_size
+                            for start in range(shard_size, page_count, shard_size):
+                                start_worker(start, min(start + shard_size, page_count))
+                        else:
+                            worker['stop'] = page_count
+                        conn.send(worker['stop'])
+                elif kind == 'page':
+                    on_page(message[1], message[2])
+                    last_page = max(last_page, message[1])
+                    worker['next'] = message[1] + 1
+                elif kind == 'page_error':
+                    page_errors[message[1]] = message[2]
+                    worker['next'] = message[1] + 1
+                elif kind == 'error':
+                    if not opened:
+                        document_error = message[1]
+                        stop_worker(worker)
+                    else:
+                        give_up_page(worker, message[1])
+                elif kind == 'done':
+                    stop_worker(worker)
+    finally:
+        for worker in list(workers):
+            stop_worker(worker)
+
+    if not opened:
+        return None, [{'page': None, 'error': document_error or "Extraction failed."}]
+    if page_count is None:
+        # Only known once every page was seen (DOCX)
+        page_count = max([last_page] + list(page_errors)) + 1
+    errors = [{'page': index + 1, 'error': page_errors[index]} for index in sorted(page_errors)]
+    return page_count, errors
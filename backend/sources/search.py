@@ -0,0 +1,251 @@
+import html
+import re
+
+from django.db import connection
+
+from .models import SourcePage
+
+# Full-text search over extracted pages and generated questions.
+#
+# SQLite (FTS5):
+#   sources_sourcepage_fts is a contentless FTS5 table whose rowid is the SourcePage id. Page text
+#   may be stored compressed, so pages are indexed explicitly when they are saved and removed
+#   before they are deleted (see sources.pages). Removing a row from a contentless table takes
+#   its original text, which is why page deletes go through sources.pages.delete_source_pages
+#   (and a pre_delete signal on Source for cascades).
+#   questions_question_fts is an FTS5 table with its own copy of question_text and explanation
+#   (rowid = Question id). Saved questions are added by questions.signals (post_save) and
+#   save_generated_questions. Deleted ones are removed in bulk before the delete, with
+#   unindex_question_queryset or, for cascades, the pre_delete signal on Source. There is no
+#   per-question delete signal, so question deletes stay single-statement fast deletes.
+# PostgreSQL:
+#   sources_sourcepage.search_vector (tsvector, GIN index) is set explicitly like above;
+#   questions_question.search_vector is a generated column, so the database maintains it.
+# The columns and tables are created by migrations (questions 0005, sources 0013) and are not
+# part of the Django models.
+# sources.checks warns when they are missing or out of date; `manage.py rebuild_search_index`
+# rebuilds them.
+
+SEARCH_CONFIG = 'english'  # PostgreSQL text search configuration
+SNIPPET_CHARS = 200
+# Match markers the database wraps around hits in snippets; the text is HTML-escaped before
+# they are turned into <mark> tags, so snippets are safe to render as HTML
+MATCH_START, MATCH_END = '\x02', '\x03'
+MAX_RESULTS = 100
+
+
+def search_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+def index_page_texts(rows):
+    """Adds (page_id, text) rows to the page search index."""
+    if not rows or not search_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany("INSERT INTO sources_sourcepage_fts(rowid, body) VALUES (%s, %s)", rows)
+        else:
+            cursor.executemany(
+                f"UPDATE sources_sourcepage SET search_vector = to_tsvector('{SEARCH_CONFIG}', %s) WHERE id = %s",
+                [(text, page_id) for page_id, text in rows]
+            )
+
+def index_pages(pages):
+    """Adds saved SourcePage objects to the page search index."""
+    index_page_texts([(page.id, page.text) for page in pages if page.id is not None])
+
+def unindex_page_texts(rows):
+    """
+    Removes (page_id, text) rows from the page search index. On SQLite the text must be the one
+    that was indexed; PostgreSQL drops the vector with the row, so there is nothing to do.
+    """
+    if not rows or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO sources_sourcepage_fts(sources_sourcepage_fts, rowid, body) VALUES ('delete', %s, %s)", rows
+        )
+
+def unindex_source_pages(source_id, batch_size=500):
+    """Removes every page of a source from the page search index (call before deleting the pages)."""
+    if connection.vendor != 'sqlite':
+        return
+    last_id = 0
+    while True:
+        pages = list(
+            SourcePage.objects.filter(source_id=source_id, id__gt=last_id).order_by('id')
+            .only('id', 'plain_text', 'compressed_text')[:batch_size]
+        )
+        if not pages:
+            break
+        last_id = pages[-1].id
+        unindex_page_texts([(page.id, page.text) for page in pages])
+
+def index_questions(questions):
+    """Adds or refreshes saved questions in the SQLite question index (PostgreSQL maintains its own)."""
+    rows = [(question.id, question.question_text, question.explanation or "") for question in questions if question.id is not None]
+    if not rows or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany("DELETE FROM questions_question_fts WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany("INSERT INTO questions_question_fts(rowid, question_text, explanation) VALUES (%s, %s, %s)", rows)
+
+def unindex_questions(question_ids):
+    question_ids = [question_id for question_id in question_ids if question_id is not None]
+    if not question_ids or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany("DELETE FROM questions_question_fts WHERE rowid = %s", [(question_id,) for question_id in question_ids])
+
+def unindex_question_queryset(queryset):
+    """
+    Removes the questions matched by a Question queryset from the SQLite question index in one
+    statement. Call it before deleting them.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    sql, params = queryset.values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM questions_question_fts WHERE rowid IN ({sql})", params)
+
+def unindex_source_questions(source_id):
+    """Removes every question of a source from the SQLite question index (call before deleting them)."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM questions_question_fts WHERE rowid IN (SELECT id FROM questions_question WHERE source_id = %s)",
+            [source_id]
+        )
+
+def rebuild_page_index(batch_size=500, stdout=None):
+    """Re-creates the page search index from every stored page."""
+    if not search_supported():
+        return 0
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO sources_sourcepage_fts(sources_sourcepage_fts) VALUES ('delete-all')")
+    indexed = 0
+    last_id = 0
+    while True:
+        pages = list(
+            SourcePage.objects.filter(id__gt=last_id).order_by('id').only('id', 'plain_text', 'compressed_text')[:batch_size]
+        )
+        if not pages:
+            break
+        last_id = pages[-1].id
+        index_pages(pages)
+        indexed += len(pages)
+        if stdout is not None:
+            stdout.write(f"Indexed {indexed} pages")
+    return indexed
+
+def rebuild_question_index():
+    """Re-creates the SQLite question index from the questions table (PostgreSQL maintains it by itself)."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM questions_question_fts")
+        cursor.execute(
+            "INSERT INTO questions_question_fts(rowid, question_text, explanation) "
+            "SELECT id, question_text, coalesce(explanation, '') FROM questions_question"
+        )
+
+def parse_search_terms(query):
+    """Splits a search box query into words; punctuation and FTS operators are ignored."""
+    return re.findall(r'\w+', query or "")
+
+def _fts5_query(terms):
+    # Every word must match; the last one also matches as a prefix, for search-as-you-type
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return " ".join(quoted)
+
+def make_snippet(text, terms, width=SNIPPET_CHARS):
+    """
+    Returns about width characters of text around the first match of any term, HTML-escaped,
+    with the matches wrapped in <mark> tags. Terms match as word prefixes, which roughly follows
+    the stemming of the search index (e.g. "proteins" highlights "protein").
+    """
+    prefixes = sorted({term.lower()[:max(4, len(term) - 2)] for term in terms}, key=len, reverse=True)
+    pattern = re.compile(r'\b(?:' + "|".join(re.escape(prefix) for prefix in prefixes) + r')\w*', re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    end = min(len(text), start + width)
+    excerpt = re.sub(r'\s+', ' ', text[start:end]).strip()
+    excerpt = pattern.sub(lambda found: MATCH_START + found.group(0) + MATCH_END, excerpt)
+    return ("…" if start > 0 else "") + mark_matches(excerpt) + ("…" if end < len(text) else "")
+
+def mark_matches(snippet):
+    """HTML-escapes a snippet and turns its MATCH_START/MATCH_END markers into <mark> tags."""
+    return html.escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+def search_pages(terms, source_id=None, limit=20):
+    """Returns ranked page hits: dicts with page_id, source_id, page_number, score and snippet."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            sql = (
+                "SELECT p.id, p.source_id, p.page_number, bm25(sources_sourcepage_fts) AS rank "
+                "FROM sources_sourcepage_fts JOIN sources_sourcepage p ON p.id = sources_sourcepage_fts.rowid "
+                "WHERE sources_sourcepage_fts MATCH %s"
+            )
+            params = [_fts5_query(terms)]
+        else:
+            sql = (
+                "SELECT p.id, p.source_id, p.page_number, ts_rank(p.search_vector, query) AS rank "
+                f"FROM sources_sourcepage p, plainto_tsquery('{SEARCH_CONFIG}', %s) query "
+                "WHERE p.search_vector @@ query"
+            )
+            params = [" ".join(terms)]
+        if source_id is not None:
+            sql += " AND p.source_id = %s"
+            params.append(source_id)
+        # bm25() is lower for better matches, ts_rank() higher
+        sql += " ORDER BY rank" + (" DESC" if connection.vendor != 'sqlite' else "") + " LIMIT %s"
+        params.append(limit)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # Only the pages that are returned are loaded (and decompressed) for their snippets
+    pages = SourcePage.objects.only('plain_text', 'compressed_text').in_bulk([row[0] for row in rows])
+    return [
+        {
+            'page_id': page_id,
+            'source_id': page_source_id,
+            'page_number': page_number,
+            'score': abs(rank),
+            'snippet': make_snippet(pages[page_id].text, terms) if page_id in pages else "",
+        }
+        for page_id, page_source_id, page_number, rank in rows
+    ]
+
+def search_questions(terms, source_id=None, limit=20):
+    """Returns ranked question hits: dicts with question_id, source_id, page_number, score and snippet."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            sql = (
+                "SELECT q.id, q.source_id, q.page_number, bm25(questions_question_fts, 2.0, 1.0) AS rank, "
+                "snippet(questions_question_fts, -1, %s, %s, '…', 24) "
+                "FROM questions_question_fts JOIN questions_question q ON q.id = questions_question_fts.rowid "
+                "WHERE questions_question_fts MATCH %s"
+            )
+            params = [MATCH_START, MATCH_END, _fts5_query(terms)]
+        else:
+            sql = (
+                "SELECT q.id, q.source_id, q.page_number, ts_rank(q.search_vector, query) AS rank, "
+                f"ts_headline('{SEARCH_CONFIG}', q.question_text || ' ' || coalesce(q.explanation, ''), query, %s) "
+                f"FROM questions_question q, plainto_tsquery('{SEARCH_CONFIG}', %s) query "
+                "WHERE q.search_vector @@ query"
+            )
+            params = [f"StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=35, MinWords=15", " ".join(terms)]
+        if source_id is not None:
+            sql += " AND q.source_id = %s"
+            params.append(source_id)
+        sql += " ORDER BY rank" + (" DESC" if connection.vendor != 'sqlite' else "") + " LIMIT %s"
+        params.append(limit)
+        cursor.execute(sql, params)
+        return [
+            {'question_id': question_id, 'source_id': question_source_id, 'page_number': page_number,
+             'score': abs(rank), 'snippet': mark_matches(snippet or "")}
+            for question_id, question_source_id, page_number, rank, snippet in cursor.fetchall()
+        ]
@@ -1,8 +1,17 @@
+import os
+
 from rest_framework import serializers
 from .models import Source
 from django.conf import settings
 from django.urls import reverse
 
+ALLOWED_UPLOAD_EXTENSIONS = ['pdf', 'docx', 'pptx', 'txt']
+
+def validate_upload_extension(file_name):
+    ext = file_name.split('.')[-1].lower()
+    if ext not in ALLOWED_UPLOAD_EXTENSIONS:
+        raise serializers.ValidationError("Unsupported file type. Allowed types: PDF, DOCX, PPTX, TXT.")
+
 class FileUploadSerializer(serializers.ModelSerializer):
     file = serializers.FileField()
 
@@ -16,9 +25,24 @@ class FileUploadSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"File size cannot exceed {settings.MAX_UPLOAD_SIZE // (1024 * 1024)} MB.")
         
         # Validate file type (extension)
-        ext = value.name.split('.')[-1].lower()
-        if ext not in ['pdf', 'docx', 'pptx', 'txt']:
-            raise serializers.ValidationError("Unsupported file type. Allowed types: PDF, DOCX, PPTX, TXT.")
+        validate_upload_extension(value.name)
+        return value
+
+class ChunkedUploadInitSerializer(serializers.Serializer):
+    file_name = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+
+    def validate_file_name(self, value):
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value:
+            raise serializers.ValidationError("A file name is required.")
+        validate_upload_extension(value)
+        return value
+
+    def validate_total_size(self, value):
+        max_size = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', settings.MAX_UPLOAD_SIZE)
+        if value > max_size:
+            raise serializers.ValidationError(f"File size cannot exceed {max_size // (1024 * 1024)} MB.")
         return value
 
 class YouTubeLinkSerializer(serializers.ModelSerializer):
@@ -33,6 +57,8 @@ class YouTubeLinkSerializer(serializers.ModelSerializer):
 
 class SourceSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
+    # Built from the source's pages (see Source.text_content)
+    text_content = serializers.ReadOnlyField()
 
     class Meta:
         model = Source
@@ -44,4 +70,19 @@ class SourceSerializer(serializers.ModelSerializer):
             if request is not None:
                 return request.build_absolute_uri(obj.file.url)
             return obj.file.url
-        return None
\ No newline at end of file
+        return None
+
+class SourceSummarySerializer(SourceSerializer):
+    """
+    Source without its text, for the library list. word_count and question_count are
+    annotated on the queryset (see SourceViewSet.get_queryset).
+    """
+    word_count = serializers.IntegerField(read_only=True)
+    question_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Source
+        fields = (
+            'id', 'source_type', 'file', 'file_url', 'youtube_link', 'page_count', 'video_duration',
+            'source_metadata', 'uploaded_at', 'status', 'extraction_error', 'word_count', 'question_count',
+        )
\ No newline at end of file
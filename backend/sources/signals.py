@@ -0,0 +1,13 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Source
+from .search import unindex_source_pages, unindex_source_questions
+
+
+@receiver(pre_delete, sender=Source)
+def unindex_deleted_source(sender, instance, **kwargs):
+    # The pages and questions are deleted by the cascade, which does not go through
+    # delete_source_pages or unindex_question_queryset
+    unindex_source_pages(instance.id)
+    unindex_source_questions(instance.id)
@@ -0,0 +1,190 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from questions.utils import save_generated_questions
+
+from . import extraction
+from .models import Source
+from .pages import save_source_pages
+from .search import make_snippet, search_pages, search_questions
+
+
+class SearchSnippetTests(TestCase):
+    """Snippets are returned as HTML, so the document text in them must be escaped."""
+
+    def setUp(self):
+        self.source = Source.objects.create(source_type='TXT')
+
+    def test_make_snippet_escapes_text_and_marks_matches(self):
+        snippet = make_snippet('<script>alert(1)</script> protein & "quotes"', ['protein'])
+        self.assertEqual(snippet, '&lt;script&gt;alert(1)&lt;/script&gt; <mark>protein</mark> &amp; &quot;quotes&quot;')
+
+    def test_page_snippets_are_escaped(self):
+        save_source_pages(self.source.id, ['<img src=x onerror=alert(1)> The membrane protein.'])
+        [hit] = search_pages(['protein'])
+        self.assertNotIn('<img', hit['snippet'])
+        self.assertIn('&lt;img', hit['snippet'])
+        self.assertIn('<mark>protein</mark>', hit['snippet'])
+
+    def test_question_snippets_are_escaped(self):
+        save_generated_questions([{
+            'source': self.source.id,
+            'page_number': 1,
+            'question_text': 'Which <b onmouseover=alert(1)>protein</b> is shown?',
+            'options': {'A': 'Actin', 'B': 'Myosin', 'C': 'Keratin', 'D': 'Collagen'},
+            'correct_answer': 'A',
+            'explanation': 'Actin.',
+        }], content_fingerprint='0' * 64)
+        [hit] = search_questions(['protein'])
+        self.assertNotIn('<b', hit['snippet'])
+        self.assertIn('&lt;b onmouseover=alert(1)&gt;<mark>protein</mark>&lt;/b&gt;', hit['snippet'])
+
+
+class RecordingExecutor:
+    """Stands in for the extraction pool: records submissions instead of running them."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+
+@override_settings(SOURCE_EXTRACTION_IN_PROCESS=True, SOURCE_EXTRACTION_STALE_AFTER=900)
+class StaleExtractionTests(TestCase):
+
+    def setUp(self):
+        self.executor = RecordingExecutor()
+        patcher = mock.patch.object(extraction, 'get_extraction_executor', return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(extraction._queued_source_ids.clear)
+
+    def make_source(self, status, age_seconds, **fields):
+        source = Source.objects.create(source_type='TXT', status=status, **fields)
+        Source.objects.filter(id=source.id).update(uploaded_at=timezone.now() - timedelta(seconds=age_seconds))
+        return source
+
+    def test_orphaned_pending_source_is_queued_again(self):
+        orphaned = self.make_source('PENDING', 3600)
+        self.make_source('PENDING', 10)  # Just uploaded
+        extraction.recover_stale_extractions()
+        self.assertEqual(self.executor.submitted, [(orphaned.id,)])
+
+    def test_pending_source_queued_by_this_process_is_not_queued_twice(self):
+        source = self.make_source('PENDING', 3600)
+        extraction._queued_source_ids.add(source.id)
+        extraction.recover_stale_extractions()
+        self.assertEqual(self.executor.submitted, [])
+
+    def test_pending_sources_are_left_to_the_worker_command(self):
+        self.make_source('PENDING', 3600)
+        extraction.recover_stale_extractions(requeue_pending=False)
+        with self.settings(SOURCE_EXTRACTION_IN_PROCESS=False):
+            extraction.recover_stale_extractions()
+        self.assertEqual(self.executor.submitted, [])
+
+    def test_stuck_extraction_fails_and_frees_the_content_hash(self):
+        source = self.make_source(
+            'EXTRACTING', 3600, content_hash='a' * 64, extraction_started_at=timezone.now() - timedelta(hours=1)
+        )
+        extraction.recover_stale_extractions()
+        source.refresh_from_db()
+        self.assertEqual(source.status, 'FAILED')
+        self.assertIsNone(source.content_hash)
+
+
+class UploadTestCase(TestCase):
+    """Uploads go to temporary directories and are left PENDING (no background extraction)."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=media_root,
+            CHUNKED_UPLOAD_DIR=f"{media_root}/upload_sessions",
+            SOURCE_EXTRACTION_IN_PROCESS=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, name, content):
+        return self.client.post('/api/sources/upload_file/', {'file': SimpleUploadedFile(name, content)})
+
+
+class DuplicateUploadTests(UploadTestCase):
+    content = b"Mitochondria produce most of the cell's energy.\n" * 20
+
+    def test_same_content_under_another_name_returns_the_pending_source(self):
+        first = self.upload('cells.txt', self.content)
+        self.assertEqual(first.status_code, 202)
+        second = self.upload('copy of cells.txt', self.content)
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(second.data['status'], 'PENDING')
+        self.assertNotIn('text_content', second.data)
+        self.assertEqual(Source.objects.count(), 1)
+
+    def test_ready_source_is_returned_with_200(self):
+        source_id = self.upload('cells.txt', self.content).data['id']
+        save_source_pages(source_id, ["Mitochondria produce energy."])
+        Source.objects.filter(id=source_id).update(status='READY')
+        response = self.upload('cells-again.txt', self.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['id'], response.data['word_count']), (source_id, 3))
+
+    def test_content_can_be_uploaded_again_after_a_failed_extraction(self):
+        source_id = self.upload('cells.txt', self.content).data['id']
+        extraction.fail_source_extraction(Source.objects.get(id=source_id), "Failed to extract text from file.")
+        response = self.upload('cells.txt', self.content)
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data['id'], source_id)
+
+
+class ChunkedUploadTests(UploadTestCase):
+    content = b"Ribosomes build proteins from amino acids.\n" * 50
+
+    def setUp(self):
+        super().setUp()
+        response = self.client.post('/api/sources/uploads/', {'file_name': 'ribosomes.txt', 'total_size': len(self.content)})
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/sources/uploads/{response.data['upload_id']}/"
+
+    def put_chunk(self, offset, data):
+        return self.client.put(self.url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunk_at_the_wrong_offset_is_rejected_with_the_expected_offset(self):
+        self.assertEqual(self.put_chunk(0, self.content[:100]).data['offset'], 100)
+        response = self.put_chunk(50, self.content[50:150])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 100)
+        # The same chunk sent twice is rejected too
+        self.assertEqual(self.put_chunk(0, self.content[:100]).status_code, 409)
+        self.assertEqual(self.put_chunk(100, self.content[100:]).data['offset'], len(self.content))
+
+    def test_finalize_before_the_last_chunk_is_rejected(self):
+        self.put_chunk(0, self.content[:100])
+        response = self.client.post(f"{self.url}finalize/")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'ACTIVE')
+        self.assertFalse(Source.objects.exists())
+
+    def test_finalize_creates_the_source_once(self):
+        self.put_chunk(0, self.content)
+        response = self.client.post(f"{self.url}finalize/")
+        self.assertEqual(response.status_code, 202)
+        source = Source.objects.get()
+        self.assertEqual((response.data['id'], source.status), (source.id, 'PENDING'))
+        with source.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+        # A repeated finalize answers with the same source; further chunks are refused
+        self.assertEqual(self.client.post(f"{self.url}finalize/").data['id'], source.id)
+        self.assertEqual(self.put_chunk(len(self.content), b"more").status_code, 409)
+        self.assertEqual(Source.objects.count(), 1)
@@ -0,0 +1,47 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .utils import TEXT_SNIFF_BYTES, sniff_text_encoding
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """
+    Inspects every uploaded file in the same single pass that streams it in, without buffering it:
+    computes its SHA-256 and keeps a bounded sample of its first bytes to sniff the text encoding.
+    Chunks are passed on unchanged to the next handler (memory or temporary file), and the
+    results end up in request.upload_file_info, keyed by form field name, as a dict with
+    'content_hash', 'size' and 'encoding'.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.sample = bytearray()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        if len(self.sample) < TEXT_SNIFF_BYTES:
+            self.sample += raw_data[:TEXT_SNIFF_BYTES - len(self.sample)]
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_file_info'):
+                self.request.upload_file_info = {}
+            self.request.upload_file_info[self.field_name] = {
+                'content_hash': self.sha256.hexdigest(),
+                'size': file_size,
+                'encoding': sniff_text_encoding(bytes(self.sample), complete=file_size <= TEXT_SNIFF_BYTES),
+            }
+        # Let the next handler build the file object
+        return None
+
+
+def file_content_hash(uploaded_file):
+    """Computes the SHA-256 of an uploaded file by reading it (when no hash was recorded during upload)."""
+    sha256 = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha256.update(chunk)
+    uploaded_file.seek(0)
+    return sha256.hexdigest()
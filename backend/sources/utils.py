@@ -1,4 +1,3 @@
-import PyPDF2
 import docx
 from pptx import Presentation
 from youtube_transcript_api import YouTubeTranscriptApi
@@ -8,140 +7,258 @@ from youtube_transcript_api import (
     NoTranscriptAvailable,
 )
 
+import codecs
+import mmap
+import multiprocessing
+import os
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .pdf_engines import get_pdf_engine
+
+# Process pool shared by all PDF extractions in this process
+_pdf_executor = None
+_pdf_executor_lock = threading.Lock()
+
+def get_pdf_executor(max_workers):
+    """Returns the process-wide pool used for PDF extraction, creating it on first use (or when max_workers changes)."""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is not None and _pdf_executor._max_workers != max_workers:
+            _pdf_executor.shutdown(wait=False)
+            _pdf_executor = None
+        if _pdf_executor is None:
+            # spawn avoids forking a web process that is running other threads
+            _pdf_executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pdf_executor
+
+def _reset_pdf_executor():
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is not None:
+            _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
+
+def iter_pdf_pages(document, start=0, stop=None):
+    """
+    Yields the text of pages [start, stop) of an open PDF document (see sources.pdf_engines)
+    one at a time, with "" for blank pages.
+    """
+    stop = len(document) if stop is None else min(stop, len(document))
+    for page_num in range(start, stop):
+        # Add empty string for blank pages to maintain page count integrity
+        yield document.extract_page(page_num) or ""
+
+def _extract_pdf_page_range(file_path, start, stop, engine_name):
+    """Extracts pages [start, stop) of a PDF. Runs in a worker process, which opens the file itself."""
+    with get_pdf_engine(engine_name).open(file_path) as document:
+        return list(iter_pdf_pages(document, start, stop))
+
+def extract_text_from_pdf(file_path, max_workers=None, min_parallel_pages=None, engine=None, on_page=None):
+    """
+    Extracts the text of every page of a PDF, in page order, with "" for blank pages.
+    Large files are split into page ranges that are extracted in parallel by a process pool;
+    small files, or a single worker, use the serial path.
+    max_workers: Worker processes (defaults to PDF_EXTRACTION_WORKERS).
+    min_parallel_pages: Page count from which the process pool is used (defaults to PDF_PARALLEL_MIN_PAGES).
+    engine: PDF engine name (defaults to PDF_EXTRACTION_ENGINE, see sources.pdf_engines).
+    on_page: Optional callable(index, text). Pages are then handed to it as soon as they (or
+    their page range) are extracted instead of being collected, and page_texts is None.
+    Returns (page_texts, page_count), or (None, 0) on error.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, 'PDF_EXTRACTION_WORKERS', os.cpu_count() or 1)
+    if min_parallel_pages is None:
+        min_parallel_pages = getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 40)
 
-def extract_text_from_pdf(file_path):
     page_texts = []
+    if on_page is None:
+        on_page = lambda index, text: page_texts.append(text)
+        collected = page_texts
+    else:
+        collected = None
     page_count = 0
     try:
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            page_count = len(reader.pages)
-            for page_num in range(page_count):
-                page_text = reader.pages[page_num].extract_text()
-                if page_text: # Ensure there's text to add
-                    page_texts.append(page_text)
-                else:
-                    page_texts.append("") # Add empty string for blank pages to maintain page count integrity
+        pdf_engine = get_pdf_engine(engine)
+        with pdf_engine.open(file_path) as document:
+            page_count = len(document)
+            if max_workers <= 1 or page_count < min_parallel_pages:
+                for index, text in enumerate(iter_pdf_pages(document)):
+                    on_page(index, text)
+                return collected, page_count
+
+        # A few shards per worker keep the workers busy when some pages are slower than others
+        shard_size = max(1, -(-page_count // (max_workers * 4)))
+        shards = [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+        print(f"Extracting {page_count} PDF pages with {pdf_engine.name} in {len(shards)} shards with up to {max_workers} processes")
+        next_index = 0
+        try:
+            executor = get_pdf_executor(max_workers)
+            futures = [executor.submit(_extract_pdf_page_range, file_path, start, stop, pdf_engine.name) for start, stop in shards]
+            for future in futures:
+                for text in future.result():
+                    on_page(next_index, text)
+                    next_index += 1
+        except BrokenProcessPool as e:
+            # A crashed worker breaks the pool: replace it and extract the rest of this file serially
+            print(f"Warning: PDF extraction pool failed ({e}). Falling back to serial extraction.")
+            _reset_pdf_executor()
+            with pdf_engine.open(file_path) as document:
+                for index, text in enumerate(iter_pdf_pages(document, next_index), start=next_index):
+                    on_page(index, text)
     except Exception as e:
         print(f"Error extracting PDF: {e}")
         return None, 0 # Return None for texts and 0 for count on error
-    return page_texts, page_count
+    return collected, page_count
 
-def extract_text_from_docx(file_path):
-    page_texts = []
+# Number of non-empty paragraphs that make up a "page" of a DOCX file
+DOCX_PARAGRAPHS_PER_PAGE = 10
+
+def iter_docx_pages(doc, start=0):
+    """
+    Yields the "pages" of an open python-docx Document, DOCX_PARAGRAPHS_PER_PAGE non-empty
+    paragraphs each, in a single pass over its paragraphs. Pages before start are skipped.
+    """
     current_page_paragraphs = []
-    PARAGRAPHS_PER_PAGE = 10  # Define how many paragraphs constitute a "page"
-    paragraph_count_on_current_page = 0
+    page_index = 0
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if not text:  # Only add non-empty paragraphs
+            continue
+        current_page_paragraphs.append(text)
+        if len(current_page_paragraphs) >= DOCX_PARAGRAPHS_PER_PAGE:
+            if page_index >= start:
+                yield "\n".join(current_page_paragraphs)
+            current_page_paragraphs = []
+            page_index += 1
 
+    # Any remaining paragraphs form the last page
+    if current_page_paragraphs and page_index >= start:
+        yield "\n".join(current_page_paragraphs)
+
+def extract_text_from_docx(file_path, on_page):
+    """
+    Hands each "page" of a DOCX file to on_page(index, text) as it is read.
+    Returns the page count, or None on error or if the document has no text.
+    """
     try:
-        doc = docx.Document(file_path)
-        # First check if document has any text content
-        has_content = False
-        for para in doc.paragraphs:
-            if para.text.strip():  # Check for non-empty paragraphs
-                has_content = True
-                break
-        
-        if not has_content:
+        page_count = 0
+        for index, text in enumerate(iter_docx_pages(docx.Document(file_path))):
+            on_page(index, text)
+            page_count += 1
+        if not page_count:
             print(f"Warning: DOCX file {file_path} appears to be empty")
-            return None, 0
-
-        for para in doc.paragraphs:
-            text = para.text.strip()
-            if text:  # Only add non-empty paragraphs
-                current_page_paragraphs.append(text)
-                paragraph_count_on_current_page += 1
-                if paragraph_count_on_current_page >= PARAGRAPHS_PER_PAGE:
-                    page_text = "\n".join(current_page_paragraphs)
-                    if page_text.strip():  # Only add non-empty pages
-                        page_texts.append(page_text)
-                    current_page_paragraphs = []
-                    paragraph_count_on_current_page = 0
-        
-        # Add any remaining paragraphs as the last page
-        if current_page_paragraphs:
-            page_text = "\n".join(current_page_paragraphs)
-            if page_text.strip():  # Only add non-empty pages
-                page_texts.append(page_text)
-        
-        # If we haven't created any pages but have content, create a single page
-        if not page_texts:
-            all_text = "\n".join([p.text.strip() for p in doc.paragraphs if p.text.strip()])
-            if all_text:
-                page_texts.append(all_text)
-
-        return page_texts, len(page_texts) if page_texts else 0
+            return None
+        return page_count
     except Exception as e:
         print(f"Error extracting DOCX: {e}")
-        return None, 0
+        return None
+
+def iter_pptx_slides(prs, start=0):
+    """
+    Yields the text of each slide of an open python-pptx Presentation in a single pass, with ""
+    for slides without text (to maintain slide count integrity). Slides before start are skipped.
+    """
+    for index, slide in enumerate(prs.slides):
+        if index < start:
+            continue
+        slide_text_content = []
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                text = shape.text.strip()
+                if text:  # Only add non-empty text
+                    slide_text_content.append(text)
+        yield "\n".join(slide_text_content)
 
-def extract_text_from_pptx(file_path):
-    slide_texts = []
+def extract_text_from_pptx(file_path, on_page):
+    """
+    Hands the text of each slide of a PPTX file to on_page(index, text) as it is read.
+    Returns the slide count, or None on error or if no slide has text.
+    """
     try:
-        prs = Presentation(file_path)
-        
-        # First check if presentation has any text content
-        has_content = False
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    has_content = True
-                    break
-            if has_content:
-                break
-        
-        if not has_content:
-            print(f"Warning: PPTX file {file_path} appears to be empty")
-            return None, 0
-
-        for slide in prs.slides:
-            slide_text_content = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text = shape.text.strip()
-                    if text:  # Only add non-empty text
-                        slide_text_content.append(text)
-            
-            if slide_text_content:  # Add slide only if it has text
-                slide_text = "\n".join(slide_text_content)
-                if slide_text.strip():  # Double check the joined text is not empty
-                    slide_texts.append(slide_text)
-                else:
-                    slide_texts.append("")  # Maintain slide count integrity
-            else:
-                slide_texts.append("")  # Maintain slide count integrity
-        
-        # If we haven't found any text content but have slides, return None
-        if not any(text.strip() for text in slide_texts):
+        slide_count = 0
+        has_text = False
+        for index, text in enumerate(iter_pptx_slides(Presentation(file_path))):
+            on_page(index, text)
+            slide_count += 1
+            has_text = has_text or bool(text)
+        # If we haven't found any text content, return None
+        if not has_text:
             print(f"Warning: No text content found in PPTX file {file_path}")
-            return None, 0
-            
-        return slide_texts, len(prs.slides)
+            return None
+        return slide_count
     except Exception as e:
         print(f"Error extracting PPTX: {e}")
-        return None, 0
+        return None
 
-def extract_text_from_txt(file_path):
-    text = ""
-    encodings = ['utf-8', 'ascii', 'iso-8859-1', 'cp1252', 'utf-16']
-    
-    for encoding in encodings:
+# Bytes of a text file that are examined to pick its encoding
+TEXT_SNIFF_BYTES = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+def sniff_text_encoding(sample, complete=False):
+    """
+    Picks the encoding of a text file from a byte sample of its start: a BOM if there is one,
+    otherwise UTF-8 if the sample decodes as UTF-8, otherwise cp1252 (Windows text), with
+    ISO-8859-1 as the last resort since it decodes any byte.
+    complete: True if the sample is the whole file (a trailing partial character is then an error).
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    for encoding in ('utf-8', 'cp1252'):
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                text = f.read().strip()
-                if not text:  # Check if file is empty
-                    print(f"Warning: TXT file {file_path} appears to be empty")
-                    return None
-                return text
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
         except UnicodeDecodeError:
-            continue  # Try next encoding
-        except Exception as e:
-            print(f"Error extracting TXT with {encoding} encoding: {e}")
             continue
-    
-    print(f"Error: Could not read TXT file {file_path} with any supported encoding")
-    return None
+    return 'iso-8859-1'
+
+def extract_text_from_txt(file_path, encoding=None):
+    """
+    Decodes a text file in a single pass over a memory map, without an intermediate copy of its bytes.
+    encoding: Encoding sniffed while the file was uploaded; sniffed from the start of the file if not given.
+    Returns the stripped text, or None if the file is empty or unreadable.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                print(f"Warning: TXT file {file_path} appears to be empty")
+                return None
+            if encoding is None:
+                sample = f.read(TEXT_SNIFF_BYTES)
+                encoding = sniff_text_encoding(sample, complete=len(sample) < TEXT_SNIFF_BYTES)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                try:
+                    text = codecs.decode(data, encoding)
+                except UnicodeDecodeError:
+                    # The sample looked like UTF-8 but a later part is not
+                    fallback = 'cp1252' if encoding != 'cp1252' else 'iso-8859-1'
+                    print(f"Warning: TXT file {file_path} is not valid {encoding}. Decoding it as {fallback}.")
+                    try:
+                        text = codecs.decode(data, fallback)
+                    except UnicodeDecodeError:
+                        text = codecs.decode(data, 'iso-8859-1')
+    except Exception as e:
+        print(f"Error: Could not read TXT file {file_path}: {e}")
+        return None
+
+    # strip() returns the same string when there is nothing to strip, so no copy is made then
+    text = text.strip()
+    if not text:  # Check if file is empty
+        print(f"Warning: TXT file {file_path} appears to be empty")
+        return None
+    return text
 
 def extract_youtube_id(youtube_url):
     regex = r"(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})"
@@ -1,23 +1,31 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import Source
-from .serializers import FileUploadSerializer, YouTubeLinkSerializer, SourceSerializer
-from .utils import (
-    extract_text_from_pdf, extract_text_from_docx, 
-    extract_text_from_pptx, extract_text_from_txt,
-    extract_youtube_transcript, extract_youtube_id
+from .models import Source, SourcePage, UploadSession
+from .serializers import FileUploadSerializer, YouTubeLinkSerializer, SourceSerializer, SourceSummarySerializer, ChunkedUploadInitSerializer
+from .pagination import OptInCursorPagination
+from .chunked_uploads import (
+    AssembledUpload, delete_part_file, expire_upload_sessions, inspect_part_file, part_file_path, write_chunk
 )
+from .renderers import EventStreamRenderer, format_sse
+from .utils import extract_youtube_transcript, extract_youtube_id
 from django.core.files.storage import default_storage
 import os
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 import json
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
-import PyPDF2
+from rest_framework.renderers import JSONRenderer
+from .pdf_engines import get_pdf_engine
+from .pages import iter_page_texts, load_page_texts, save_source_pages
+from .search import MAX_RESULTS, parse_search_terms, search_pages, search_questions, search_supported
 import docx
 from pptx import Presentation
 import yt_dlp
@@ -28,13 +36,49 @@ from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api.formatters import TextFormatter
 
 # Import the actual function - remove the try/except wrapper
-from questions.utils import generate_questions_from_text_content
+from questions.utils import generate_questions_from_text_content, iter_question_generation
+from questions.models import GenerationJob, Question
+from questions.serializers import GenerationJobSerializer
+from questions.jobs import enqueue_generation_job, recover_stale_generation_jobs
+from .extraction import FILE_SOURCE_TYPES, enqueue_source_extraction, recover_stale_extractions
+from .upload_handlers import file_content_hash
 
 
 
 class SourceViewSet(viewsets.ModelViewSet):
     queryset = Source.objects.all().order_by('-uploaded_at')
     serializer_class = SourceSerializer
+    # Only used when the client passes ?page_size= or ?cursor=; otherwise lists are plain arrays
+    pagination_class = OptInCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'files'):
+            queryset = self._summary_queryset(queryset)
+        return queryset
+
+    def _summary_queryset(self, queryset):
+        # Summaries leave out the text and only carry per-source totals, computed in the same query
+        word_counts = SourcePage.objects.filter(source=OuterRef('pk')).order_by().values('source').annotate(total=Sum('word_count')).values('total')
+        question_counts = Question.objects.filter(source=OuterRef('pk')).order_by().values('source').annotate(total=Count('id')).values('total')
+        return queryset.defer('page_errors').annotate(
+            word_count=Coalesce(Subquery(word_counts), 0),
+            question_count=Coalesce(Subquery(question_counts), 0),
+        )
+
+    def _existing_source_response(self, request, **lookup):
+        """
+        Response for an upload whose content is already stored: the existing source as a summary,
+        with 200 if it is READY, or 202 while it is still being extracted (poll its status).
+        """
+        source = self._summary_queryset(Source.objects.all()).get(**lookup)
+        response_status = status.HTTP_200_OK if source.status == 'READY' else status.HTTP_202_ACCEPTED
+        return Response(SourceSummarySerializer(source, context={'request': request}).data, status=response_status)
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'files'):
+            return SourceSummarySerializer
+        return super().get_serializer_class()
 
     @action(detail=False, methods=['post'], serializer_class=FileUploadSerializer)
     def upload_file(self, request):
@@ -42,53 +86,153 @@ class SourceViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             uploaded_file = serializer.validated_data['file']
 
-            # Check for duplicate file name
-            if Source.objects.filter(file=uploaded_file.name).exists():
-                return Response({"error": f"File with name '{uploaded_file.name}' already exists."}, status=status.HTTP_409_CONFLICT)
+            recover_stale_extractions()
 
-            file_name = default_storage.save(uploaded_file.name, uploaded_file)
-            file_path = default_storage.path(file_name)
-            
-            text_content = None
-            page_count = None
-            source_type_enum = None
-
-            ext = file_name.split('.')[-1].lower()
-            if ext == 'pdf':
-                text_content, page_count = extract_text_from_pdf(file_path)
-                source_type_enum = 'PDF'
-            elif ext == 'docx':
-                text_content, page_count = extract_text_from_docx(file_path)
-                source_type_enum = 'DOCX'
-            elif ext == 'pptx':
-                text_content, page_count = extract_text_from_pptx(file_path)
-                source_type_enum = 'PPTX'
-            elif ext == 'txt':
-                text_content = extract_text_from_txt(file_path)
-                source_type_enum = 'TXT'
-
-            if text_content is not None:
-                # For non-PDFs, wrap the text_content string in a list to match JSONField structure
-                # For PDFs, DOCX, PPTX, text_content is already a list of strings (pages/slides)
-                # For TXT, wrap the text_content string in a list to match JSONField structure
-                if source_type_enum == 'TXT' and isinstance(text_content, str):
-                    processed_text_content = [text_content]
-                else:
-                    processed_text_content = text_content
+            # Identical content is recognised by its SHA-256 (computed while the upload streamed in)
+            upload_info = getattr(request, 'upload_file_info', {}).get('file', {})
+            content_hash = upload_info.get('content_hash') or file_content_hash(uploaded_file)
+            return self._store_upload(request, uploaded_file.name, uploaded_file, content_hash, upload_info.get('encoding'))
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _store_upload(self, request, name, content, content_hash, text_encoding=None):
+        """
+        Stores a complete upload and creates a PENDING source for background extraction (202).
+        Content that is already stored returns the existing source instead (200, or 202 while it is
+        still being extracted), whatever the file name, so nothing is extracted again.
+        """
+        existing_source_id = Source.objects.filter(content_hash=content_hash).values_list('id', flat=True).first()
+        if existing_source_id:
+            print(f"Upload of '{name}' matches source {existing_source_id}. Reusing it.")
+            return self._existing_source_response(request, id=existing_source_id)
+
+        # A different file with a name that is already taken is stored under a new name.
+        # Large uploads are already in a temporary file, which the file system storage moves into place.
+        file_name = default_storage.save(name, content)
+
+        # Text extraction runs in the background; clients poll the status endpoint until READY
+        source_type = FILE_SOURCE_TYPES[file_name.split('.')[-1].lower()]
+        try:
+            with transaction.atomic():
                 source = Source.objects.create(
-                    source_type=source_type_enum,
-                    file=file_name, 
-                    text_content=processed_text_content,
-                    page_count=page_count
+                    source_type=source_type,
+                    file=file_name,
+                    content_hash=content_hash,
+                    text_encoding=text_encoding if source_type == 'TXT' else None,
+                    status='PENDING'
                 )
-                return Response(SourceSerializer(source, context={'request': request}).data, status=status.HTTP_201_CREATED)
-            else:
-                # If text extraction failed, delete the uploaded file
-                if default_storage.exists(file_name):
-                    default_storage.delete(file_name)
-                return Response({"error": "Failed to extract text from file."}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                enqueue_source_extraction(source)
+        except IntegrityError:
+            # The same content was uploaded concurrently; keep the other upload
+            default_storage.delete(file_name)
+            return self._existing_source_response(request, content_hash=content_hash)
+        except Exception:
+            # No source refers to the stored file
+            default_storage.delete(file_name)
+            raise
+        return Response(SourceSerializer(source, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+    def _upload_session_data(self, session):
+        return {
+            'upload_id': session.id,
+            'file_name': session.file_name,
+            'total_size': session.total_size,
+            'offset': session.received_size,
+            'status': session.status,
+            'source_id': session.source_id,
+            'max_chunk_size': getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024),
+        }
+
+    @action(detail=False, methods=['post'], url_path='uploads', serializer_class=ChunkedUploadInitSerializer)
+    def init_chunked_upload(self, request):
+        """
+        Starts a resumable upload for files up to CHUNKED_UPLOAD_MAX_SIZE.
+        Send the file with PUT /uploads/<upload_id>/ in chunks (raw bytes, 'Upload-Offset' header or
+        'offset' query parameter), then POST /uploads/<upload_id>/finalize/. After an interruption,
+        GET /uploads/<upload_id>/ returns the offset to resume from.
+        """
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        expire_upload_sessions()
+        session = UploadSession.objects.create(**serializer.validated_data)
+        return Response(self._upload_session_data(session), status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get', 'put', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)')
+    def chunked_upload(self, request, upload_id=None):
+        """GET returns the upload's progress, PUT appends a chunk at the given offset, DELETE aborts it."""
+        session = UploadSession.objects.filter(id=upload_id).first()
+        if session is None:
+            return Response({"error": "Upload not found or expired."}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == 'GET':
+            return Response(self._upload_session_data(session))
+
+        if request.method == 'DELETE':
+            if session.status == 'ACTIVE':
+                delete_part_file(session)
+                session.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if session.status != 'ACTIVE':
+            return Response({"error": "Upload is already finalized.", **self._upload_session_data(session)}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset', '')))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({"error": "A numeric 'Upload-Offset' header (or 'offset' query parameter) is required."}, status=status.HTTP_400_BAD_REQUEST)
+        max_chunk_size = getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+        if length <= 0 or length > max_chunk_size:
+            return Response({"error": f"Chunks must be between 1 byte and {max_chunk_size} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+        # Chunks must continue exactly where the stored data ends; the response tells the client where that is
+        if offset != session.received_size:
+            return Response({"error": f"Expected a chunk at offset {session.received_size}.", **self._upload_session_data(session)}, status=status.HTTP_409_CONFLICT)
+        if offset + length > session.total_size:
+            return Response({"error": "Chunk extends past the declared file size."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Stream the raw request body to disk; request.data is never touched, so nothing is buffered
+        written = write_chunk(session, offset, request._request, length)
+        if written != length:
+            return Response({"error": f"Connection closed after {written} of {length} bytes. Resend the chunk.", **self._upload_session_data(session)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only one request can advance the offset, even if the same chunk was sent twice
+        if not UploadSession.objects.filter(id=session.id, status='ACTIVE', received_size=offset).update(received_size=offset + written, updated_at=timezone.now()):
+            session.refresh_from_db()
+            return Response({"error": "Another request wrote this chunk.", **self._upload_session_data(session)}, status=status.HTTP_409_CONFLICT)
+        session.received_size = offset + written
+        return Response(self._upload_session_data(session))
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)/finalize')
+    def finalize_chunked_upload(self, request, upload_id=None):
+        """Turns a fully received upload into a source and starts its extraction."""
+        session = UploadSession.objects.filter(id=upload_id).first()
+        if session is None:
+            return Response({"error": "Upload not found or expired."}, status=status.HTTP_404_NOT_FOUND)
+        if session.status == 'COMPLETE' and session.source_id:
+            return self._existing_source_response(request, id=session.source_id)
+        if session.received_size != session.total_size:
+            return Response({"error": f"Upload is incomplete ({session.received_size} of {session.total_size} bytes).", **self._upload_session_data(session)}, status=status.HTTP_409_CONFLICT)
+
+        # Claim the session so that a repeated finalize does not store the file twice
+        if not UploadSession.objects.filter(id=session.id, status='ACTIVE').update(status='COMPLETE'):
+            return Response({"error": "Upload is already being finalized."}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            content_hash, text_encoding = inspect_part_file(session)
+            with open(part_file_path(session), 'rb') as part:
+                response = self._store_upload(request, session.file_name, AssembledUpload(part, name=session.file_name), content_hash, text_encoding)
+        except Exception as e:
+            print(f"Error finalizing upload {session.id}: {str(e)}")
+            # Reopen the session so finalize can be retried. If the part file was already moved
+            # into storage (and removed again), the file has to be sent again from offset 0.
+            received_size = session.received_size if os.path.exists(part_file_path(session)) else 0
+            UploadSession.objects.filter(id=session.id).update(status='ACTIVE', received_size=received_size, updated_at=timezone.now())
+            session.refresh_from_db()
+            return Response({"error": f"Failed to store the upload: {str(e)}", **self._upload_session_data(session)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # The part file was moved into storage, or is not needed because the content already exists
+        delete_part_file(session)
+        UploadSession.objects.filter(id=session.id).update(source_id=response.data.get('id'))
+        return response
 
     @action(detail=False, methods=['post'], serializer_class=YouTubeLinkSerializer)
     def process_youtube_link(self, request):
@@ -122,24 +266,34 @@ class SourceViewSet(viewsets.ModelViewSet):
                 # Continue without duration if yt-dlp fails
 
             text_content = extract_youtube_transcript(video_id)
-            
-            # If text_content is None, set it to an empty list to indicate no transcript
-            processed_text_content = [text_content] if text_content else []
-
-            source = Source.objects.create(
-                source_type='YOUTUBE',
-                youtube_link=youtube_link,
-                text_content=processed_text_content,
-                video_duration=video_duration
-            )
+
+            with transaction.atomic():
+                source = Source.objects.create(
+                    source_type='YOUTUBE',
+                    youtube_link=youtube_link,
+                    video_duration=video_duration
+                )
+                # The transcript is stored as a single page; no page means there is no transcript
+                if text_content:
+                    save_source_pages(source.id, [text_content])
             return Response(SourceSerializer(source, context={'request': request}).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'], url_path='status')
+    def extraction_status(self, request, pk=None):
+        """Lightweight extraction status for polling after an upload (does not load the extracted text)."""
+        source_status = Source.objects.filter(pk=pk).values(
+            'id', 'source_type', 'status', 'extraction_error', 'page_errors', 'page_count',
+            'extraction_started_at', 'extraction_finished_at'
+        ).first()
+        if source_status is None:
+            return Response({"error": "Source not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(source_status)
+
     @action(detail=False, methods=['get'])
     def files(self, request):
-        sources = Source.objects.all().order_by('-uploaded_at')
-        serializer = SourceSerializer(sources, many=True, context={'request': request})
-        return Response(serializer.data)
+        """Same as the list endpoint: summaries without text, paginated on request."""
+        return self.list(request)
 
     @action(detail=True, methods=['delete'])
     def delete_file(self, request, pk=None):
@@ -154,54 +308,87 @@ class SourceViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=True, methods=['post'])
-    def generate_questions(self, request, pk=None):
-        try:
-            source = self.get_object()
-        except Source.DoesNotExist:
-            return Response({"error": "Source not found."}, status=status.HTTP_404_NOT_FOUND)
+    def _prepare_generation(self, source, data):
+        """
+        Validates generation parameters from request data and stores them in source_metadata.
+        Returns (parameters, None) on success or (None, error Response) on invalid input.
+        """
+        if source.status != 'READY':
+            return None, Response(
+                {"error": f"Source is not ready for question generation (status: {source.status}).", "status": source.status},
+                status=status.HTTP_409_CONFLICT
+            )
 
-        pages_to_generate_str = request.data.get('pages_to_generate') # e.g., "1-5,7,10-12" or empty for all/non-PDF
-        questions_per_page_str = request.data.get('questions_per_page', '5') # Default to 5 questions per page
-        total_question_limit_str = request.data.get('total_question_limit') # Optional overall limit
+        pages_to_generate_str = data.get('pages_to_generate') # e.g., "1-5,7,10-12" or empty for all/non-PDF
+        questions_per_page_str = data.get('questions_per_page', '5') # Default to 5 questions per page
+        total_question_limit_str = data.get('total_question_limit') # Optional overall limit
+        fresh = str(data.get('fresh', '')).lower() in ('1', 'true', 'yes') # Bypass cached LLM responses
+        incremental = str(data.get('incremental', '')).lower() in ('1', 'true', 'yes') # Only fill in missing/stale pages
 
         try:
             questions_per_page = int(questions_per_page_str)
             if questions_per_page <= 0:
-                return Response({"error": "questions_per_page must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+                return None, Response({"error": "questions_per_page must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
         except ValueError:
-            return Response({"error": "Invalid questions_per_page. Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({"error": "Invalid questions_per_page. Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
         
         total_question_limit = None
         if total_question_limit_str:
             try:
                 total_question_limit = int(total_question_limit_str)
                 if total_question_limit <= 0:
-                    return Response({"error": "total_question_limit must be a positive integer if provided."}, status=status.HTTP_400_BAD_REQUEST)
+                    return None, Response({"error": "total_question_limit must be a positive integer if provided."}, status=status.HTTP_400_BAD_REQUEST)
             except ValueError:
-                return Response({"error": "Invalid total_question_limit. Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+                return None, Response({"error": "Invalid total_question_limit. Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
 
         # Store generation parameters in source_metadata
         source.source_metadata = {
             'pages_to_generate': pages_to_generate_str,
             'questions_per_page': questions_per_page,
-            'total_question_limit': total_question_limit
+            'total_question_limit': total_question_limit,
+            'fresh': fresh,
+            'incremental': incremental
         }
         source.save() # Save metadata
 
-        # Ensure source.text_content is available and is a list (as expected by the util)
-        if not source.text_content or not isinstance(source.text_content, list):
-             # This might happen if a very old source record didn't get its text_content as a list
+        # Ensure the source has extracted pages (the generation util loads only the ones it needs)
+        if not source.pages.exists():
+             # This might happen if a YouTube video had no transcript
              # Or if text extraction failed previously but somehow this endpoint is hit.
-            return Response({"error": "Source content is not available or not in the expected format (list of page texts)."}, status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({"error": "Source content is not available (no extracted pages)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return source.source_metadata, None
+
+    @action(detail=True, methods=['post'])
+    def generate_questions(self, request, pk=None):
+        try:
+            source = self.get_object()
+        except Source.DoesNotExist:
+            return Response({"error": "Source not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        parameters, error_response = self._prepare_generation(source, request.data)
+        if error_response is not None:
+            return error_response
+
+        # With 'async' set, run the generation in a background job and return its id right away
+        if str(request.data.get('async', '')).lower() in ('1', 'true', 'yes'):
+            recover_stale_generation_jobs()
+            active_job = source.generation_jobs.filter(status__in=GenerationJob.ACTIVE_STATUSES).first()
+            if active_job:
+                return Response({"error": "A generation job is already running for this source.", "job_id": active_job.id}, status=status.HTTP_409_CONFLICT)
+
+            job = GenerationJob.objects.create(source=source, parameters=parameters)
+            enqueue_generation_job(job)
+            return Response(GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
         try:
             generated_questions_data = generate_questions_from_text_content(
-                source_text_content=source.text_content, # This is now a list of texts per page for PDF
-                questions_per_page=questions_per_page,
-                pages_to_generate_str=pages_to_generate_str,
-                total_question_limit=total_question_limit,
-                source_id=source.id  # Added missing source_id parameter
+                questions_per_page=parameters['questions_per_page'],
+                pages_to_generate_str=parameters['pages_to_generate'],
+                total_question_limit=parameters['total_question_limit'],
+                source_id=source.id,  # Added missing source_id parameter
+                use_cache=not parameters['fresh'],
+                incremental=parameters['incremental']
             )
 
             if generated_questions_data:
@@ -213,6 +400,59 @@ class SourceViewSet(viewsets.ModelViewSet):
         except Exception as e:
             print(f"Error in generate_questions endpoint: {str(e)}")
             return Response({"error": f"Internal server error during question generation: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get', 'post'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def generate_questions_stream(self, request, pk=None):
+        """
+        Streaming variant of generate_questions using Server-Sent Events.
+        Emits a 'plan' event, then one 'page' event per batch as soon as its questions are saved,
+        and finally a 'done' event. Accepts the same parameters as generate_questions, in the
+        request body for POST or the query string for GET (so EventSource can be used).
+        """
+        try:
+            source = self.get_object()
+        except Source.DoesNotExist:
+            return Response({"error": "Source not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        data = request.data if request.method == 'POST' else request.query_params
+        parameters, error_response = self._prepare_generation(source, data)
+        if error_response is not None:
+            return error_response
+
+        def event_stream():
+            events = iter_question_generation(
+                questions_per_page=parameters['questions_per_page'],
+                pages_to_generate_str=parameters['pages_to_generate'],
+                total_question_limit=parameters['total_question_limit'],
+                source_id=source.id,
+                use_cache=not parameters['fresh'],
+                incremental=parameters['incremental']
+            )
+            question_count = 0
+            try:
+                for event in events:
+                    if event['event'] == 'plan':
+                        yield format_sse('plan', {'pages': event['pages'], 'batches': len(event['batches'])})
+                    else:
+                        question_count += len(event['questions'])
+                        yield format_sse('page', {
+                            'page_number': event['page_number'],
+                            'batch_number': event['batch_number'],
+                            'requested': event['requested'],
+                            'questions': event['questions'],
+                        })
+                yield format_sse('done', {'question_count': question_count})
+            except Exception as e:
+                print(f"Error in generate_questions_stream endpoint: {str(e)}")
+                yield format_sse('error', {'error': f"Internal server error during question generation: {str(e)}"})
+            finally:
+                # Runs when the client disconnects too, so no further batches are dispatched
+                events.close()
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no' # Disable proxy buffering (nginx) so events arrive immediately
+        return response
             
     @action(detail=True, methods=['get'])
     def file(self, request, pk=None):
@@ -236,6 +476,11 @@ def source_preview(request, source_id):
     try:
         # Get the source object
         source = Source.objects.get(id=source_id)
+        if source.status == 'FAILED':
+            return Response(
+                {'error': source.extraction_error or 'Text extraction failed for this source.', 'status': source.status},
+                status=status.HTTP_409_CONFLICT
+            )
         
         # Get optional page limit from query params (default 10 for better performance)
         page_limit = int(request.GET.get('page_limit', 100))
@@ -272,23 +517,53 @@ def source_preview(request, source_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+def search(request):
+    """
+    Full-text search over extracted pages and generated questions.
+    Query params: q (required), type (all, pages or questions), source_id, limit.
+    Hits are ranked best first, with page numbers and HTML-escaped, <mark>-highlighted snippets.
+    """
+    terms = parse_search_terms(request.GET.get('q', ''))
+    if not terms:
+        return Response({'error': 'Parameter q must contain at least one word.'}, status=status.HTTP_400_BAD_REQUEST)
+    search_type = request.GET.get('type', 'all')
+    if search_type not in ('all', 'pages', 'questions'):
+        return Response({'error': 'Parameter type must be all, pages or questions.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        source_id = int(request.GET['source_id']) if request.GET.get('source_id') else None
+        limit = min(max(int(request.GET.get('limit', 20)), 1), MAX_RESULTS)
+    except ValueError:
+        return Response({'error': 'source_id and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not search_supported():
+        return Response({'error': 'Full-text search is not available on this database backend.'},
+                        status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    results = {'query': " ".join(terms)}
+    if search_type in ('all', 'pages'):
+        results['pages'] = search_pages(terms, source_id=source_id, limit=limit)
+    if search_type in ('all', 'questions'):
+        results['questions'] = search_questions(terms, source_id=source_id, limit=limit)
+    return Response(results)
+
 def generate_pdf_preview(source, page_limit=100):
     """Generate preview for PDF files with improved performance"""
     try:
-        # Use text_content from database if available (much faster)
-        if source.text_content and isinstance(source.text_content, list):
+        # Use the extracted pages from the database if available (much faster)
+        total_pages = source.pages.count()
+        if total_pages:
             pages = []
-            total_pages = len(source.text_content)
             
-            # Show up to page_limit pages
-            for i, page_text in enumerate(source.text_content[:page_limit]):
-                if page_text and page_text.strip():
+            # Show up to page_limit pages; only those pages are fetched
+            preview_pages = source.pages.filter(page_number__lte=page_limit).order_by('page_number')
+            for page in preview_pages.only('page_number', 'plain_text', 'compressed_text', 'word_count'):
+                if page.word_count:
                     # Clean up the text
-                    cleaned_text = re.sub(r'\s+', ' ', page_text).strip()
+                    cleaned_text = re.sub(r'\s+', ' ', page.text).strip()
                     pages.append({
-                        'page_number': i + 1,
+                        'page_number': page.page_number,
                         'content': cleaned_text[:1000] if len(cleaned_text) > 1000 else cleaned_text,
-                        'word_count': len(cleaned_text.split())
+                        'word_count': page.word_count
                     })
             
             return {
@@ -298,24 +573,22 @@ def generate_pdf_preview(source, page_limit=100):
                 'source': 'database'
             }
         
-        # Fallback to file reading if text_content is not available
+        # Fallback to file reading if no pages are stored
         if not source.file:
             raise Exception("No file path available")
             
         file_path = source.file.path
         pages = []
         
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            total_pages = len(pdf_reader.pages)
+        with get_pdf_engine().open(file_path) as pdf_document:
+            total_pages = len(pdf_document)
             
             # Limit preview to specified page_limit or all pages if less
             max_pages = min(total_pages, page_limit)
             
             for i in range(max_pages):
                 try:
-                    page = pdf_reader.pages[i]
-                    text = page.extract_text()
+                    text = pdf_document.extract_page(i)
                     
                     if text and text.strip():
                         # Clean up the text
@@ -348,9 +621,11 @@ def generate_pdf_preview(source, page_limit=100):
 def generate_docx_preview(source):
     """Generate preview for DOCX files with improved performance"""
     try:
-        # Use text_content from database if available
-        if source.text_content and isinstance(source.text_content, list) and len(source.text_content) > 0:
-            full_text = source.text_content[0]  # DOCX is stored as single text block
+        # Use the extracted pages from the database if available
+        totals = source.pages.aggregate(pages=Count('id'), words=Sum('word_count'), characters=Sum('char_count'))
+        if totals['pages']:
+            # Only the pages that fit in the preview are fetched; each page is a group of paragraphs
+            full_text = '\n'.join(iter_page_texts(source.id, max_chars=200000))
             
             # Split into paragraphs for analysis
             paragraphs = [p.strip() for p in full_text.split('\n') if p.strip()]
@@ -358,8 +633,8 @@ def generate_docx_preview(source):
             return {
                 'text': full_text[:200000] if len(full_text) > 200000 else full_text,
                 'paragraph_count': len(paragraphs),
-                'word_count': len(full_text.split()),
-                'character_count': len(full_text),
+                'word_count': totals['words'],
+                'character_count': totals['characters'],
                 'source': 'database'
             }
         
@@ -393,18 +668,20 @@ def generate_docx_preview(source):
 def generate_pptx_preview(source):
     """Generate preview for PPTX files with improved performance"""
     try:
-        # Use text_content from database if available
-        if source.text_content and isinstance(source.text_content, list) and len(source.text_content) > 0:
-            full_text = source.text_content[0]  # PPTX is stored as single text block
-            
-            # Try to split into slides if possible
-            slides_text = full_text.split('\n\n')  # Rough slide separation
+        # Use the extracted slides from the database if available
+        totals = source.pages.aggregate(
+            slides=Count('id'), slides_with_text=Count('id', filter=Q(word_count__gt=0)),
+            words=Sum('word_count'), characters=Sum('char_count')
+        )
+        if totals['slides']:
+            # Only the slides that fit in the preview are fetched
+            full_text = '\n\n'.join(text for text in iter_page_texts(source.id, max_chars=200000) if text.strip())
             
             return {
                 'text': full_text[:200000] if len(full_text) > 200000 else full_text,
-                'word_count': len(full_text.split()),
-                'character_count': len(full_text),
-                'estimated_slides': len([s for s in slides_text if s.strip()]),
+                'word_count': totals['words'],
+                'character_count': totals['characters'],
+                'estimated_slides': totals['slides_with_text'],
                 'source': 'database'
             }
         
@@ -453,10 +730,9 @@ def generate_pptx_preview(source):
 def generate_txt_preview(source):
     """Generate preview for TXT files with improved performance"""
     try:
-        # Use text_content from database if available
-        if source.text_content and isinstance(source.text_content, list) and len(source.text_content) > 0:
-            content = source.text_content[0]  # TXT is stored as single text block
-            
+        # Use the extracted text from the database if available
+        content = load_page_texts(source.id, [1]).get(1)  # TXT is stored as a single page
+        if content is not None:
             lines = content.split('\n')
             words = content.split()
             
@@ -507,18 +783,8 @@ def generate_youtube_preview(source):
         if not video_id:
             raise Exception('Invalid YouTube URL')
         
-        # Use text_content from database if available (much faster)
-        transcript_text = ""
-        if source.text_content and isinstance(source.text_content, list) and len(source.text_content) > 0:
-            content_item = source.text_content[0]
-            if content_item is None:
-                transcript_text = "" # Treat None as empty string
-            elif isinstance(content_item, list):
-                # If it's a list of strings, join them
-                transcript_text = " ".join(content_item)[:150000]
-            elif isinstance(content_item, str):
-                # If it's already a string, use it directly
-                transcript_text = content_item[:150000]
+        # Use the transcript from the database if available (much faster); it is stored as a single page
+        transcript_text = (load_page_texts(source.id, [1]).get(1) or "")[:150000]
             
         # Get basic video information using yt-dlp (lightweight extraction)
         try:
@@ -557,7 +557,14 @@ const SavedFilesPage = () => {
       });
       setConfigOpen(false);
     } catch (err) {
-      setError(err.response?.data?.error || 'Failed to generate quiz. Please check configuration.');
+      // 409 with a status: the source's text is still being extracted (or extraction failed)
+      if (err.response?.status === 409 && err.response.data?.status && err.response.data.status !== 'READY') {
+        setError(err.response.data.status === 'FAILED'
+          ? 'Text extraction failed for this file, so no quiz can be generated from it.'
+          : 'This file is still being processed. Please try again in a moment.');
+      } else {
+        setError(err.response?.data?.error || 'Failed to generate quiz. Please check configuration.');
+      }
       console.error('Quiz generation error:', err);
     } finally {
       setIsQuizGenerating(false);
@@ -61,6 +61,12 @@ const FILE_TYPE_LABELS = {
 
 const MIN_WORDS = 100;
 
+// Uploaded files are extracted in the background; the page polls their status until they are ready
+const EXTRACTION_POLL_INTERVAL = 1500; // ms
+const EXTRACTION_POLL_TIMEOUT = 5 * 60 * 1000; // 5 minutes
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
 const UploadPage = () => {
   const [uploadType, setUploadType] = useState('file');
   const [file, setFile] = useState(null);
@@ -192,6 +198,23 @@ const UploadPage = () => {
     resetMessages();
   };
 
+  // Polls the extraction status of a source until it is READY or FAILED.
+  // Returns the last status response, or null if extraction is still running after EXTRACTION_POLL_TIMEOUT.
+  const waitForExtraction = async (sourceId) => {
+    const deadline = Date.now() + EXTRACTION_POLL_TIMEOUT;
+    while (Date.now() < deadline) {
+      const { data } = await axios.get(`/sources/${sourceId}/status/`);
+      if (data.status === 'READY' || data.status === 'FAILED') {
+        return data;
+      }
+      setSuccess(data.status === 'EXTRACTING'
+        ? 'Extracting text from your upload... This may take a moment.'
+        : 'Upload received. Waiting for text extraction to start...');
+      await sleep(EXTRACTION_POLL_INTERVAL);
+    }
+    return null;
+  };
+
   const handleSubmit = async (event) => {
     event.preventDefault();
     setIsLoading(true);
@@ -268,8 +291,20 @@ const UploadPage = () => {
         'image': 'image'
       };
       const contentType = contentTypeMap[uploadType];
-      setSuccess(`✨ Successfully processed ${contentType}! Redirecting to your saved files...`);
-      
+
+      // 202 means the upload was stored and its text is still being extracted
+      let stillProcessing = false;
+      if (response.status === 202) {
+        const extraction = await waitForExtraction(response.data.id);
+        if (extraction && extraction.status === 'FAILED') {
+          throw new Error(extraction.extraction_error || `Failed to extract text from the ${contentType}.`);
+        }
+        stillProcessing = !extraction;
+      }
+      setSuccess(stillProcessing
+        ? `Your ${contentType} is still being processed and will be ready to practice with shortly. Redirecting to your saved files...`
+        : `✨ Successfully processed ${contentType}! Redirecting to your saved files...`);
+
       setFile(null);
       setYoutubeLink('');
       setTextContent('');